@@ -0,0 +1,240 @@
+"""Сроки проверки домашек по журналу статусов и подсказки для опроса.
+Чем вероятнее вердикт в ближайшее время, тем чаще опрашиваем API.
+"""
+import bisect
+import itertools
+import logging
+import sqlite3
+from collections import defaultdict
+from typing import (
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from clock import Clock, InjectedClock
+from storage import TimelineStore, Transition
+
+REVIEWING: str = 'reviewing'
+VERDICTS = ('approved', 'rejected')
+# Смещение часового пояса ревьюеров от UTC, секунды (Москва).
+REVIEW_TZ_OFFSET: int = 3 * 60 * 60
+# Меньше замеров - распределению не доверяем.
+MIN_SAMPLES: int = 20
+# Желаемая вероятность вердикта между соседними опросами.
+TARGET_CHANCE: float = 0.25
+# Пределы паузы между опросами относительно RETRY_PERIOD.
+MIN_DELAY_FACTOR: float = 0.25
+MAX_DELAY_FACTOR: float = 2.0
+MODEL_REFRESH_PERIOD: int = 6 * 60 * 60
+# Точность длительности проверки в модели, секунды.
+DURATION_RESOLUTION: int = 60
+
+
+class ReviewSample(NamedTuple):
+    """Одна проверка: от reviewing до вердикта."""
+
+    homework: str
+    started_at: int
+    duration: int
+    verdict: str
+
+
+def hour_of_day(timestamp: int) -> int:
+    """Час суток по времени ревьюеров."""
+    return (timestamp + REVIEW_TZ_OFFSET) // 3600 % 24
+
+
+def review_samples(rows: Iterable[Transition]) -> List[ReviewSample]:
+    """Пары reviewing -> approved/rejected из строк журнала."""
+    started: Dict[Hashable, int] = {}
+    samples: List[ReviewSample] = []
+    for tenant, homework, status, changed_at, _ in rows:
+        key = (tenant, homework)
+        if status == REVIEWING:
+            started[key] = changed_at
+        elif status in VERDICTS and key in started:
+            start = started.pop(key)
+            samples.append(
+                ReviewSample(homework, start, changed_at - start, status)
+            )
+    return samples
+
+
+class Distribution:
+    """Длительности проверки по возрастанию с накопленным числом замеров."""
+
+    def __init__(self, counts: Dict[int, int]) -> None:
+        self.values: List[int] = sorted(counts)
+        self.cumulative: List[int] = list(
+            itertools.accumulate(counts[value] for value in self.values)
+        )
+
+    def __len__(self) -> int:
+        return self.cumulative[-1] if self.cumulative else 0
+
+    def at_most(self, duration: float) -> int:
+        """Сколько проверок заняли не больше duration секунд."""
+        index = bisect.bisect_right(self.values, duration)
+        return self.cumulative[index - 1] if index else 0
+
+    def at_rank(self, rank: int) -> int:
+        """Длительность замера с номером rank по возрастанию."""
+        return self.values[bisect.bisect_right(self.cumulative, rank)]
+
+
+class ReviewModel:
+    """Распределения длительности проверки по домашке и часу начала.
+    Строится по гистограмме: homework, час начала, длительность, число.
+    """
+
+    def __init__(self, histogram: Iterable[Tuple[str, int, int, int]]) -> None:
+        groups: Dict[Hashable, Dict[int, int]] = defaultdict(
+            lambda: defaultdict(int)
+        )
+        for homework, hour, duration, count in histogram:
+            for key in (
+                (homework, hour),
+                (homework, None),
+                (None, hour),
+                (None, None),
+            ):
+                groups[key][duration] += count
+        self._groups = {
+            key: Distribution(counts) for key, counts in groups.items()
+        }
+
+    @classmethod
+    def from_samples(cls, samples: Iterable[ReviewSample]) -> 'ReviewModel':
+        """Модель по отдельным проверкам."""
+        return cls(
+            (
+                sample.homework,
+                hour_of_day(sample.started_at),
+                sample.duration,
+                1,
+            )
+            for sample in samples
+        )
+
+    @classmethod
+    def from_store(
+        cls, store: TimelineStore, since: Optional[int] = None
+    ) -> 'ReviewModel':
+        """Строим модель по журналу начиная с since.
+        Пары и группировку считает SQLite, в память попадает только
+        гистограмма с точностью DURATION_RESOLUTION.
+        """
+        return cls(
+            store.review_durations(
+                REVIEWING,
+                VERDICTS,
+                DURATION_RESOLUTION,
+                offset=REVIEW_TZ_OFFSET,
+                since=since,
+            )
+        )
+
+    def durations(
+        self, homework: Optional[str] = None, started_at: Optional[int] = None
+    ) -> Distribution:
+        """Самое точное распределение, для которого хватает замеров."""
+        hour = None if started_at is None else hour_of_day(started_at)
+        for key in ((homework, hour), (homework, None), (None, hour)):
+            durations = self._groups.get(key)
+            if durations is not None and len(durations) >= MIN_SAMPLES:
+                return durations
+        return self._groups.get((None, None), Distribution({}))
+
+    def quantiles(
+        self, homework: Optional[str] = None, started_at: Optional[int] = None
+    ) -> Dict[str, Optional[int]]:
+        """Медиана и p90 длительности проверки, секунды."""
+        durations = self.durations(homework, started_at)
+        count = len(durations)
+        if not count:
+            return {'p50': None, 'p90': None, 'samples': 0}
+        return {
+            'p50': durations.at_rank(count // 2),
+            'p90': durations.at_rank(min(count - 1, count * 9 // 10)),
+            'samples': count,
+        }
+
+    def verdict_chance(
+        self, homework: str, started_at: int, elapsed: float, horizon: float
+    ) -> Optional[float]:
+        """Вероятность вердикта в ближайшие horizon секунд.
+        Проверка идёт уже elapsed секунд; None - мало данных.
+        """
+        durations = self.durations(homework, started_at)
+        if len(durations) < MIN_SAMPLES:
+            return None
+        finished = durations.at_most(elapsed)
+        still_open = len(durations) - finished
+        if not still_open:
+            return 1.0
+        return (durations.at_most(elapsed + horizon) - finished) / still_open
+
+
+def hinted_delay(chance: Optional[float], base: float) -> float:
+    """Пауза до опроса, при которой вердикт ожидается с TARGET_CHANCE."""
+    if chance is None:
+        return base
+    delay = base * TARGET_CHANCE / max(chance, 1e-6)
+    return min(max(delay, base * MIN_DELAY_FACTOR), base * MAX_DELAY_FACTOR)
+
+
+class PollAdvisor:
+    """Подсказывает паузу до следующего опроса подписчика.
+    Модель перестраивается раз в MODEL_REFRESH_PERIOD.
+    """
+
+    clock = InjectedClock()
+
+    def __init__(
+        self,
+        store: TimelineStore,
+        clock: Optional[Clock] = None,
+        enabled: bool = True,
+    ) -> None:
+        self.store = store
+        self.clock = clock
+        self.enabled = enabled
+        self._model: Optional[ReviewModel] = None
+        self._built_at: float = float('-inf')
+
+    @property
+    def model(self) -> ReviewModel:
+        """Актуальная модель сроков проверки."""
+        now = self.clock.time()
+        if now - self._built_at >= MODEL_REFRESH_PERIOD:
+            self._model = ReviewModel.from_store(self.store)
+            self._built_at = now
+        return self._model
+
+    def delay(self, tenant: str, base: float) -> float:
+        """Пауза до опроса с учётом домашек на проверке.
+        Если журнал недоступен, опрашиваем с обычной паузой.
+        """
+        if not self.enabled:
+            return base
+        now = self.clock.time()
+        try:
+            chances = [
+                self.model.verdict_chance(
+                    homework, changed, now - changed, base
+                )
+                for homework, (status, changed) in self.store.current_statuses(
+                    tenant
+                ).items()
+                if status == REVIEWING
+            ]
+        except sqlite3.Error as error:
+            logging.error(f'Журнал статусов недоступен: {error}')
+            return base
+        known = [chance for chance in chances if chance is not None]
+        return hinted_delay(max(known), base) if known else base
@@ -0,0 +1,176 @@
+"""Загрузка истории статусов в журнал для новых подписчиков.
+API отдаёт все домашки, обновлённые после from_date, верхней границы
+у запроса нет, поэтому история подписчика берётся одним запросом.
+Записи пишутся в журнал по порядку date_updated пачками по BATCH;
+после каждой пачки сохраняется прогресс, и прерванная загрузка
+продолжается с последней сохранённой записи.
+
+Запуск: python backfill.py [--since TS] [--workers N]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import Settings, TenantSettings
+from state import write_json_atomic
+from storage import TimelineStore, parse_date_updated
+
+DAY: int = 24 * 60 * 60
+DEFAULT_DEPTH: int = 365 * DAY
+# Сколько записей пишется в журнал между отметками прогресса.
+BATCH: int = 500
+# Запрос к API: from_date, имя подписчика, заголовки -> проверенный ответ.
+Fetch = Callable[[int, str, Dict[str, str]], Dict[str, Any]]
+
+
+class BackfillProgress:
+    """До какого момента загружена история каждого подписчика."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding='UTF-8') as file:
+                self._done: Dict[str, int] = json.load(file)
+        except (FileNotFoundError, ValueError):
+            self._done = {}
+
+    def loaded_until(self, tenant: str) -> Optional[int]:
+        """Момент, до которого история подписчика уже в журнале."""
+        return self._done.get(tenant)
+
+    def advance(self, tenant: str, until: int) -> None:
+        """Отмечаем историю загруженной до until и сразу сохраняем."""
+        with self._lock:
+            self._done[tenant] = until
+            write_json_atomic(self.path, self._done)
+
+
+def changes(
+    response: Dict[str, Any], since: int, until: int
+) -> List[Tuple[int, Dict[str, Any]]]:
+    """Домашки ответа с моментом изменения в [since, until) по порядку."""
+    dated = (
+        (parse_date_updated(homework.get('date_updated'), since), homework)
+        for homework in response['homeworks']
+    )
+    return sorted(
+        (
+            (changed_at, homework)
+            for changed_at, homework in dated
+            if since <= changed_at < until
+        ),
+        key=lambda change: change[0],
+    )
+
+
+def backfill_tenant(
+    tenant: TenantSettings,
+    since: int,
+    until: int,
+    fetch: Fetch,
+    store: TimelineStore,
+    progress: BackfillProgress,
+    batch: int = BATCH,
+) -> int:
+    """Загружаем историю одного подписчика, возвращаем число записей.
+    После прерывания начинаем с момента последней сохранённой пачки:
+    записи того же момента повторно в журнал не попадут, см. record.
+    """
+    since = max(since, progress.loaded_until(tenant.name) or since)
+    if since >= until:
+        return 0
+    recorded = 0
+    response = fetch(since, tenant.name, tenant.headers)
+    for count, (changed_at, homework) in enumerate(
+        changes(response, since, until), 1
+    ):
+        recorded += store.record(tenant.name, homework, changed_at)
+        if count % batch == 0:
+            store.flush()
+            progress.advance(tenant.name, changed_at)
+    store.flush()
+    progress.advance(tenant.name, until)
+    logging.info(
+        f'{tenant.name}: история загружена до {until}, записей {recorded}'
+    )
+    return recorded
+
+
+def run_backfill(
+    settings: Settings,
+    fetch: Fetch,
+    store: TimelineStore,
+    progress: BackfillProgress,
+    since: int,
+    until: int,
+    workers: int = 4,
+) -> Dict[str, int]:
+    """Загружаем историю всех подписчиков параллельно.
+    Частоту запросов ограничивает fetch, например через RateLimiter.
+    """
+    tenants = settings.all_tenants()
+    with ThreadPoolExecutor(workers, thread_name_prefix='backfill') as pool:
+        futures = {
+            tenant.name: pool.submit(
+                backfill_tenant,
+                tenant,
+                since,
+                until,
+                fetch,
+                store,
+                progress,
+            )
+            for tenant in tenants
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+
+def parse_args(argv: Sequence[str]) -> Tuple[argparse.Namespace, list]:
+    """Аргументы загрузки; остальные передаются в настройки бота."""
+    parser = argparse.ArgumentParser(description='Загрузка истории статусов')
+    parser.add_argument('--since', type=int, help='unix-время начала')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--progress', help='файл прогресса загрузки')
+    return parser.parse_known_args(list(argv))
+
+
+def main(argv: Sequence[str]) -> Dict[str, int]:
+    """Загрузка истории с настройками и лимитами бота."""
+    import homework
+
+    args, bot_argv = parse_args(argv)
+    settings = homework.configure(bot_argv)
+    now = int(time.time())
+    progress = BackfillProgress(
+        args.progress
+        or os.path.join(
+            os.path.dirname(homework.STATE_FILE_DIR), 'backfill.json'
+        )
+    )
+    try:
+        return run_backfill(
+            settings,
+            homework.request_statuses,
+            homework.TIMELINE,
+            progress,
+            since=now - DEFAULT_DEPTH if args.since is None else args.since,
+            until=now,
+            workers=args.workers,
+        )
+    finally:
+        homework.TIMELINE.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO,
+    )
+    logging.info(f'Загружено записей: {main(sys.argv[1:])}')
@@ -0,0 +1,193 @@
+"""Ограниченная очередь между опросом и отправкой в Telegram.
+Опрос и разбор ответа кладут уведомление в очередь, отдельный поток
+отправляет. Если Telegram тормозит и очередь полна, опрос ждёт место
+до wait секунд - так медленная отправка замедляет опрос, а память
+не растёт. Не дождавшись, очередь сбрасывает сначала дубликаты,
+затем уведомления об ошибках; уведомление о статусе не теряется:
+если сбросить нечего, опрос ждёт, пока освободится место. Мимо
+очереди ничего не отправляется, поэтому статусы уходят в порядке
+постановки. Давление очереди видно в METRICS.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Hashable, NamedTuple, Optional
+
+from metrics import METRICS, MetricsRegistry
+
+# Уведомление об ошибке опроса сбрасывается раньше статуса домашки.
+PRIORITY_ERROR: int = 0
+PRIORITY_STATUS: int = 1
+# Сколько ждём отправки оставшегося при остановке, секунды.
+SHUTDOWN_TIMEOUT: float = 30.0
+Task = Callable[[], Any]
+
+
+class Notice(NamedTuple):
+    """Уведомление в очереди; key - подписчик и текст для поиска дублей."""
+
+    key: Hashable
+    task: Task
+    priority: int
+
+
+class SendQueue:
+    """Очередь из capacity уведомлений и поток отправки.
+    capacity = 0 - очереди нет, отправка сразу в вызывающем потоке
+    (если поток отправки уже запущен - за ним, в той же очереди).
+    Поток запускается при первом уведомлении.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 0,
+        wait: float = 5.0,
+        metrics: MetricsRegistry = METRICS,
+    ) -> None:
+        self.capacity = capacity
+        self.wait = wait
+        self.metrics = metrics
+        self._condition = threading.Condition()
+        self._notices: Deque[Notice] = deque()
+        self._stopping: bool = False
+        self._worker: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._notices)
+
+    def configure(self, capacity: int, wait: float) -> None:
+        """Размер очереди (0 - без очереди) и ожидание места, секунды."""
+        with self._condition:
+            self.capacity, self.wait = capacity, wait
+            self._condition.notify_all()
+
+    def submit(
+        self, key: Hashable, task: Task, priority: int = PRIORITY_STATUS
+    ) -> None:
+        """Ставим отправку в очередь, при нехватке места ждём и сбрасываем.
+        Такое же уведомление, уже ждущее в очереди, второй раз не ставится.
+        """
+        with self._condition:
+            # Пока поток отправки жив, всё идёт через очередь: иначе
+            # уведомление обгонит ждущие в ней.
+            if self._worker is not None or (
+                self.capacity > 0 and not self._stopping
+            ):
+                if any(notice.key == key for notice in self._notices):
+                    self._shed('duplicate')
+                    return
+                if not self._make_room(priority):
+                    self._shed('overflow')
+                    return
+                self._notices.append(Notice(key, task, priority))
+                self._start()
+                self._update_gauges()
+                self._condition.notify_all()
+                return
+        self._run(task)
+
+    def shutdown(self, timeout: float = SHUTDOWN_TIMEOUT) -> None:
+        """Отправляем оставшееся и останавливаем поток."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+            worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+            if worker.is_alive():
+                logging.error(
+                    f'Не отправлено уведомлений из очереди: {len(self)}'
+                )
+        with self._condition:
+            self._stopping = False
+
+    def _full(self) -> bool:
+        return 0 < self.capacity <= len(self._notices)
+
+    def _make_room(self, priority: int) -> bool:
+        """Ждём место до wait секунд, затем вытесняем менее важное.
+        Статус, которому некого вытеснить, ждёт места без ограничения;
+        False - места нет для уведомления об ошибке.
+        """
+        if not self._full():
+            return True
+        self.metrics.inc('sendqueue.blocked')
+        started = time.monotonic()
+        deadline = started + self.wait
+        try:
+            while self._full():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stopping:
+                    break
+                self._condition.wait(remaining)
+            if not self._full() or self._evict():
+                return True
+            if priority == PRIORITY_ERROR:
+                return False
+            self.metrics.inc('sendqueue.stalled')
+            while self._full():
+                self._condition.wait()
+            return True
+        finally:
+            self.metrics.observe(
+                'sendqueue.wait_seconds', time.monotonic() - started
+            )
+
+    def _evict(self) -> bool:
+        """Сбрасываем дубль, иначе самое старое уведомление об ошибке."""
+        seen = set()
+        for notice in self._notices:
+            if notice.key in seen:
+                self._notices.remove(notice)
+                self._shed('duplicate')
+                return True
+            seen.add(notice.key)
+        for notice in self._notices:
+            if notice.priority == PRIORITY_ERROR:
+                self._notices.remove(notice)
+                self._shed('low_priority')
+                return True
+        return False
+
+    def _start(self) -> None:
+        if self._worker is None:
+            self._worker = threading.Thread(
+                target=self._loop, name='sender', daemon=True
+            )
+            self._worker.start()
+
+    def _loop(self) -> None:
+        while True:
+            with self._condition:
+                while not self._notices and not self._stopping:
+                    self._condition.wait()
+                if not self._notices:
+                    self._worker = None
+                    return
+                notice = self._notices.popleft()
+                self._update_gauges()
+                # Освободилось место - будим ждущий опрос.
+                self._condition.notify_all()
+            self._run(notice.task)
+
+    def _run(self, task: Task) -> None:
+        try:
+            task()
+        except Exception as error:
+            logging.error(f'Сбой отправки уведомления: {error}', exc_info=True)
+            self.metrics.inc('sendqueue.errors')
+        else:
+            self.metrics.inc('sendqueue.sent')
+
+    def _shed(self, reason: str) -> None:
+        self.metrics.inc(f'sendqueue.shed.{reason}')
+        logging.warning(f'Уведомление сброшено из очереди: {reason}')
+
+    def _update_gauges(self) -> None:
+        self.metrics.set('sendqueue.depth', len(self._notices))
+        self.metrics.set(
+            'sendqueue.pressure',
+            len(self._notices) / self.capacity if self.capacity else 0.0,
+        )
@@ -0,0 +1,192 @@
+"""Сжатие ответов API и учёт трафика по подписчикам.
+Запрашиваем gzip, а при установленном brotli - br. Тело читаем как
+есть и разжимаем потоково, считая байты на проводе и после разжатия.
+Раз в сутки по счётчикам METRICS пишется отчёт о трафике.
+"""
+import importlib
+import json
+import logging
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional
+
+from clock import Clock, InjectedClock
+from exceptions import DecoderError
+from metrics import METRICS, MetricsRegistry
+
+# Модули с распаковщиком brotli в порядке предпочтения.
+BROTLI_MODULES: Iterable[str] = ('brotli', 'brotlicffi')
+# Предел разжатого тела: защита от «zip-бомбы», байт.
+MAX_DECODED: int = 16 * 1024 * 1024
+CHUNK_SIZE: int = 16 * 1024
+REPORT_PERIOD: float = 24 * 60 * 60
+WIRE: str = 'bandwidth.wire'
+DECODED: str = 'bandwidth.decoded'
+RESPONSES: str = 'bandwidth.responses'
+
+
+@lru_cache(maxsize=None)
+def _brotli() -> Optional[Any]:
+    for name in BROTLI_MODULES:
+        try:
+            return importlib.import_module(name)
+        except ImportError:
+            continue
+    return None
+
+
+def accept_encoding() -> str:
+    """Значение Accept-Encoding: br только при установленном brotli."""
+    return 'br, gzip' if _brotli() is not None else 'gzip'
+
+
+class StreamDecoder:
+    """Потоковый распаковщик тела по Content-Encoding."""
+
+    def __init__(self, encoding: Optional[str]) -> None:
+        encoding = (encoding or 'identity').strip().lower()
+        self.encoding = encoding
+        if encoding in ('gzip', 'x-gzip'):
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            self._decompress = decompressor.decompress
+            self._flush = decompressor.flush
+        elif encoding == 'deflate':
+            decompressor = zlib.decompressobj()
+            self._decompress = decompressor.decompress
+            self._flush = decompressor.flush
+        elif encoding == 'br' and _brotli() is not None:
+            decompressor = _brotli().Decompressor()
+            self._decompress = getattr(
+                decompressor, 'process', None
+            ) or decompressor.decompress
+            self._flush = bytes
+        elif encoding == 'identity':
+            self._decompress = bytes
+            self._flush = bytes
+        else:
+            raise DecoderError(f'Неподдерживаемое сжатие ответа {encoding}')
+
+    def decompress(self, chunk: bytes) -> bytes:
+        """Очередной разжатый кусок."""
+        try:
+            return self._decompress(chunk)
+        except Exception as error:
+            raise DecoderError(f'Не удалось разжать ответ: {error}')
+
+    def flush(self) -> bytes:
+        """Остаток после последнего куска."""
+        try:
+            return self._flush()
+        except Exception as error:
+            raise DecoderError(f'Не удалось разжать ответ: {error}')
+
+
+class Body:
+    """Прочитанный ответ: код, заголовки и разжатое тело."""
+
+    def __init__(
+        self, status_code: int, content: bytes, headers: Any = None
+    ) -> None:
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    @property
+    def text(self) -> str:
+        """Тело строкой."""
+        return self.content.decode('UTF-8', errors='replace')
+
+    def json(self) -> Any:
+        """Разбираем тело; битое тело даёт JSONDecodeError."""
+        return json.loads(self.content)
+
+
+def read_body(
+    chunks: Iterable[bytes],
+    encoding: Optional[str],
+    tenant: str,
+    metrics: MetricsRegistry = METRICS,
+) -> bytes:
+    """Разжимаем тело по кускам и считаем трафик подписчика."""
+    decoder = StreamDecoder(encoding)
+    parts = []
+    wire = decoded = 0
+    for chunk in chunks:
+        wire += len(chunk)
+        part = decoder.decompress(chunk)
+        decoded += len(part)
+        if decoded > MAX_DECODED:
+            raise DecoderError(
+                f'Ответ API больше {MAX_DECODED} байт после разжатия'
+            )
+        parts.append(part)
+    tail = decoder.flush()
+    decoded += len(tail)
+    parts.append(tail)
+    metrics.inc(f'{WIRE}.{tenant}', wire)
+    metrics.inc(f'{DECODED}.{tenant}', decoded)
+    metrics.inc(f'{RESPONSES}.{tenant}')
+    return b''.join(parts)
+
+
+class BandwidthReport:
+    """Суточный отчёт о трафике по счётчикам read_body.
+    Для оценки на большое число подписчиков в отчёте есть средний
+    объём одного ответа.
+    """
+
+    clock = InjectedClock()
+
+    def __init__(
+        self,
+        period: float = REPORT_PERIOD,
+        metrics: MetricsRegistry = METRICS,
+        clock: Optional[Clock] = None,
+    ) -> None:
+        self.period = period
+        self.metrics = metrics
+        self.clock = clock
+        self._started: Optional[float] = None
+        self._baseline: Dict[str, float] = {}
+
+    def collect(self) -> Dict[str, Any]:
+        """Трафик с начала текущего периода по подписчикам и всего."""
+        counters = self.metrics.counters('bandwidth.')
+        tenants: Dict[str, Dict[str, float]] = {}
+        for name, value in counters.items():
+            kind, tenant = name[len('bandwidth.'):].split('.', 1)
+            delta = value - self._baseline.get(name, 0)
+            tenants.setdefault(tenant, {})[kind] = delta
+        total = {'wire': 0, 'decoded': 0, 'responses': 0}
+        for usage in tenants.values():
+            for kind in total:
+                usage.setdefault(kind, 0)
+                total[kind] += usage[kind]
+        for usage in (*tenants.values(), total):
+            responses = usage['responses']
+            usage['wire_per_response'] = (
+                usage['wire'] / responses if responses else 0
+            )
+            usage['ratio'] = (
+                usage['wire'] / usage['decoded'] if usage['decoded'] else 1.0
+            )
+        return {'tenants': tenants, 'total': total}
+
+    def report_if_due(self) -> Optional[Dict[str, Any]]:
+        """Раз в period пишем отчёт в лог и начинаем новый период."""
+        now = self.clock.time()
+        if self._started is None:
+            self._started = now
+        if now - self._started < self.period:
+            return None
+        report = self.collect()
+        report['seconds'] = now - self._started
+        total = report['total']
+        self.metrics.set('bandwidth.daily.wire', total['wire'])
+        self.metrics.set('bandwidth.daily.decoded', total['decoded'])
+        logging.info(
+            f'Трафик API за сутки: {json.dumps(report, ensure_ascii=False)}'
+        )
+        self._baseline = self.metrics.counters('bandwidth.')
+        self._started = now
+        return report
@@ -0,0 +1,150 @@
+"""Кэш проверенных ответов API: общий для опроса и запросов по требованию."""
+import threading
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from clock import Clock, InjectedClock
+from metrics import METRICS, MetricsRegistry
+
+T = TypeVar('T')
+
+
+class _Flight:
+    """Запрос, который уже выполняется для ключа."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class ResponseCache:
+    """TTL + LRU кэш с единственным запросом на ключ (single-flight).
+    Пока один вызов грузит ключ, остальные ждут его результата.
+    """
+
+    clock = InjectedClock()
+
+    def __init__(
+        self,
+        ttl: float = 60.0,
+        maxsize: int = 1024,
+        clock: Optional[Clock] = None,
+        metrics: MetricsRegistry = METRICS,
+    ) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self._items: 'OrderedDict[Hashable, Tuple[float, Any]]' = (
+            OrderedDict()
+        )
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def configure(self, ttl: float, maxsize: int) -> None:
+        """Меняем срок жизни и размер, лишние записи вытесняются."""
+        with self._lock:
+            self.ttl, self.maxsize = ttl, maxsize
+            self._evict()
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Свежее значение без загрузки и без учёта в метриках."""
+        with self._lock:
+            return self._fresh(key)
+
+    def get(
+        self,
+        key: Hashable,
+        loader: Callable[[], T],
+        refresh: bool = False,
+        request: Optional[Hashable] = None,
+    ) -> T:
+        """Значение key из кэша или из loader().
+        refresh=True пропускает кэш, но присоединяется к идущей загрузке.
+        request - ключ загрузки, по умолчанию key: загрузки с одним
+        request делят один запрос, а результат становится значением key.
+        """
+        request = key if request is None else request
+        with self._lock:
+            value = None if refresh else self._fresh(key)
+            if value is not None:
+                self._count('hits')
+                return value
+            flight = self._flights.get(request)
+            leader = flight is None
+            if leader:
+                flight = self._flights[request] = _Flight()
+                self._count('misses')
+            else:
+                self._count('shared')
+        if leader:
+            self._load(key, request, loader, flight)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def invalidate(self, key: Hashable) -> None:
+        """Удаляем key из кэша."""
+        with self._lock:
+            self._items.pop(key, None)
+
+    def hit_rate(self) -> float:
+        """Доля обращений, обслуженных без запроса к API."""
+        hits = self.metrics.counter('cache.hits')
+        shared = self.metrics.counter('cache.shared')
+        total = hits + shared + self.metrics.counter('cache.misses')
+        return (hits + shared) / total if total else 0.0
+
+    def _load(
+        self,
+        key: Hashable,
+        request: Hashable,
+        loader: Callable[[], Any],
+        flight: _Flight,
+    ) -> None:
+        try:
+            flight.result = loader()
+        except BaseException as error:
+            flight.error = error
+        with self._lock:
+            if flight.error is None:
+                self._items[key] = (self.clock.time(), flight.result)
+                self._items.move_to_end(key)
+                self._evict()
+            del self._flights[request]
+        flight.done.set()
+
+    def _fresh(self, key: Hashable) -> Optional[Any]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        stored_at, value = item
+        if self.clock.time() - stored_at > self.ttl:
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return value
+
+    def _evict(self) -> None:
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+            self.metrics.inc('cache.evictions')
+        self.metrics.set('cache.size', len(self._items))
+
+    def _count(self, outcome: str) -> None:
+        self.metrics.inc(f'cache.{outcome}')
+        self.metrics.set('cache.hit_rate', self.hit_rate())
@@ -0,0 +1,202 @@
+"""Карточки статусов: одно сообщение на домашку, которое правится.
+Вместо нового сообщения на каждую смену статуса бот меняет текст
+прежнего через edit_message_text. Идентификаторы сообщений хранятся
+в json-файле, чтобы карточки переживали перезапуск. Неудавшаяся правка
+остаётся в карточке как pending и повторяется фоновым потоком.
+"""
+import json
+import logging
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from clock import Clock, InjectedClock
+from outbox import retry_delay
+from state import write_json_atomic
+
+# Сколько последних статусов показывать в карточке.
+CARD_HISTORY: int = 10
+# Ответы Telegram, после которых карточку можно только начать заново.
+CARD_GONE_ERRORS: Tuple[str, ...] = (
+    'message to edit not found',
+    "message can't be edited",
+)
+STATUS_TITLES: Dict[str, str] = {
+    'reviewing': 'на проверке',
+    'approved': 'принята',
+    'rejected': 'есть замечания',
+}
+
+
+class StatusCard(NamedTuple):
+    """Сообщение-карточка в чате и история статусов в нём.
+    pending - текст, который ещё не удалось записать в сообщение.
+    """
+
+    chat_id: str
+    message_id: int
+    history: Tuple[str, ...]
+    pending: Optional[str] = None
+
+
+# Повтор правки: подписчик, домашка и карточка с текстом в pending.
+RetryCard = Callable[[str, str, StatusCard], None]
+
+
+def render_card(message: str, history: Sequence[str]) -> str:
+    """Текст карточки: последнее уведомление и цепочка статусов."""
+    chain = ' → '.join(STATUS_TITLES.get(status, status) for status in history)
+    return f'{message}\nИстория: {chain}'
+
+
+class StatusCardStore:
+    """Карточки по подписчику и названию домашки в json-файле.
+    enabled переключает режим карточек в настройках. Отложенные правки
+    повторяются фоновым потоком с той же растущей паузой, что и в OUTBOX.
+    """
+
+    clock = InjectedClock()
+
+    def __init__(self, path: str, clock: Optional[Clock] = None) -> None:
+        self.path = path
+        self.enabled: bool = False
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._cards: Optional[Dict[str, Dict[str, StatusCard]]] = None
+        # Попытки и время следующего повтора по (подписчик, домашка).
+        self._retries: Dict[Tuple[str, str], Tuple[int, float]] = {}
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def get(self, tenant: str, homework: str) -> Optional[StatusCard]:
+        """Карточка домашки или None, если её ещё нет."""
+        with self._lock:
+            return self._load().get(tenant, {}).get(homework)
+
+    def put(self, tenant: str, homework: str, card: StatusCard) -> None:
+        """Запоминаем карточку и сразу сохраняем файл."""
+        with self._lock:
+            self._store(tenant, homework, card)
+
+    def retry_later(
+        self,
+        tenant: str,
+        homework: str,
+        card: StatusCard,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """Правка card.pending не удалась: повторим её с ростом паузы.
+        Без ошибки - к уже отложенной правке добавился новый статус,
+        и её расписание не меняется.
+        """
+        key = (tenant, homework)
+        with self._lock:
+            attempts, due = self._retries.get(key, (0, 0.0))
+            if error is not None or key not in self._retries:
+                attempts += 1
+                due = self.clock.time() + retry_delay(attempts, error)
+            self._retries[key] = (attempts, due)
+            self._store(tenant, homework, card)
+
+    def settle(
+        self, tenant: str, homework: str, text: str, card: StatusCard
+    ) -> None:
+        """Правка с текстом text дошла, card - карточка после неё.
+        Если за время повтора пришёл новый статус, он остаётся в pending.
+        """
+        with self._lock:
+            current = self._load().get(tenant, {}).get(homework)
+            if current is not None and current.pending != text:
+                card = card._replace(
+                    history=current.history, pending=current.pending
+                )
+            else:
+                self._retries.pop((tenant, homework), None)
+            self._store(tenant, homework, card)
+
+    def due(self) -> List[Tuple[str, str, StatusCard]]:
+        """Карточки с отложенной правкой, которую пора повторить.
+        После перезапуска расписания нет - повторяем сразу.
+        """
+        with self._lock:
+            now = self.clock.time()
+            return [
+                (tenant, homework, card)
+                for tenant, cards in self._load().items()
+                for homework, card in cards.items()
+                if card.pending is not None
+                and self._retries.get((tenant, homework), (0, 0.0))[1] <= now
+            ]
+
+    def retry_due(self, retry: RetryCard) -> int:
+        """Один проход повторов, возвращаем число удавшихся."""
+        done = 0
+        for tenant, homework, card in self.due():
+            try:
+                retry(tenant, homework, card)
+            except Exception as error:
+                logging.warning(
+                    f'Повтор правки карточки {card.message_id} '
+                    f'не удался: {error}'
+                )
+                self.retry_later(tenant, homework, card, error)
+            else:
+                done += 1
+        return done
+
+    def start(self, retry: RetryCard, interval: float = 1.0) -> None:
+        """Запускаем фоновый поток повторов правок."""
+        if self._worker is not None:
+            return
+        self._stop.clear()
+        self._worker = threading.Thread(
+            target=self._run, args=(retry, interval), name='cards',
+            daemon=True,
+        )
+        self._worker.start()
+
+    def stop(self) -> None:
+        """Останавливаем поток повторов, отложенное остаётся в файле."""
+        if self._worker is not None:
+            self._stop.set()
+            self._worker.join()
+            self._worker = None
+
+    def _run(self, retry: RetryCard, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.retry_due(retry)
+            except Exception as error:
+                logging.error(f'Сбой повтора карточек: {error}')
+
+    def _store(self, tenant: str, homework: str, card: StatusCard) -> None:
+        self._load().setdefault(tenant, {})[homework] = card
+        write_json_atomic(self.path, {
+            tenant: {
+                homework: card._asdict()
+                for homework, card in cards.items()
+            }
+            for tenant, cards in self._cards.items()
+        })
+
+    def _load(self) -> Dict[str, Dict[str, StatusCard]]:
+        if self._cards is not None:
+            return self._cards
+        self._cards = {}
+        try:
+            with open(self.path, encoding='UTF-8') as file:
+                data = json.load(file)
+            for tenant, cards in data.items():
+                self._cards[tenant] = {
+                    homework: StatusCard(
+                        card['chat_id'],
+                        card['message_id'],
+                        tuple(card['history']),
+                        card.get('pending'),
+                    )
+                    for homework, card in cards.items()
+                }
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            logging.error(f'Повреждён файл карточек {self.path}: {error}')
+        return self._cards
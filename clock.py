@@ -0,0 +1,87 @@
+"""Часы бота: реальное время и виртуальное для тестов и симуляций."""
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Protocol
+
+
+class Clock(Protocol):
+    """Всё, что боту нужно от модуля time."""
+
+    def time(self) -> float:
+        """Текущее время в секундах."""
+
+    def sleep(self, seconds: float) -> None:
+        """Пауза на seconds секунд."""
+
+
+# Модуль time сам реализует протокол Clock: main() вызывает time.sleep
+# напрямую, без промежуточных обёрток.
+REAL_CLOCK: Clock = time
+
+
+class VirtualClock:
+    """Виртуальное время: sleep мгновенно сдвигает часы вперёд.
+    Позволяет прогнать недели работы бота за секунды.
+    """
+
+    def __init__(self, start: float = 0.0) -> None:
+        self._now: float = float(start)
+        self.sleeps: int = 0
+
+    def time(self) -> float:
+        """Текущее виртуальное время."""
+        return self._now
+
+    def sleep(self, seconds: float) -> None:
+        """Сдвигаем часы на seconds секунд."""
+        if seconds < 0:
+            raise ValueError(f'Отрицательная пауза {seconds}')
+        self._now += seconds
+        self.sleeps += 1
+
+    def advance_to(self, moment: float) -> None:
+        """Переводим часы на момент moment, назад время не идёт."""
+        if moment > self._now:
+            self.sleep(moment - self._now)
+
+
+_current_clock: Clock = REAL_CLOCK
+
+
+def get_clock() -> Clock:
+    """Часы, которыми сейчас пользуются main() и планировщик."""
+    return _current_clock
+
+
+def set_clock(clock: Clock) -> Clock:
+    """Подменяем часы, возвращаем предыдущие."""
+    global _current_clock
+    previous, _current_clock = _current_clock, clock
+    return previous
+
+
+class InjectedClock:
+    """Атрибут с часами: переданные явно или текущие из get_clock().
+    Долгоживущие объекты, созданные при импорте, так видят подмену часов.
+    """
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.attr = f'_{name}'
+
+    def __get__(self, instance: Any, owner: type) -> Any:
+        if instance is None:
+            return self
+        return instance.__dict__.get(self.attr) or get_clock()
+
+    def __set__(self, instance: Any, clock: Optional[Clock]) -> None:
+        instance.__dict__[self.attr] = clock
+
+
+@contextmanager
+def use_clock(clock: Clock) -> Iterator[Clock]:
+    """Временно подменяем часы внутри блока with."""
+    previous = set_clock(clock)
+    try:
+        yield clock
+    finally:
+        set_clock(previous)
@@ -0,0 +1,384 @@
+"""Настройки бота: один неизменяемый объект вместо разрозненных констант.
+Источники по возрастанию приоритета: значения по умолчанию, json-файл,
+переменные окружения, явные значения модуля, командная строка.
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields, replace
+from functools import cached_property
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from exceptions import ConfigError, ReloadRequested
+
+DEFAULT_ENDPOINT: str = (
+    'https://practicum.yandex.ru/api/user_api/homework_statuses/'
+)
+DEFAULT_RETRY_PERIOD: int = 600
+CONFIG_FILE_ENV: str = 'BOT_CONFIG'
+# Подписчик из PRACTIC_TOKEN/CHAT_ID, работавший до появления tenants.
+DEFAULT_TENANT: str = 'default'
+# Переменная окружения для каждого поля Settings.
+ENV_NAMES: Dict[str, str] = {
+    'practicum_token': 'PRACTIC_TOKEN',
+    'telegram_token': 'TG_TOKEN',
+    'telegram_chat_id': 'CHAT_ID',
+    'endpoint': 'ENDPOINT',
+    'retry_period': 'RETRY_PERIOD',
+}
+# Числовые настройки: приведение типа, проверка и её описание.
+NUMERIC_FIELDS: Dict[str, Tuple[Callable, Callable[[Any], bool], str]] = {
+    'retry_period': (int, lambda value: value > 0, 'больше нуля'),
+    'rate_limit': (float, lambda value: value > 0, 'больше нуля'),
+    'rate_burst': (int, lambda value: value >= 1, 'не меньше 1'),
+    'tenant_rate_limit': (float, lambda value: value > 0, 'больше нуля'),
+    'tenant_rate_burst': (int, lambda value: value >= 1, 'не меньше 1'),
+    'hedge_max_ratio': (float, lambda value: 0 <= value <= 1, 'от 0 до 1'),
+    'cache_ttl': (float, lambda value: value >= 0, 'не меньше нуля'),
+    'cache_size': (int, lambda value: value >= 1, 'не меньше 1'),
+    'digest_window': (float, lambda value: value > 0, 'больше нуля'),
+    'digest_max_items': (int, lambda value: value >= 1, 'не меньше 1'),
+    'health_port': (int, lambda value: 0 <= value < 65536, 'от 0 до 65535'),
+    'state_memory_budget': (int, lambda value: value > 0, 'больше нуля'),
+    'memory_limit': (int, lambda value: value > 0, 'больше нуля'),
+    'transport_connections': (int, lambda value: value >= 1, 'не меньше 1'),
+    'dns_ttl': (float, lambda value: value >= 0, 'не меньше нуля'),
+    'dns_stale': (float, lambda value: value >= 0, 'не меньше нуля'),
+    'send_queue_size': (int, lambda value: value >= 0, 'не меньше нуля'),
+    'send_queue_wait': (float, lambda value: value >= 0, 'не меньше нуля'),
+}
+# Виды дополнительных получателей уведомлений.
+ROUTE_KINDS: Tuple[str, ...] = ('telegram', 'webhook', 'file')
+# Протоколы запросов к API, см. transport.py.
+TRANSPORTS: Tuple[str, ...] = ('http1', 'http1-pool', 'http2')
+REQUIRED_FIELDS: Tuple[str, ...] = (
+    'practicum_token',
+    'telegram_token',
+    'telegram_chat_id',
+    'endpoint',
+)
+
+
+@dataclass(frozen=True)
+class TenantSettings:
+    """Подписчик: свой токен Практикума и свой чат.
+    Незаданные поля берутся из общих настроек.
+    """
+
+    name: str
+    practicum_token: Optional[str] = None
+    chat_id: Optional[str] = None
+    retry_period: Optional[int] = None
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """Заголовки запроса к API от имени подписчика."""
+        return {'Authorization': f'OAuth {self.practicum_token}'}
+
+
+@dataclass(frozen=True)
+class Route:
+    """Дополнительный получатель уведомлений подписчика.
+    kind - один из ROUTE_KINDS, target - чат, адрес или путь к файлу.
+    """
+
+    tenant: str
+    kind: str
+    target: str
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Все настройки бота. Собираются один раз, меняются только целиком."""
+
+    practicum_token: Optional[str] = None
+    telegram_token: Optional[str] = None
+    telegram_chat_id: Optional[str] = None
+    endpoint: str = DEFAULT_ENDPOINT
+    retry_period: int = DEFAULT_RETRY_PERIOD
+    tenants: Tuple[TenantSettings, ...] = field(default=())
+    # Лимиты запросов к API, запросов в секунду; None - без лимита.
+    rate_limit: Optional[float] = None
+    rate_burst: int = 1
+    tenant_rate_limit: Optional[float] = None
+    tenant_rate_burst: int = 1
+    # Запасной запрос к API, если ответа нет дольше p95 задержки.
+    hedge_requests: bool = False
+    hedge_max_ratio: float = 0.05
+    # Кэш проверенных ответов API: срок жизни, секунды, и размер.
+    cache_ttl: float = 60.0
+    cache_size: int = 1024
+    # Чаще опрашивать, когда по журналу вердикт вероятен.
+    adaptive_polling: bool = True
+    # Сводка статусов за окно, секунды; None - каждое сообщение сразу.
+    digest_window: Optional[float] = None
+    digest_max_items: int = 20
+    # Получатели помимо основного чата, см. parse_routes.
+    routes: Tuple[Route, ...] = field(default=())
+    # Адрес проверки здоровья GET /health; None - сервер не запускается.
+    health_host: str = '127.0.0.1'
+    health_port: Optional[int] = None
+    # Бюджет состояния подписчиков в памяти и предел RSS процесса, байт.
+    state_memory_budget: int = 64 * 1024 * 1024
+    memory_limit: Optional[int] = None
+    # Протокол запросов к API и число соединений http1-pool и HTTP/2.
+    transport: str = 'http1'
+    transport_connections: int = 2
+    # Для транспорта http1-pool: кэш адресов API, секунды (0 - без кэша),
+    # и запас на фоновое обновление; возобновление TLS-сессий.
+    dns_ttl: float = 300.0
+    dns_stale: float = 3600.0
+    tls_resumption: bool = True
+    # Модули с register(bus), подписчики шины событий events.EventBus.
+    plugins: Tuple[str, ...] = ()
+    # Одно сообщение-карточка на домашку, которое правится при смене статуса.
+    status_cards: bool = False
+    # Очередь уведомлений перед отправкой (0 - отправка сразу из опроса)
+    # и сколько опрос ждёт места в полной очереди, секунды.
+    send_queue_size: int = 0
+    send_queue_wait: float = 5.0
+
+    @cached_property
+    def missing_tokens(self) -> Tuple[str, ...]:
+        """Переменные окружения, которых не хватает. Считается один раз."""
+        return tuple(
+            ENV_NAMES[name]
+            for name in REQUIRED_FIELDS
+            if getattr(self, name) is None
+        )
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """Заголовки запроса к API для основного токена."""
+        return {'Authorization': f'OAuth {self.practicum_token}'}
+
+    def tenant(self, name: str) -> TenantSettings:
+        """Настройки подписчика с подставленными общими значениями."""
+        for tenant in self.tenants:
+            if tenant.name == name:
+                return replace(
+                    tenant,
+                    practicum_token=(
+                        tenant.practicum_token or self.practicum_token
+                    ),
+                    chat_id=tenant.chat_id or self.telegram_chat_id,
+                    retry_period=tenant.retry_period or self.retry_period,
+                )
+        raise ConfigError(f'Неизвестный подписчик {name}')
+
+    def all_tenants(self) -> Tuple[TenantSettings, ...]:
+        """Основной подписчик, если задан его токен, и все из tenants."""
+        default = (
+            (
+                TenantSettings(
+                    DEFAULT_TENANT,
+                    self.practicum_token,
+                    self.telegram_chat_id,
+                    self.retry_period,
+                ),
+            )
+            if self.practicum_token
+            else ()
+        )
+        return default + tuple(
+            self.tenant(tenant.name) for tenant in self.tenants
+        )
+
+
+def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    """Разбираем аргументы командной строки."""
+    parser = argparse.ArgumentParser(description='Бот статусов домашек')
+    parser.add_argument('--config', help='json-файл с настройками')
+    parser.add_argument('--endpoint')
+    parser.add_argument('--retry-period', type=int, dest='retry_period')
+    return parser.parse_args(list(argv))
+
+
+def read_config_file(path: Optional[str]) -> Dict[str, Any]:
+    """Читаем json-файл настроек, пустой словарь если файл не задан."""
+    if not path:
+        return {}
+    try:
+        with open(path, encoding='UTF-8') as file:
+            data = json.load(file)
+    except (OSError, ValueError) as error:
+        raise ConfigError(f'Не удалось прочитать {path}: {error}')
+    if not isinstance(data, dict):
+        raise ConfigError(f'В {path} ожидается json-объект')
+    return data
+
+
+def parse_routes(
+    routes: Mapping[str, Sequence[Mapping]]
+) -> Tuple[Route, ...]:
+    """Маршруты из вида {"tenant": [{"webhook": "http://..."}, ...]}."""
+    parsed = tuple(
+        Route(tenant, kind, str(target))
+        for tenant, items in dict(routes).items()
+        for item in items
+        for kind, target in dict(item).items()
+    )
+    for route in parsed:
+        if route.kind not in ROUTE_KINDS:
+            raise ConfigError(
+                f'Неизвестный вид получателя {route.kind}, '
+                f'допустимы {ROUTE_KINDS}'
+            )
+    return parsed
+
+
+def build_settings(values: Mapping[str, Any]) -> Settings:
+    """Собираем и проверяем Settings из словаря значений."""
+    known = {item.name for item in fields(Settings)}
+    unknown = set(values) - known
+    if unknown:
+        raise ConfigError(f'Неизвестные параметры настроек {sorted(unknown)}')
+    values = dict(values)
+    try:
+        values['tenants'] = tuple(
+            TenantSettings(name=name, **(options or {}))
+            for name, options in dict(values.get('tenants') or {}).items()
+        )
+        values['routes'] = parse_routes(values.get('routes') or {})
+        values['plugins'] = tuple(values.get('plugins') or ())
+        if values.get('transport', 'http1') not in TRANSPORTS:
+            raise ConfigError(
+                f'Неизвестный протокол {values["transport"]}, '
+                f'допустимы {TRANSPORTS}'
+            )
+        for name, (convert, is_valid, rule) in NUMERIC_FIELDS.items():
+            if values.get(name) is None:
+                continue
+            values[name] = convert(values[name])
+            if not is_valid(values[name]):
+                raise ConfigError(f'{name} должен быть {rule}')
+    except (TypeError, ValueError) as error:
+        raise ConfigError(f'Некорректные настройки: {error}')
+    return Settings(**values)
+
+
+def load_settings(
+    argv: Sequence[str] = (),
+    environ: Optional[Mapping[str, str]] = None,
+    overrides: Optional[Mapping[str, Any]] = None,
+) -> Settings:
+    """Собираем настройки из всех источников.
+    Значения None в overrides считаются незаданными.
+    """
+    environ = os.environ if environ is None else environ
+    args = parse_args(argv)
+    values: Dict[str, Any] = read_config_file(
+        args.config or environ.get(CONFIG_FILE_ENV)
+    )
+    values.update(
+        (name, environ[env_name])
+        for name, env_name in ENV_NAMES.items()
+        if environ.get(env_name)
+    )
+    for source in (overrides or {}, vars(args)):
+        values.update(
+            (name, value)
+            for name, value in source.items()
+            if value is not None and name != 'config'
+        )
+    return build_settings(values)
+
+
+class SettingsStore:
+    """Текущие настройки с перечиткой по SIGHUP.
+    Обработчик сигнала ставит флаг и прерывает паузу между опросами
+    (см. interruptible()), новые настройки подхватываются
+    в reload_if_requested().
+    refresh обновляет источники перед перечиткой, например .env.
+    """
+
+    def __init__(self, refresh: Optional[Callable[[], None]] = None) -> None:
+        self.refresh = refresh
+        self._current: Optional[Settings] = None
+        self._argv: Sequence[str] = ()
+        self._overrides: Mapping[str, Any] = {}
+        self._reload_requested: bool = False
+        self._interruptible: bool = False
+        self._previous_handler: Any = None
+
+    @property
+    def current(self) -> Settings:
+        """Действующие настройки, при первом обращении собираются."""
+        if self._current is None:
+            self._current = load_settings(self._argv, None, self._overrides)
+        return self._current
+
+    def load(
+        self,
+        argv: Optional[Sequence[str]] = None,
+        overrides: Optional[Mapping[str, Any]] = None,
+    ) -> Settings:
+        """Собираем настройки заново; None оставляет прежние источники."""
+        if argv is not None:
+            self._argv = tuple(argv)
+        if overrides is not None:
+            self._overrides = dict(overrides)
+        self._current = load_settings(self._argv, None, self._overrides)
+        return self._current
+
+    def use_args(self, argv: Sequence[str]) -> None:
+        """Аргументы командной строки для следующих загрузок."""
+        self._argv = tuple(argv)
+
+    def request_reload(self, signum: int = None, frame: Any = None) -> None:
+        """Обработчик SIGHUP: просим перечитать настройки."""
+        self._reload_requested = True
+        if self._interruptible:
+            raise ReloadRequested('Перечитываем настройки')
+
+    @contextmanager
+    def interruptible(self) -> Iterator[None]:
+        """Участок, который SIGHUP прерывает сразу, как паузу опроса."""
+        if self._reload_requested:
+            raise ReloadRequested('Перечитывание запрошено ранее')
+        self._interruptible = True
+        try:
+            yield
+        finally:
+            self._interruptible = False
+
+    def reload_if_requested(self) -> bool:
+        """Перечитываем настройки, если был SIGHUP.
+        При ошибке остаются прежние настройки.
+        """
+        if not self._reload_requested:
+            return False
+        self._reload_requested = False
+        try:
+            if self.refresh is not None:
+                self.refresh()
+            self.load()
+        except ConfigError as error:
+            logging.error(f'Настройки не перечитаны: {error}')
+            return False
+        logging.info('Настройки перечитаны')
+        return True
+
+    def install(self) -> None:
+        """Подписываемся на SIGHUP."""
+        self._previous_handler = signal.signal(
+            signal.SIGHUP, self.request_reload
+        )
+
+    def restore(self) -> None:
+        """Возвращаем прежний обработчик SIGHUP."""
+        if self._previous_handler is not None:
+            signal.signal(signal.SIGHUP, self._previous_handler)
+            self._previous_handler = None
@@ -0,0 +1,171 @@
+"""Сводки для чатов: смены статусов копятся и уходят одним сообщением.
+Созревшие сводки отправляет собственный фоновый поток, а не цикл опроса.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, FrozenSet, List, Optional, Tuple
+
+from clock import Clock, InjectedClock
+from metrics import METRICS, MetricsRegistry
+
+# Вердикты отправляются сразу, не дожидаясь сводки.
+IMMEDIATE_STATUSES: FrozenSet[str] = frozenset({'approved', 'rejected'})
+DIGEST_TITLE: str = 'Сводка за {minutes} мин.:'
+# Сколько чатов одновременно могут ждать сводку.
+MAX_PENDING_CHATS: int = 100
+
+Outgoing = List[Tuple[str, str]]
+# Отправка в чат: чат, текст.
+Send = Callable[[str, str], None]
+
+
+class _Pending:
+    """Накопленные сообщения одного чата; повторы считаются, а не копятся."""
+
+    def __init__(self, started_at: float) -> None:
+        self.started_at = started_at
+        self.lines: 'OrderedDict[str, int]' = OrderedDict()
+
+
+class DigestBuffer:
+    """Копит сообщения по чатам и отдаёт сводки по истечении окна.
+    Без окна (window=None) каждое сообщение отдаётся сразу.
+    Методы возвращают пары (чат, текст), отправка - забота вызывающего.
+    """
+
+    clock = InjectedClock()
+
+    def __init__(
+        self,
+        window: Optional[float] = None,
+        max_items: int = 20,
+        max_chats: int = MAX_PENDING_CHATS,
+        clock: Optional[Clock] = None,
+        metrics: MetricsRegistry = METRICS,
+    ) -> None:
+        self.window = window
+        self.max_items = max_items
+        self.max_chats = max_chats
+        self.clock = clock
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        # Держит порядок: что буфер отдал раньше, раньше и отправляется.
+        self.order = threading.RLock()
+        self._pending: 'OrderedDict[str, _Pending]' = OrderedDict()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Включён ли режим сводок."""
+        return self.window is not None
+
+    def configure(self, window: Optional[float], max_items: int) -> None:
+        """Меняем окно и размер сводки; при выключении отдайте drain()."""
+        with self._lock:
+            self.window, self.max_items = window, max_items
+
+    def pending(self) -> int:
+        """Сколько сообщений ждут отправки во всех чатах."""
+        with self._lock:
+            return sum(len(item.lines) for item in self._pending.values())
+
+    def add(self, chat_id: str, text: str, urgent: bool = False) -> Outgoing:
+        """Добавляем сообщение, возвращаем то, что надо отправить сейчас.
+        Срочное сообщение уходит сразу, но после накопленной сводки
+        чата, переполненная сводка - тоже. Отправляйте под order.
+        """
+        if not self.enabled:
+            return [(chat_id, text)]
+        outgoing: Outgoing = []
+        with self._lock:
+            if urgent:
+                if chat_id in self._pending:
+                    outgoing.append(self._take(chat_id))
+                    self._update_gauge()
+                outgoing.append((chat_id, text))
+                return outgoing
+            pending = self._pending.get(chat_id)
+            if pending is None:
+                if len(self._pending) >= self.max_chats:
+                    oldest = next(iter(self._pending))
+                    outgoing.append(self._take(oldest))
+                    self.metrics.inc('digest.overflows')
+                pending = self._pending[chat_id] = _Pending(self.clock.time())
+            pending.lines[text] = pending.lines.get(text, 0) + 1
+            if len(pending.lines) >= self.max_items:
+                outgoing.append(self._take(chat_id))
+                self.metrics.inc('digest.overflows')
+            self._update_gauge()
+        return outgoing
+
+    def due(self) -> Outgoing:
+        """Сводки чатов, у которых истекло окно."""
+        with self._lock:
+            if not self._pending:
+                return []
+            deadline = self.clock.time() - (self.window or 0)
+            outgoing = [
+                self._take(chat_id)
+                for chat_id, pending in list(self._pending.items())
+                if pending.started_at <= deadline
+            ]
+            self._update_gauge()
+        return outgoing
+
+    def drain(self) -> Outgoing:
+        """Все накопленные сводки, например перед остановкой бота."""
+        with self._lock:
+            outgoing = [self._take(chat_id) for chat_id in list(self._pending)]
+            self._update_gauge()
+        return outgoing
+
+    def start(self, send: Send, interval: float = 1.0) -> None:
+        """Запускаем поток, который отправляет созревшие сводки."""
+        if self._worker is not None:
+            return
+        self._stop.clear()
+        self._worker = threading.Thread(
+            target=self._run, args=(send, interval), name='digest', daemon=True
+        )
+        self._worker.start()
+
+    def stop(self) -> None:
+        """Останавливаем поток сводок; остаток заберите через drain()."""
+        if self._worker is not None:
+            self._stop.set()
+            self._worker.join()
+            self._worker = None
+
+    def render(self, pending: _Pending) -> str:
+        """Текст сводки: заголовок и по строке на сообщение."""
+        minutes = max(1, round((self.clock.time() - pending.started_at) / 60))
+        lines = [DIGEST_TITLE.format(minutes=minutes)]
+        for text, count in pending.lines.items():
+            lines.append(f'• {text}' + (f' (×{count})' if count > 1 else ''))
+        return '\n'.join(lines)
+
+    def _run(self, send: Send, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                with self.order:
+                    for chat_id, text in self.due():
+                        send(chat_id, text)
+            except Exception as error:
+                logging.error(f'Сбой отправки сводок: {error}')
+
+    def _take(self, chat_id: str) -> Tuple[str, str]:
+        pending = self._pending.pop(chat_id)
+        self.metrics.inc('digest.sent')
+        if len(pending.lines) == 1:
+            (text, count), = pending.lines.items()
+            if count == 1:
+                return chat_id, text
+        return chat_id, self.render(pending)
+
+    def _update_gauge(self) -> None:
+        self.metrics.set(
+            'digest.pending',
+            sum(len(item.lines) for item in self._pending.values()),
+        )
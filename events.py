@@ -0,0 +1,222 @@
+"""Шина событий опроса: смена статуса, сбой опроса, сбой отправки.
+Подписчики - обычные функции (вызываются сразу в потоке события)
+и корутины (выполняются в собственном цикле asyncio шины). Таблица
+обработчиков по типу события пересчитывается при подписке, поэтому
+публикация - один поиск в словаре, а emit() не создаёт событие,
+на которое никто не подписан.
+
+Плагины - модули с функцией register(bus), перечисленные в plugins.
+"""
+import importlib
+import inspect
+import logging
+import threading
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from exceptions import ConfigError
+from metrics import METRICS, MetricsRegistry
+
+Handler = Callable[[Any], Any]
+# Обработчик и признак корутины, вычисленный при подписке.
+Dispatch = Tuple[Handler, bool]
+# Тип события или кортеж типов, как в isinstance.
+EventTypes = Union[type, Tuple[type, ...]]
+# Сколько ждём незавершённые корутины при остановке, секунды.
+SHUTDOWN_TIMEOUT: float = 5.0
+
+
+class PollSucceeded(NamedTuple):
+    """Успешный опрос API подписчика."""
+
+    tenant: str
+    timestamp: int
+    homeworks: int
+
+
+class HomeworkStatusChanged(NamedTuple):
+    """Новый статус домашки и текст уведомления о нём."""
+
+    tenant: str
+    homework: str
+    status: str
+    message: str
+
+
+class PollFailed(NamedTuple):
+    """Сбой опроса; notified - ушло ли сообщение об ошибке."""
+
+    tenant: str
+    error: Exception
+    notified: bool
+
+
+class MessageSent(NamedTuple):
+    """Telegram принял сообщение."""
+
+    chat_id: str
+    text: str
+
+
+class MessageFailed(NamedTuple):
+    """Telegram не принял сообщение."""
+
+    chat_id: str
+    text: str
+    error: Exception
+
+
+# Подписка на EVENTS получает все события.
+EVENTS: Tuple[type, ...] = (
+    PollSucceeded,
+    HomeworkStatusChanged,
+    PollFailed,
+    MessageSent,
+    MessageFailed,
+)
+
+
+class EventBus:
+    """Синхронная и асинхронная доставка событий подписчикам.
+    Ошибка подписчика пишется в лог и не мешает остальным.
+    """
+
+    def __init__(self, metrics: MetricsRegistry = METRICS) -> None:
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self._subscriptions: List[Tuple[Tuple[type, ...], Dispatch]] = []
+        self._table: Dict[type, Tuple[Dispatch, ...]] = {}
+        self._loop: Any = None
+        self._thread: Optional[threading.Thread] = None
+
+    def __bool__(self) -> bool:
+        return bool(self._table)
+
+    def subscribe(
+        self, event_type: EventTypes, handler: Handler
+    ) -> Callable[[], None]:
+        """Подписка на event_type или кортеж типов; возвращает отписку."""
+        event_types = (
+            event_type if isinstance(event_type, tuple) else (event_type,)
+        )
+        subscription = (
+            event_types, (handler, inspect.iscoroutinefunction(handler))
+        )
+        with self._lock:
+            self._subscriptions.append(subscription)
+            self._rebuild()
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if subscription in self._subscriptions:
+                    self._subscriptions.remove(subscription)
+                    self._rebuild()
+
+        return unsubscribe
+
+    def active(self, event_type: type) -> bool:
+        """Есть ли подписчики на события типа event_type."""
+        return event_type in self._table
+
+    def emit(self, event_type: type, **fields: Any) -> None:
+        """Создаём и публикуем событие, только если на него подписаны."""
+        handlers = self._table.get(event_type)
+        if handlers is not None:
+            self._dispatch(event_type(**fields), handlers)
+
+    def publish(self, event: Any) -> None:
+        """Передаём готовое событие подписчикам."""
+        handlers = self._table.get(type(event))
+        if handlers is not None:
+            self._dispatch(event, handlers)
+
+    def load_plugins(self, names: Sequence[str]) -> None:
+        """Импортируем модули плагинов и вызываем их register(bus)."""
+        for name in names:
+            try:
+                register = importlib.import_module(name).register
+            except (ImportError, AttributeError) as error:
+                raise ConfigError(
+                    f'Не удалось загрузить плагин {name}: {error}'
+                )
+            register(self)
+            logging.info(f'Подключён плагин {name}')
+
+    def shutdown(self) -> None:
+        """Ждём начатые корутины и останавливаем цикл asyncio."""
+        import asyncio
+
+        loop, thread = self._loop, self._thread
+        if loop is None:
+            return
+
+        async def drain() -> None:
+            current = asyncio.current_task()
+            pending = [
+                task for task in asyncio.all_tasks() if task is not current
+            ]
+            if pending:
+                await asyncio.wait(pending, timeout=SHUTDOWN_TIMEOUT)
+
+        asyncio.run_coroutine_threadsafe(drain(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+        self._loop = self._thread = None
+
+    def _dispatch(self, event: Any, handlers: Tuple[Dispatch, ...]) -> None:
+        self.metrics.inc(f'events.{type(event).__name__}')
+        for handler, is_async in handlers:
+            try:
+                if is_async:
+                    self._schedule(handler, event)
+                else:
+                    handler(event)
+            except Exception as error:
+                self._failed(handler, event, error)
+
+    def _rebuild(self) -> None:
+        table: Dict[type, Tuple[Dispatch, ...]] = {}
+        for event_types, dispatch in self._subscriptions:
+            for event_type in event_types:
+                table[event_type] = table.get(event_type, ()) + (dispatch,)
+        # Читатели берут словарь без замка, поэтому подменяем его целиком.
+        self._table = table
+
+    def _schedule(self, handler: Handler, event: Any) -> None:
+        import asyncio
+
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name='events', daemon=True
+                )
+                self._thread.start()
+        asyncio.run_coroutine_threadsafe(
+            self._guard(handler, event), self._loop
+        )
+
+    async def _guard(self, handler: Handler, event: Any) -> None:
+        try:
+            await handler(event)
+        except Exception as error:
+            self._failed(handler, event, error)
+
+    def _failed(
+        self, handler: Handler, event: Any, error: Exception
+    ) -> None:
+        self.metrics.inc('events.handler_errors')
+        logging.error(
+            f'Подписчик {getattr(handler, "__qualname__", handler)} '
+            f'не обработал {type(event).__name__}: {error}'
+        )
@@ -1,12 +1,42 @@
-class OnlyForLoggingsError(Exception):
+"""Ошибки бота и политика реакции на них.
+Флаги класса подсказывают циклу опроса и очереди сообщений, что делать:
+retryable - повтор того же запроса может помочь;
+transient - сбой временный, повторить стоит раньше обычного: через backoff,
+удваивая паузу с каждым сбоем подряд, но не реже обычного опроса;
+slowdown - сервер просит опрашивать реже: пауза не короче backoff
+и не короче обычного периода;
+fatal - без вмешательства человека не исправить, опрос надо остановить;
+notify - сообщать ли в Telegram: всегда, один раз на серию или никогда.
+"""
+from typing import Dict, NamedTuple, Optional, Type
+
+NOTIFY_ALWAYS: str = 'always'
+NOTIFY_ONCE: str = 'once'
+NOTIFY_NEVER: str = 'never'
+# Дальше удваивать бессмысленно: пауза всё равно упрётся в период.
+MAX_BACKOFF_DOUBLINGS: int = 32
+
+
+class BotError(Exception):
+    """Базовый класс ошибок бота с флагами политики."""
+
+    retryable: bool = True
+    transient: bool = False
+    fatal: bool = False
+    backoff: Optional[float] = None
+    notify: str = NOTIFY_ALWAYS
+    slowdown: bool = False
+
+
+class OnlyForLoggingsError(BotError):
     """Все ошибки, которые будут наследоваться от этого супер-класса.
     будут только логироваться без вывода сообщения в телеграмм.
     """
 
-    pass
+    notify = NOTIFY_NEVER
 
 
-class UnexpectedStatusError(Exception):
+class UnexpectedStatusError(BotError):
     """Вызывается, если неожиданный статус домашней работы.
     обнаруженный в ответе API
     """
@@ -14,28 +44,60 @@ class UnexpectedStatusError(Exception):
     pass
 
 
-class HomeWorkStatusError(Exception):
+class ApiServerError(UnexpectedStatusError):
+    """Вызывается, если API ответил 5xx: сервер перегружен."""
+
+    transient = True
+    backoff = 60.0
+    notify = NOTIFY_ONCE
+
+
+class ApiThrottledError(UnexpectedStatusError):
+    """Вызывается, если API ответил 429: опрашиваем слишком часто.
+    retry_after - пауза из заголовка Retry-After, секунды.
+    """
+
+    slowdown = True
+    notify = NOTIFY_ONCE
+
+    def __init__(self, *args: object, retry_after: Optional[float] = None):
+        super().__init__(*args)
+        self.backoff = retry_after
+
+
+class ApiAuthError(UnexpectedStatusError):
+    """Вызывается, если API отклонил токен: 401 или 403."""
+
+    retryable = False
+    fatal = True
+
+
+class HomeWorkStatusError(BotError):
     """Вызывается, если статус домашнего задания не изменился."""
 
     pass
 
 
-class DecoderError(Exception):
+class DecoderError(BotError):
     """Вызывается, если проблемы с декодировкой json."""
 
-    pass
+    transient = True
+    backoff = 60.0
+    notify = NOTIFY_ONCE
 
 
-class MessageError(Exception):
+class MessageError(BotError):
     """Вызывается, если неудается отправить сообщение в Телеграм."""
 
     pass
 
 
-class ApiConnectionError(Exception):
+class ApiConnectionError(BotError):
     """Вызывается, если ошибка соединения с API."""
 
-    pass
+    transient = True
+    backoff = 30.0
+    notify = NOTIFY_ONCE
 
 
 class CurrentDateKeyError(OnlyForLoggingsError):
@@ -48,3 +110,123 @@ class CurrentDateTypeError(OnlyForLoggingsError):
     """Вызывается, если тип current_date не int."""
 
     pass
+
+
+class ShutdownRequested(BaseException):
+    """Вызывается обработчиком SIGTERM/SIGINT, чтобы прервать паузу.
+    Наследуется от BaseException, чтобы не попасть в общий
+    обработчик ошибок цикла опроса.
+    """
+
+    pass
+
+
+class ReloadRequested(BaseException):
+    """Вызывается обработчиком SIGHUP, чтобы прервать паузу.
+    Настройки перечитываются сразу, не дожидаясь следующего опроса.
+    """
+
+    pass
+
+
+class ConfigError(BotError):
+    """Вызывается, если настройки бота заданы некорректно."""
+
+    retryable = False
+    fatal = True
+
+
+class ErrorPolicy(NamedTuple):
+    """Как реагировать на ошибку, см. флаги BotError."""
+
+    retryable: bool = True
+    transient: bool = False
+    fatal: bool = False
+    backoff: Optional[float] = None
+    notify: str = NOTIFY_ALWAYS
+    slowdown: bool = False
+
+    def next_delay(
+        self, period: float, failures: int = 1
+    ) -> Optional[float]:
+        """Пауза до следующего опроса; None - опрос надо остановить.
+        failures - сколько опросов подряд закончились ошибкой.
+        """
+        if self.fatal:
+            return None
+        if self.slowdown:
+            return max(self.backoff or 0.0, period)
+        if self.transient and self.backoff is not None:
+            exponent = min(max(failures, 1) - 1, MAX_BACKOFF_DOUBLINGS)
+            return min(self.backoff * 2 ** exponent, period)
+        return period
+
+
+DEFAULT_POLICY: ErrorPolicy = ErrorPolicy()
+# Ошибки сторонних библиотек по имени класса, чтобы не импортировать
+# telegram и requests ради классификации.
+EXTERNAL_POLICIES: Dict[str, ErrorPolicy] = {
+    'RetryAfter': ErrorPolicy(transient=True, notify=NOTIFY_ONCE),
+    'TimedOut': ErrorPolicy(transient=True, notify=NOTIFY_ONCE),
+    'NetworkError': ErrorPolicy(transient=True, notify=NOTIFY_ONCE),
+    'BadRequest': ErrorPolicy(retryable=False),
+    'Forbidden': ErrorPolicy(retryable=False),
+    'ChatMigrated': ErrorPolicy(retryable=False),
+    'Unauthorized': ErrorPolicy(retryable=False, fatal=True),
+    'InvalidToken': ErrorPolicy(retryable=False, fatal=True),
+}
+
+
+def error_policy(error: Optional[BaseException]) -> ErrorPolicy:
+    """Политика для ошибки: флаги BotError или таблица по имени класса.
+    Ближайший класс в MRO выигрывает; без ошибки - обычный опрос.
+    """
+    if isinstance(error, BotError):
+        return ErrorPolicy(
+            error.retryable,
+            error.transient,
+            error.fatal,
+            error.backoff,
+            error.notify,
+            error.slowdown,
+        )
+    for cls in type(error).__mro__:
+        policy = EXTERNAL_POLICIES.get(cls.__name__)
+        if policy is not None:
+            retry_after = getattr(error, 'retry_after', None)
+            if retry_after:
+                return policy._replace(backoff=float(retry_after))
+            return policy
+    return DEFAULT_POLICY
+
+
+def status_error(status_code: int) -> Type[UnexpectedStatusError]:
+    """Класс ошибки для кода ответа API, отличного от 200."""
+    if status_code in (401, 403):
+        return ApiAuthError
+    if status_code == 429:
+        return ApiThrottledError
+    if status_code >= 500:
+        return ApiServerError
+    return UnexpectedStatusError
+
+
+def retry_after_seconds(value: Optional[str], now: float) -> Optional[float]:
+    """Пауза из заголовка Retry-After: секунды или дата HTTP.
+    Нечитаемый заголовок - паузы нет, как и без заголовка.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    # email тянет за собой десяток модулей, а дата в заголовке редкость.
+    from email.utils import parsedate_to_datetime
+
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        return None
+    return max(moment.timestamp() - now, 0.0)
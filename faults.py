@@ -0,0 +1,383 @@
+"""Внедрение сбоев в HTTP и Telegram и нагрузочный прогон конвейера.
+Обёртки подменяют HTTPAdapter.send и бота: задержки, таймауты, 5xx,
+обрезанный json, TelegramError с retry_after. Выше адаптера всё
+настоящее: requests.get, разжатие и учёт трафика в Transport.
+Случайность задаётся seed, поэтому прогон воспроизводим. Время
+виртуальное (VirtualClock).
+
+Запуск: python faults.py [--polls N] [--seed N] [профиль ...]
+"""
+import argparse
+import gzip
+import io
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from http import HTTPStatus
+from types import ModuleType
+from typing import (
+    Any, Callable, Dict, Iterator, NamedTuple, Optional, Sequence
+)
+
+from clock import VirtualClock, get_clock, use_clock
+from exceptions import error_policy
+
+STATUSES: Sequence[str] = ('reviewing', 'approved', 'rejected')
+# Шаг виртуального времени при замере восстановления, секунды.
+RECOVERY_STEP: float = 1.0
+
+
+@dataclass(frozen=True)
+class FaultProfile:
+    """Вероятности сбоев на один запрос и их параметры."""
+
+    name: str
+    latency: float = 0.0
+    latency_rate: float = 0.0
+    timeout_rate: float = 0.0
+    server_error_rate: float = 0.0
+    truncated_json_rate: float = 0.0
+    telegram_error_rate: float = 0.0
+    retry_after: int = 5
+
+
+CLEAN: FaultProfile = FaultProfile('clean')
+PROFILES: Dict[str, FaultProfile] = {
+    profile.name: profile
+    for profile in (
+        CLEAN,
+        FaultProfile('slow_api', latency=20.0, latency_rate=0.5),
+        FaultProfile('flaky_api', timeout_rate=0.2, server_error_rate=0.2),
+        FaultProfile('broken_json', truncated_json_rate=0.3),
+        FaultProfile('telegram_flood', telegram_error_rate=0.5),
+        FaultProfile(
+            'everything',
+            latency=10.0,
+            latency_rate=0.2,
+            timeout_rate=0.1,
+            server_error_rate=0.1,
+            truncated_json_rate=0.1,
+            telegram_error_rate=0.2,
+        ),
+    )
+}
+
+
+def fake_response(
+    adapter: Any,
+    request: Any,
+    status_code: int,
+    body: bytes,
+    headers: Optional[Dict[str, str]] = None,
+) -> Any:
+    """Настоящий requests.Response, как его собрал бы HTTPAdapter.
+    Тело читается из памяти потоком, без предзагрузки.
+    """
+    from urllib3 import HTTPResponse
+
+    raw = HTTPResponse(
+        body=io.BytesIO(body),
+        headers=headers or {},
+        status=status_code,
+        reason=HTTPStatus(status_code).phrase,
+        preload_content=False,
+        decode_content=False,
+    )
+    return adapter.build_response(request, raw)
+
+
+@contextmanager
+def serving(send: Callable[..., Any]) -> Iterator[None]:
+    """Запросы requests уходят в send(adapter, request, **kwargs)."""
+    from requests.adapters import HTTPAdapter
+
+    def adapter_send(adapter: Any, request: Any, **kwargs: Any) -> Any:
+        return send(adapter, request, **kwargs)
+
+    original = HTTPAdapter.send
+    HTTPAdapter.send = adapter_send
+    try:
+        yield
+    finally:
+        HTTPAdapter.send = original
+
+
+class FakePracticum:
+    """API Практикума: на каждый запрос одна домашка со случайным статусом."""
+
+    def __init__(self, seed: int = 0) -> None:
+        self.random = random.Random(seed)
+        self.requests = 0
+
+    def send(self, adapter: Any, request: Any, **kwargs: Any) -> Any:
+        """Ответ на GET homework_statuses, сжатый, если клиент согласен."""
+        self.requests += 1
+        body = json.dumps({
+            'homeworks': [{
+                'homework_name': f'hw{self.requests % 7}',
+                'status': self.random.choice(STATUSES),
+            }],
+            'current_date': int(get_clock().time()) or 1,
+        }).encode()
+        headers = {'Content-Type': 'application/json'}
+        if 'gzip' in request.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            headers['Content-Encoding'] = 'gzip'
+        return fake_response(adapter, request, 200, body, headers)
+
+
+class FaultInjector:
+    """Оборачивает HTTP-клиент и бота, внося сбои по профилю."""
+
+    def __init__(self, profile: FaultProfile, seed: int = 0) -> None:
+        self.profile = profile
+        self.random = random.Random(seed)
+        self.injected: Dict[str, int] = {}
+
+    def http_send(self, send: Callable[..., Any]) -> Callable[..., Any]:
+        """Обёртка над функцией с сигнатурой HTTPAdapter.send."""
+        import requests
+
+        def faulty_send(adapter: Any, request: Any, **kwargs: Any) -> Any:
+            profile = self.profile
+            if self._roll('latency', profile.latency_rate):
+                get_clock().sleep(profile.latency)
+            if self._roll('timeout', profile.timeout_rate):
+                raise requests.exceptions.ReadTimeout('Injected timeout')
+            if self._roll('server_error', profile.server_error_rate):
+                return fake_response(
+                    adapter, request, 503, b'Service Unavailable'
+                )
+            response = send(adapter, request, **kwargs)
+            if self._roll('truncated_json', profile.truncated_json_rate):
+                body = response.raw.read()
+                return fake_response(
+                    adapter,
+                    request,
+                    response.status_code,
+                    body[:len(body) // 2],
+                    dict(response.headers),
+                )
+            return response
+
+        return faulty_send
+
+    def bot(self, bot: Any) -> Any:
+        """Бот, send_message которого иногда отвечает RetryAfter."""
+        injector = self
+
+        class FaultyBot:
+            def __getattr__(self, name: str) -> Any:
+                return getattr(bot, name)
+
+            def send_message(self, *args: Any, **kwargs: Any) -> Any:
+                if injector._roll(
+                    'telegram_error', injector.profile.telegram_error_rate
+                ):
+                    from telegram.error import RetryAfter
+
+                    raise RetryAfter(injector.profile.retry_after)
+                return bot.send_message(*args, **kwargs)
+
+        return FaultyBot()
+
+    def _roll(self, fault: str, rate: float) -> bool:
+        if rate <= 0 or self.random.random() >= rate:
+            return False
+        self.injected[fault] = self.injected.get(fault, 0) + 1
+        return True
+
+
+class SilentBot:
+    """Бот, который принимает все сообщения."""
+
+    def __init__(self) -> None:
+        self.sent = 0
+
+    def send_message(self, chat_id: Any, text: str = '', **kwargs: Any):
+        """Считаем сообщение отправленным."""
+        self.sent += 1
+
+
+class LoadReport(NamedTuple):
+    """Итоги прогона профиля."""
+
+    profile: str
+    polls: int
+    failed_polls: int
+    messages: int
+    injected: Dict[str, int]
+    wall_seconds: float
+    polls_per_second: float
+    virtual_hours: float
+    recovery_seconds: float
+    wire_bytes: int
+
+
+@contextmanager
+def isolated(homework: ModuleType, directory: str) -> Iterator[Any]:
+    """Свежие экземпляры всех синглтонов бота на время прогона.
+    Журнал, очереди, кэши, метрики и здоровье - новые, файлы - в directory,
+    так что прогон не трогает ни рабочие файлы, ни состояние процесса.
+    Отдаёт метрики прогона.
+    """
+    from analytics import PollAdvisor
+    from backpressure import SendQueue
+    from bandwidth import BandwidthReport
+    from cache import ResponseCache
+    from cards import StatusCardStore
+    from digest import DigestBuffer
+    from events import EventBus
+    from health import HealthState
+    from hedging import Hedger
+    from metrics import MetricsRegistry
+    from netcache import NetworkCache
+    from outbox import Outbox
+    from profiling import Profiler
+    from ratelimit import RateLimiter
+    from routing import Router
+    from storage import TimelineStore
+    from tiering import TieredStateStore
+    from transport import Transport
+
+    metrics = MetricsRegistry()
+    timeline = TimelineStore(os.path.join(directory, 'timeline'))
+    outbox = Outbox(os.path.join(directory, 'outbox.jsonl'), metrics=metrics)
+    digest = DigestBuffer(metrics=metrics)
+    sender = SendQueue(metrics=metrics)
+    health = HealthState(homework.RETRY_PERIOD)
+    health.add_queue('outbox', outbox.__len__)
+    health.add_queue('digest', digest.pending)
+    health.add_queue('send', sender.__len__)
+    network = NetworkCache(metrics=metrics)
+    fresh = {
+        'METRICS': metrics,
+        'LIMITER': RateLimiter(metrics=metrics),
+        'HEDGER': Hedger(metrics=metrics),
+        'CACHE': ResponseCache(metrics=metrics),
+        'TRANSPORT': Transport(metrics=metrics, network=network),
+        'BANDWIDTH': BandwidthReport(metrics=metrics),
+        'NETWORK': network,
+        'BUS': EventBus(metrics),
+        'CARDS': StatusCardStore(os.path.join(directory, 'cards.json')),
+        'SENDER': sender,
+        'TIMELINE': timeline,
+        'ADVISOR': PollAdvisor(timeline),
+        'STATES': TieredStateStore(
+            os.path.join(directory, 'tenants'),
+            on_evict=timeline.forget,
+            metrics=metrics,
+        ),
+        'DIGEST': digest,
+        'ROUTER': Router(metrics=metrics),
+        'OUTBOX': outbox,
+        'PROFILER': Profiler(directory),
+        'HEALTH': health,
+        'TELEGRAM_CHAT_ID': homework.TELEGRAM_CHAT_ID or 'load',
+    }
+    previous = {name: getattr(homework, name) for name in fresh}
+    for name, value in fresh.items():
+        setattr(homework, name, value)
+    try:
+        yield metrics
+    finally:
+        sender.shutdown()
+        fresh['HEDGER'].shutdown()
+        fresh['ROUTER'].shutdown()
+        fresh['TRANSPORT'].close()
+        fresh['STATES'].close()
+        timeline.close()
+        outbox.close()
+        for name, value in previous.items():
+            setattr(homework, name, value)
+
+
+def run_load(
+    profile: FaultProfile,
+    polls: int = 1000,
+    seed: int = 0,
+    retry_period: float = 600,
+) -> LoadReport:
+    """Прогоняем polls опросов под сбоями, затем снимаем сбои.
+    Восстановление - виртуальное время от снятия сбоев до момента,
+    когда опрос успешен и очередь сообщений пуста.
+    """
+    import homework
+
+    clock = VirtualClock(start=1)
+    injector = FaultInjector(profile, seed)
+    backend = FakePracticum(seed)
+    bot = SilentBot()
+    faulty_bot = injector.bot(bot)
+
+    def retry_outbox() -> None:
+        homework.OUTBOX.retry_due(
+            lambda chat_id, text: faulty_bot.send_message(chat_id, text=text)
+        )
+
+    failed = 0
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory() as directory, use_clock(clock):
+        with isolated(homework, directory) as metrics, serving(
+            injector.http_send(backend.send)
+        ):
+            timestamp, error, failures = 0, None, 0
+            for _ in range(polls):
+                timestamp, error = homework.poll_once(
+                    faulty_bot, timestamp, error
+                )
+                failed += error is not None
+                failures = failures + 1 if error is not None else 0
+                retry_outbox()
+                clock.sleep(
+                    error_policy(error).next_delay(retry_period, failures)
+                )
+            wall = time.perf_counter() - started
+            faulty_until = clock.time()
+            injector.profile = replace(CLEAN, name=profile.name)
+            next_poll = clock.time()
+            while error is not None or len(homework.OUTBOX):
+                if error is not None and clock.time() >= next_poll:
+                    timestamp, error = homework.poll_once(
+                        faulty_bot, timestamp, error
+                    )
+                    next_poll = clock.time() + retry_period
+                retry_outbox()
+                clock.sleep(RECOVERY_STEP)
+            recovery = clock.time() - faulty_until
+            wire = sum(metrics.counters('bandwidth.wire.').values())
+    return LoadReport(
+        profile.name,
+        polls,
+        failed,
+        bot.sent,
+        dict(injector.injected),
+        wall,
+        polls / wall if wall else float('inf'),
+        faulty_until / 3600,
+        recovery,
+        wire,
+    )
+
+
+def main(argv: Sequence[str]) -> None:
+    """Прогон выбранных профилей с выводом отчёта."""
+    parser = argparse.ArgumentParser(description='Нагрузка со сбоями')
+    parser.add_argument('profiles', nargs='*', default=list(PROFILES))
+    parser.add_argument('--polls', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(list(argv))
+    logging.disable(logging.CRITICAL)
+    for name in args.profiles:
+        report = run_load(PROFILES[name], args.polls, args.seed)
+        print(json.dumps(report._asdict(), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,265 @@
+"""Локальная проверка здоровья бота по HTTP для оркестратора.
+GET /health отвечает json-отчётом: 503, если какой-то подписчик
+не завершал опрос дольше STALE_FACTOR его периодов (или с запуска):
+зависший запрос к API так отличается от обычной паузы между опросами.
+Если опросы идут, но API отвечает ошибками, бот "degraded" и отвечает
+200 - перезапуск бота сбой API не исправит. Так же "degraded" бот,
+у которого опрос подписчика снят после фатальной ошибки.
+GET /status?tenant=имя отдаёт текущие статусы домашек подписчика
+из общего с опросом кэша ответов.
+"""
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from clock import Clock, InjectedClock
+from config import DEFAULT_TENANT
+
+# Во сколько периодов опроса без успешного ответа бот считается зависшим.
+# Адаптивная пауза бывает до двух периодов, поэтому берём с запасом.
+STALE_FACTOR: float = 3.0
+HEALTH_PATH: str = '/health'
+STATUS_PATH: str = '/status'
+STATUS_OK: str = 'ok'
+STATUS_DEGRADED: str = 'degraded'
+STATUS_UNHEALTHY: str = 'unhealthy'
+
+
+class HealthState:
+    """Отметки главного цикла; запись - пара присваиваний под замком."""
+
+    clock = InjectedClock()
+
+    def __init__(
+        self, retry_period: float = 600, clock: Optional[Clock] = None
+    ) -> None:
+        self.retry_period = retry_period
+        self.clock = clock
+        self.started_at: float = self.clock.time()
+        self._lock = threading.Lock()
+        self._api_ok: Dict[str, float] = {}
+        self._polled: Dict[str, float] = {}
+        self._periods: Dict[str, float] = {}
+        self._stopped: Dict[str, str] = {}
+        # С какого момента подписчика опрашивают, если не с запуска.
+        self._since: Dict[str, float] = {}
+        # До set_tenants судим по подписчикам, которых уже опрашивали.
+        self._registered: bool = False
+        self._last_send: Optional[Dict[str, Any]] = None
+        self._queues: Dict[str, Callable[[], int]] = {}
+
+    def set_tenants(self, periods: Mapping[str, float]) -> None:
+        """Подписчики, которых сейчас опрашивают, и их периоды опроса.
+        Подписчик без единого опроса считается зависшим от запуска,
+        добавленный позже - от момента добавления.
+        """
+        now = self.clock.time()
+        with self._lock:
+            if self._registered:
+                self._since = {
+                    tenant: self._since.get(tenant, self.started_at)
+                    if tenant in self._periods
+                    else now
+                    for tenant in periods
+                }
+            self._registered = True
+            self._periods = dict(periods)
+            self._stopped = {
+                tenant: reason
+                for tenant, reason in self._stopped.items()
+                if tenant not in self._periods
+            }
+
+    def stop_tenant(self, tenant: str, reason: str) -> None:
+        """Опрос подписчика снят после фатальной ошибки.
+        Он больше не может зависнуть: бот "degraded", а не нездоров -
+        перезапуск ошибку настроек не исправит.
+        """
+        with self._lock:
+            self._periods.pop(tenant, None)
+            self._stopped[tenant] = reason
+
+    def api_succeeded(self, tenant: str) -> None:
+        """Успешный ответ API для подписчика."""
+        with self._lock:
+            self._api_ok[tenant] = self._polled[tenant] = self.clock.time()
+
+    def api_failed(self, tenant: str) -> None:
+        """Опрос подписчика завершился ошибкой: опрос жив, API - нет."""
+        with self._lock:
+            self._polled[tenant] = self.clock.time()
+
+    def message_sent(self, ok: bool, error: Optional[str] = None) -> None:
+        """Результат последней отправки в Telegram."""
+        with self._lock:
+            self._last_send = {
+                'at': self.clock.time(), 'ok': ok, 'error': error,
+            }
+
+    def add_queue(self, name: str, depth: Callable[[], int]) -> None:
+        """Очередь, глубину которой показываем в отчёте."""
+        self._queues[name] = depth
+
+    def report(self) -> Tuple[bool, Dict[str, Any]]:
+        """Здоров ли бот и подробности для ответа."""
+        now = self.clock.time()
+        with self._lock:
+            api_ok = dict(self._api_ok)
+            polled = dict(self._polled)
+            periods = dict(self._periods)
+            stopped = dict(self._stopped)
+            names = set(periods if self._registered else polled)
+            since = dict(self._since)
+            last_send = self._last_send
+        tenants = {
+            tenant: self._tenant_report(
+                now,
+                STALE_FACTOR * periods.get(tenant, self.retry_period),
+                polled.get(tenant),
+                api_ok.get(tenant),
+                since.get(tenant, self.started_at),
+            )
+            for tenant in names - set(stopped)
+        }
+        if tenants or stopped:
+            healthy = not any(item['stale'] for item in tenants.values())
+            degraded = bool(stopped) or any(
+                item['degraded'] for item in tenants.values()
+            )
+        else:
+            # Подписчиков не знаем: отсчитываем от запуска.
+            healthy = (
+                now - self.started_at <= STALE_FACTOR * self.retry_period
+            )
+            degraded = False
+        queues = {}
+        for name, depth in self._queues.items():
+            try:
+                queues[name] = depth()
+            except Exception as error:
+                queues[name] = f'error: {error}'
+        if not healthy:
+            status = STATUS_UNHEALTHY
+        elif degraded:
+            status = STATUS_DEGRADED
+        else:
+            status = STATUS_OK
+        return healthy, {
+            'healthy': healthy,
+            'status': status,
+            'uptime': now - self.started_at,
+            'tenants': tenants,
+            'stopped': stopped,
+            'last_send': last_send,
+            'queues': queues,
+        }
+
+    def _tenant_report(
+        self,
+        now: float,
+        limit: float,
+        polled: Optional[float],
+        succeeded: Optional[float],
+        since: float,
+    ) -> Dict[str, Any]:
+        staleness = now - max(polled or since, since)
+        outage = now - max(succeeded or since, since)
+        stale = staleness > limit
+        return {
+            'last_poll': polled,
+            'last_success': succeeded,
+            'staleness': staleness,
+            'stale_after': limit,
+            'stale': stale,
+            'degraded': not stale and outage > limit,
+        }
+
+
+def status_reply(
+    statuses: Callable[[str], Dict[str, Any]], tenant: str
+) -> Tuple[int, Any]:
+    """Код и тело ответа /status; без tenant - основной подписчик."""
+    tenant = tenant or DEFAULT_TENANT
+    try:
+        return 200, statuses(tenant)
+    except KeyError:
+        return 404, {'error': f'Нет подписчика {tenant}'}
+    except Exception as error:
+        return 502, {'error': str(error)}
+
+
+class HealthServer:
+    """HTTP-сервер с /health и /status в отдельном потоке.
+    statuses(tenant) - ответ API подписчика для /status, без него
+    /status не обслуживается.
+    """
+
+    def __init__(
+        self,
+        state: HealthState,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        statuses: Optional[Callable[[str], Dict[str, Any]]] = None,
+    ) -> None:
+        self.state = state
+        self.statuses = statuses
+        self.host = host
+        self.port = port
+        self._server: Any = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Адрес, на котором слушает сервер; порт 0 выбирает ОС."""
+        return self._server.server_address[:2]
+
+    def start(self) -> None:
+        """Запускаем сервер, если он ещё не запущен."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        if self._server is not None:
+            return
+        state, statuses = self.state, self.statuses
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                url = urlsplit(self.path)
+                if url.path == HEALTH_PATH:
+                    healthy, report = state.report()
+                    self.reply(200 if healthy else 503, report)
+                elif url.path == STATUS_PATH and statuses is not None:
+                    tenant = parse_qs(url.query).get('tenant', [''])[0]
+                    self.reply(*status_reply(statuses, tenant))
+                else:
+                    self.send_error(404)
+
+            def reply(self, code: int, report: Any) -> None:
+                body = json.dumps(report, ensure_ascii=False).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                logging.debug(f'health: {format % args}')
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name='health', daemon=True
+        )
+        self._thread.start()
+        host, port = self.address
+        logging.info(f'Проверка здоровья: http://{host}:{port}{HEALTH_PATH}')
+
+    def stop(self) -> None:
+        """Останавливаем сервер."""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = self._thread = None
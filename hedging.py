@@ -0,0 +1,138 @@
+"""Запасные (hedged) запросы к API против долгих хвостов задержки.
+Если ответа нет дольше p95 наблюдаемой задержки, отправляем второй
+такой же запрос и берём тот ответ, что придёт первым. Запасной запрос
+уходит, только если admit() разрешает его, например лимит запросов.
+"""
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import Callable, Dict, List, Optional, TypeVar
+
+from metrics import METRICS, MetricsRegistry
+
+T = TypeVar('T')
+# Сколько всего ждём ответа на запрос с запасным, секунды.
+HEDGE_TIMEOUT: float = 60.0
+
+
+class Hedger:
+    """Выполняет запросы, при задержке дублирует их.
+    Доля дублей ограничена max_ratio от всех запросов.
+    """
+
+    def __init__(
+        self,
+        name: str = 'api',
+        max_ratio: float = 0.05,
+        min_samples: int = 20,
+        workers: int = 4,
+        timeout: float = HEDGE_TIMEOUT,
+        metrics: MetricsRegistry = METRICS,
+    ) -> None:
+        self.name = name
+        self.enabled: bool = False
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.workers = workers
+        self.timeout = timeout
+        self.metrics = metrics
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def configure(self, enabled: bool, max_ratio: float) -> None:
+        """Включаем или выключаем дубли, меняем их потолок."""
+        self.enabled = enabled
+        self.max_ratio = max_ratio
+
+    def hedge_delay(self) -> Optional[float]:
+        """Через сколько секунд дублировать запрос; None - не дублировать."""
+        latency = self.metrics.histogram(f'{self.name}.latency')
+        if not self.enabled or latency.count < self.min_samples:
+            return None
+        if self._hedged() >= self.max_ratio * self._requests():
+            return None
+        return latency.percentile(95)
+
+    def call(
+        self,
+        request: Callable[[], T],
+        admit: Optional[Callable[[], bool]] = None,
+    ) -> T:
+        """Выполняем request, при необходимости с запасным запросом.
+        Без ответа за timeout секунд бросаем TimeoutError.
+        """
+        self.metrics.inc(f'{self.name}.requests')
+        started = time.monotonic()
+        delay = self.hedge_delay()
+        try:
+            if delay is None:
+                return request()
+            return self._call_hedged(request, delay, admit)
+        finally:
+            self.metrics.observe(
+                f'{self.name}.latency', time.monotonic() - started
+            )
+
+    def report(self) -> Dict[str, Optional[float]]:
+        """p50/p95/p99 задержки и доля запасных запросов."""
+        latency = self.metrics.histogram(f'{self.name}.latency')
+        requests = self._requests()
+        return {
+            'p50': latency.percentile(50),
+            'p95': latency.percentile(95),
+            'p99': latency.percentile(99),
+            'hedge_ratio': self._hedged() / requests if requests else 0.0,
+            'hedge_wins': self.metrics.counter(f'{self.name}.hedge_wins'),
+        }
+
+    def shutdown(self) -> None:
+        """Останавливаем пул потоков, не дожидаясь отставших запросов."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _call_hedged(
+        self,
+        request: Callable[[], T],
+        delay: float,
+        admit: Optional[Callable[[], bool]],
+    ) -> T:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self.workers, thread_name_prefix=f'{self.name}-hedge'
+            )
+        deadline = time.monotonic() + self.timeout
+        futures: List[Future] = [self._executor.submit(request)]
+        done, _ = wait(futures, timeout=min(delay, self.timeout))
+        if not done and admit is not None and not admit():
+            self.metrics.inc(f'{self.name}.hedge_refused')
+        elif not done:
+            self.metrics.inc(f'{self.name}.hedged')
+            futures.append(self._executor.submit(request))
+        pending = set(futures)
+        error: Optional[BaseException] = None
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(
+                    f'Нет ответа {self.name} за {self.timeout} с'
+                )
+            done, pending = wait(
+                pending, timeout=remaining, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                if future.exception() is None:
+                    if future is not futures[0]:
+                        self.metrics.inc(f'{self.name}.hedge_wins')
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _requests(self) -> int:
+        return self.metrics.counter(f'{self.name}.requests')
+
+    def _hedged(self) -> int:
+        return self.metrics.counter(f'{self.name}.hedged')
@@ -1,40 +1,111 @@
 import logging
+import math
 import os
 import sys
-import time
+from functools import partial
 from http import HTTPStatus
 from json import JSONDecodeError
-from typing import Type, List, Dict, Any, NoReturn
-
-import requests
-from telegram import Bot
-from telegram.error import TelegramError
-from dotenv import load_dotenv
-
+from typing import Type, List, Dict, Any, Optional, Sequence, Set, Tuple
+
+from analytics import PollAdvisor
+from backpressure import PRIORITY_ERROR, PRIORITY_STATUS, SendQueue
+from bandwidth import BandwidthReport
+from cache import ResponseCache
+from cards import (
+    CARD_GONE_ERRORS,
+    CARD_HISTORY,
+    StatusCard,
+    StatusCardStore,
+    render_card,
+)
+from clock import Clock, get_clock
+from config import (
+    DEFAULT_ENDPOINT,
+    DEFAULT_TENANT,
+    DEFAULT_RETRY_PERIOD,
+    Settings,
+    SettingsStore,
+    TenantSettings,
+)
+from digest import IMMEDIATE_STATUSES, DigestBuffer
+from events import (
+    EventBus,
+    HomeworkStatusChanged,
+    MessageFailed,
+    MessageSent,
+    PollFailed,
+    PollSucceeded,
+)
 from exceptions import (
+    NOTIFY_ALWAYS,
+    NOTIFY_ONCE,
     UnexpectedStatusError,
     DecoderError,
     MessageError,
     ApiConnectionError,
     CurrentDateKeyError,
     CurrentDateTypeError,
-    OnlyForLoggingsError,
+    ReloadRequested,
+    ShutdownRequested,
+    ApiThrottledError,
+    error_policy,
+    retry_after_seconds,
+    status_error,
 )
-
-
-load_dotenv()
+from health import HealthServer, HealthState
+from hedging import Hedger
+from lazy import Bot
+from lifecycle import Shutdown
+from metrics import METRICS
+from netcache import NetworkCache
+from outbox import Outbox
+from profiling import Profiler
+from ratelimit import RateLimiter
+from state import CursorStore
+from routing import Router, build_routes
+from scheduler import PollJob, PollScheduler, TimingWheelScheduler
+from storage import TimelineStore
+from tiering import TieredStateStore
+from transport import Transport
 
 
 PRACTICUM_TOKEN: str = os.getenv('PRACTIC_TOKEN')
 TELEGRAM_TOKEN: str = os.getenv('TG_TOKEN')
 TELEGRAM_CHAT_ID: str = os.getenv('CHAT_ID')
-ENDPOINT: str = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
+ENDPOINT: str = DEFAULT_ENDPOINT
 HEADERS: Dict[str, str] = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
-RETRY_PERIOD: int = 600
+RETRY_PERIOD: int = DEFAULT_RETRY_PERIOD
 ERROR_MESSAGE: str = 'Сбой в работе программы: '
+# Токены, которые apply_settings последним скопировал в модуль.
+MIRRORED_TOKENS: Dict[str, Optional[str]] = {
+    'practicum_token': PRACTICUM_TOKEN,
+    'telegram_token': TELEGRAM_TOKEN,
+    'telegram_chat_id': TELEGRAM_CHAT_ID,
+}
+# Переменные окружения, взятые из .env, а не из окружения процесса.
+DOTENV_NAMES: Set[str] = set()
+# Нижнее колесо опросов - 2048 тиков по секунде: пауза до двух периодов
+# по умолчанию ставится сразу на свой тик, без спуска с верхнего уровня.
+POLL_WHEEL_SLOTS: int = 2048
+POLL_WHEEL_LEVELS: int = 2
 DONT_CHANGE_STATUS_MSG: str = 'C крайней проверки, статус не изменился'
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 LOG_FILE_DIR = os.path.join(SCRIPT_DIR, 'program.log')
+STATE_FILE_DIR = os.getenv(
+    'STATE_FILE', os.path.join(SCRIPT_DIR, 'state.json')
+)
+TIMELINE_FILE_DIR = os.getenv(
+    'TIMELINE_FILE', os.path.join(SCRIPT_DIR, 'timeline.sqlite3')
+)
+OUTBOX_FILE_DIR = os.getenv(
+    'OUTBOX_FILE', os.path.join(SCRIPT_DIR, 'outbox.jsonl')
+)
+CARDS_FILE_DIR = os.getenv(
+    'CARDS_FILE', os.path.join(SCRIPT_DIR, 'cards.json')
+)
+TENANT_STATE_FILE_DIR = os.getenv(
+    'TENANT_STATE_FILE', os.path.join(SCRIPT_DIR, 'tenants.sqlite3')
+)
 HOMEWORK_VERDICTS: Dict[str, str] = {
     'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
     'reviewing': 'Работа взята на проверку ревьюером.',
@@ -42,27 +113,114 @@ HOMEWORK_VERDICTS: Dict[str, str] = {
 }
 EXCEPTIONS_MESSAGE: Dict[Type[Exception], str] = {
     MessageError: 'Cбой при отправке сообщения в Telegram',
-    requests.exceptions.RequestException: 'Возникла проблема с запросом',
     UnexpectedStatusError: f'Недоступен {ENDPOINT}.',
     JSONDecodeError: 'Возникла проблема с декодировкой json',
+    DecoderError: 'Возникла проблема с декодировкой json',
     TypeError: 'Тип данных API не соотвествует',
     KeyError: 'Ошибка с ключами homework_name, status',
     ApiConnectionError: 'Ошибка соединения с API',
-    Exception: '{ERROR_MESSAGE}',
+    Exception: ERROR_MESSAGE,
 }
-ENV_TOKENS: List[str] = [
-    'PRACTICUM_TOKEN',
-    'TELEGRAM_TOKEN',
-    'TELEGRAM_CHAT_ID',
-    'ENDPOINT',
-]
+SETTINGS: SettingsStore = SettingsStore(refresh=lambda: load_environment())
+LIMITER: RateLimiter = RateLimiter()
+HEDGER: Hedger = Hedger()
+CACHE: ResponseCache = ResponseCache()
+NETWORK: NetworkCache = NetworkCache()
+TRANSPORT: Transport = Transport(network=NETWORK)
+BANDWIDTH: BandwidthReport = BandwidthReport()
+BUS: EventBus = EventBus()
+CARDS: StatusCardStore = StatusCardStore(CARDS_FILE_DIR)
+SENDER: SendQueue = SendQueue()
+TIMELINE: TimelineStore = TimelineStore(TIMELINE_FILE_DIR)
+ADVISOR: PollAdvisor = PollAdvisor(TIMELINE)
+STATES: TieredStateStore = TieredStateStore(
+    TENANT_STATE_FILE_DIR, on_evict=lambda tenant: TIMELINE.forget(tenant)
+)
+DIGEST: DigestBuffer = DigestBuffer()
+ROUTER: Router = Router()
+OUTBOX: Outbox = Outbox(OUTBOX_FILE_DIR)
+PROFILER: Profiler = Profiler(os.path.dirname(LOG_FILE_DIR))
+HEALTH: HealthState = HealthState(RETRY_PERIOD)
+HEALTH.add_queue('outbox', OUTBOX.__len__)
+HEALTH.add_queue('digest', DIGEST.pending)
+HEALTH.add_queue('send', SENDER.__len__)
+
+
+def apply_settings(settings: Settings) -> None:
+    """Переносим действующие настройки в константы модуля."""
+    global PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID
+    global ENDPOINT, HEADERS, RETRY_PERIOD
+    PRACTICUM_TOKEN = settings.practicum_token
+    TELEGRAM_TOKEN = settings.telegram_token
+    TELEGRAM_CHAT_ID = settings.telegram_chat_id
+    ENDPOINT = settings.endpoint
+    HEADERS = settings.headers
+    RETRY_PERIOD = settings.retry_period
+    MIRRORED_TOKENS.update(module_tokens())
+    LIMITER.configure(
+        settings.rate_limit,
+        settings.rate_burst,
+        settings.tenant_rate_limit,
+        settings.tenant_rate_burst,
+    )
+    HEDGER.configure(settings.hedge_requests, settings.hedge_max_ratio)
+    CACHE.configure(settings.cache_ttl, settings.cache_size)
+    ADVISOR.enabled = settings.adaptive_polling
+    DIGEST.configure(settings.digest_window, settings.digest_max_items)
+    HEALTH.retry_period = settings.retry_period
+    STATES.configure(settings.state_memory_budget, settings.memory_limit)
+    CARDS.enabled = settings.status_cards
+    SENDER.configure(settings.send_queue_size, settings.send_queue_wait)
+    TRANSPORT.configure(settings.transport, settings.transport_connections)
+    NETWORK.configure(
+        settings.dns_ttl, settings.dns_stale, settings.tls_resumption
+    )
+
+
+def module_tokens() -> Dict[str, Optional[str]]:
+    """Токены в константах модуля."""
+    return {
+        'practicum_token': PRACTICUM_TOKEN,
+        'telegram_token': TELEGRAM_TOKEN,
+        'telegram_chat_id': TELEGRAM_CHAT_ID,
+    }
+
+
+def load_environment() -> None:
+    """Подгружаем .env, окружение процесса приоритетнее файла.
+    При повторном вызове значения, взятые из .env, обновляются.
+    """
+    from dotenv import dotenv_values
+
+    for name, value in dotenv_values().items():
+        if value is None or (
+            name in os.environ and name not in DOTENV_NAMES
+        ):
+            continue
+        os.environ[name] = value
+        DOTENV_NAMES.add(name)
+
+
+def configure(argv: Optional[Sequence[str]] = None) -> Settings:
+    """Подгружаем .env и собираем настройки.
+    Токен, присвоенный в модуле в обход настроек, приоритетнее файла
+    и окружения. Значения, скопированные в модуль apply_settings,
+    переопределением не считаются, иначе их не сменить перечиткой.
+    """
+    load_environment()
+    explicit: Dict[str, Optional[str]] = {
+        name: value
+        for name, value in module_tokens().items()
+        if value != MIRRORED_TOKENS[name]
+    }
+    settings: Settings = SETTINGS.load(argv, overrides=explicit or None)
+    apply_settings(settings)
+    return settings
 
 
 def check_tokens() -> bool:
     """Убеждаемся что все данные окружения присуствуют."""
-    uncorrect_token: List = list(
-        filter(lambda env_name: globals()[env_name] is None, ENV_TOKENS)
-    )
+    uncorrect_token = SETTINGS.current.missing_tokens
     if uncorrect_token:
         logging.critical(
             f'Отсутствие обязательных переменных окружения {uncorrect_token}'
@@ -70,36 +228,286 @@ def check_tokens() -> bool:
     return not uncorrect_token
 
 
-def send_message(bot: Type[Bot], message: Any = None) -> str:
-    """Бот отправляет сообщение о неисправности в случае."""
+def send_message(bot: Type[Bot], message: Any = None) -> bool:
+    """Бот отправляет сообщение о неисправности в случае.
+    Возвращаем False, если Telegram сообщение не принял.
+    """
+    return send_to_chat(bot, TELEGRAM_CHAT_ID, message)
+
+
+def send_to_chat(bot: Type[Bot], chat_id: str, message: Any) -> bool:
+    """Отправка в чат подписчика, False - если Telegram не принял."""
+    from telegram.error import TelegramError
+
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, text=message)
+        bot.send_message(chat_id, text=message)
     except TelegramError as error:
         logging.error(
             f'{error} Неудачная отправка сообщения в Telegram: "{message}"'
         )
+        HEALTH.message_sent(False, str(error))
+        BUS.emit(MessageFailed, chat_id=chat_id, text=message, error=error)
+        return False
+    logging.debug(f'Удачная отправка сообщения в Telegram: "{message}"')
+    HEALTH.message_sent(True)
+    BUS.emit(MessageSent, chat_id=chat_id, text=message)
+    return True
+
+
+def chat_for(tenant: str) -> str:
+    """Чат подписчика в Telegram."""
+    if tenant == DEFAULT_TENANT:
+        return TELEGRAM_CHAT_ID
+    return SETTINGS.current.tenant(tenant).chat_id
+
+
+class RecordingBot:
+    """Бот, запоминающий ошибку отправки, которую перехватил вызов выше."""
+
+    def __init__(self, bot: Type[Bot]) -> None:
+        """Оборачиваем bot, ошибки пока нет."""
+        self.bot = bot
+        self.error: Optional[Exception] = None
+
+    def __getattr__(self, name: str) -> Any:
+        """Остальные методы - напрямую у бота."""
+        return getattr(self.bot, name)
+
+    def send_message(self, *args: Any, **kwargs: Any) -> Any:
+        """send_message бота с запоминанием ошибки."""
+        try:
+            return self.bot.send_message(*args, **kwargs)
+        except Exception as error:
+            self.error = error
+            raise
+
+
+def deliver(
+    bot: Type[Bot], message: str, tenant: str = DEFAULT_TENANT
+) -> None:
+    """Сообщение в чат подписчика и параллельно всем доп. получателям.
+    До отправки сообщение пишется в очередь на диске и остаётся за нами
+    до конца попытки; если Telegram его не принял, очередь повторит
+    отправку в фоне с паузой по ошибке (например, retry_after).
+    """
+    default: bool = tenant == DEFAULT_TENANT
+    chat_id: str = chat_for(tenant)
+    entry_id: int = OUTBOX.put(chat_id, message)
+    attempt = RecordingBot(bot)
+    try:
+        with ROUTER.fan_out(tenant, message):
+            sent: Optional[bool] = (
+                send_message(attempt, message=message)
+                if default
+                else send_to_chat(attempt, chat_id, message)
+            )
+    except Exception as error:
+        OUTBOX.retry_later(entry_id, error)
+        raise
+    if sent is False:
+        OUTBOX.retry_later(entry_id, attempt.error)
     else:
-        logging.debug(f'Удачная отправка сообщения в Telegram: "{message}"')
+        OUTBOX.ack(entry_id)
+
+
+def notify(
+    bot: Type[Bot],
+    message: str,
+    urgent: bool = False,
+    tenant: str = DEFAULT_TENANT,
+    priority: int = PRIORITY_STATUS,
+) -> None:
+    """Сообщение в чат сразу или через сводку, если она включена.
+    У каждого подписчика свой чат, поэтому сводки ведутся по подписчикам.
+    Отправка идёт через очередь SENDER, если она включена.
+    """
+    with DIGEST.order:
+        for _, text in DIGEST.add(tenant, message, urgent):
+            send_digest(bot, tenant, text, priority)
 
 
-def get_api_answer(timestamp: int) -> Dict[str, Any]:
-    """Отправляем запрос к эндпоинту и проверяем статус ответа."""
+def edit_card(bot: Type[Bot], card: StatusCard, text: str) -> bool:
+    """Правим текст карточки, False - если её уже нельзя править.
+    Прочие сбои уходят выше: правка откладывается в CARDS и
+    повторяется в фоне, не занимая поток опроса.
+    """
+    from telegram.error import BadRequest, TelegramError
+
+    try:
+        bot.edit_message_text(
+            text, chat_id=card.chat_id, message_id=card.message_id
+        )
+    except BadRequest as error:
+        reason: str = str(error).lower()
+        # Тот же текст - карточка уже актуальна.
+        if 'not modified' in reason:
+            return True
+        logging.warning(f'Карточка {card.message_id} не обновлена: {error}')
+        METRICS.inc('cards.edit_failed')
+        if any(gone in reason for gone in CARD_GONE_ERRORS):
+            return False
+        raise
+    except TelegramError as error:
+        logging.warning(f'Карточка {card.message_id} не обновлена: {error}')
+        METRICS.inc('cards.edit_failed')
+        raise
+    METRICS.inc('cards.edited')
+    return True
+
+
+def post_card(bot: Type[Bot], chat_id: str, text: str) -> Optional[int]:
+    """Новая карточка, возвращаем id сообщения или None при сбое."""
+    from telegram.error import TelegramError
+
+    try:
+        sent = bot.send_message(chat_id, text=text)
+    except TelegramError as error:
+        logging.error(f'{error} Неудачная отправка карточки: "{text}"')
+        HEALTH.message_sent(False, str(error))
+        BUS.emit(MessageFailed, chat_id=chat_id, text=text, error=error)
+        return None
+    HEALTH.message_sent(True)
+    BUS.emit(MessageSent, chat_id=chat_id, text=text)
+    METRICS.inc('cards.created')
+    return sent.message_id
+
+
+def update_card(
+    bot: Type[Bot],
+    message: str,
+    homework: str,
+    status: str,
+    tenant: str = DEFAULT_TENANT,
+) -> None:
+    """Смена статуса в карточке домашки вместо нового сообщения.
+    Если карточки нет или Telegram её больше не правит, карточка
+    начинается заново; новое сообщение при сбое уходит в очередь
+    повторов. Неудавшаяся правка откладывается в CARDS, пока она
+    ждёт повтора, новые статусы копятся в ней же.
+    Доп. получатели получают обычное уведомление.
+    """
+    chat_id: str = chat_for(tenant)
+    card: Optional[StatusCard] = CARDS.get(tenant, homework)
+    history = ((card.history if card else ()) + (status,))[-CARD_HISTORY:]
+    text: str = render_card(message, history)
+    with ROUTER.fan_out(tenant, message):
+        if card is not None and card.chat_id == chat_id:
+            card = card._replace(history=history)
+            if card.pending is not None:
+                pending: StatusCard = card._replace(pending=text)
+                CARDS.retry_later(tenant, homework, pending)
+                return
+            try:
+                if edit_card(bot, card, text):
+                    CARDS.put(tenant, homework, card)
+                    return
+            except Exception as error:
+                CARDS.retry_later(
+                    tenant, homework, card._replace(pending=text), error
+                )
+                return
+        message_id: Optional[int] = start_card(bot, chat_id, text)
+    if message_id is not None:
+        CARDS.put(tenant, homework, StatusCard(chat_id, message_id, history))
+
+
+def start_card(bot: Type[Bot], chat_id: str, text: str) -> Optional[int]:
+    """Новая карточка, при сбое - None и сообщение в очереди повторов."""
+    bot = RecordingBot(bot)
+    message_id: Optional[int] = post_card(bot, chat_id, text)
+    if message_id is None:
+        OUTBOX.retry_later(OUTBOX.put(chat_id, text), bot.error)
+    return message_id
+
+
+def retry_card(
+    bot: Type[Bot], tenant: str, homework: str, card: StatusCard
+) -> None:
+    """Повтор отложенной правки из фонового потока CARDS.
+    Временный сбой уходит выше, и CARDS повторит позже; карточку,
+    которую больше не поправить, начинаем заново.
+    """
+    text: str = card.pending
+    try:
+        edited: bool = edit_card(bot, card, text)
+    except Exception as error:
+        if error_policy(error).retryable:
+            raise
+        edited = False
+    if not edited:
+        message_id: Optional[int] = start_card(bot, card.chat_id, text)
+        if message_id is not None:
+            card = StatusCard(card.chat_id, message_id, card.history)
+    CARDS.settle(tenant, homework, text, card._replace(pending=None))
+
+
+def send_digest(
+    bot: Type[Bot],
+    tenant: str,
+    text: str,
+    priority: int = PRIORITY_STATUS,
+) -> None:
+    """Сообщение или сводку из DIGEST - в очередь отправки подписчика."""
+    SENDER.submit(
+        (tenant, text), partial(deliver, bot, text, tenant), priority
+    )
+
+
+def flush_digests(bot: Type[Bot], everything: bool = False) -> None:
+    """Отправляем созревшие сводки, а с everything=True - все.
+    По ходу работы это делает поток DIGEST, см. DigestBuffer.start.
+    """
+    with DIGEST.order:
+        for tenant, text in DIGEST.drain() if everything else DIGEST.due():
+            send_digest(bot, tenant, text)
+
+
+def fetch_statuses(
+    timestamp: int,
+    tenant: str = DEFAULT_TENANT,
+    headers: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """Запрос к эндпоинту от имени подписчика tenant.
+    Перед запросом ждём разрешения общего и личного лимита,
+    запасной запрос уходит, только если разрешение есть сразу.
+    """
+    LIMITER.acquire(tenant)
     try:
-        response = requests.get(
-            ENDPOINT,
-            headers=HEADERS,
-            params={'from_date': timestamp},
+        response = HEDGER.call(
+            partial(
+                TRANSPORT.get,
+                ENDPOINT,
+                headers=headers or HEADERS,
+                params={'from_date': timestamp},
+                tenant=tenant,
+            ),
+            admit=partial(LIMITER.try_acquire, tenant),
         )
+        if response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+            logging.info(f'Стаус ответа {response.status_code}')
+            raise ApiThrottledError(
+                f'API просит опрашивать реже: {ENDPOINT}',
+                retry_after=retry_after_seconds(
+                    response.headers.get('Retry-After'), get_clock().time()
+                ),
+            )
         if response.status_code != HTTPStatus.OK:
             logging.info(f'Стаус ответа {response.status_code}')
-            raise UnexpectedStatusError(
+            raise status_error(response.status_code)(
                 f'Недоступен {ENDPOINT}. Статус ответа {response.status_code}'
             )
-        return response.json()
-    except requests.exceptions.RequestException as error:
-        raise ApiConnectionError(f'Ошибка соединения с API {error}')
+        answer: Dict[str, Any] = response.json()
+        HEALTH.api_succeeded(tenant)
+        return answer
     except JSONDecodeError as error:
         raise DecoderError(f'Возникла проблема с декодировкой .json {error}')
+    except TimeoutError as error:
+        raise ApiConnectionError(f'Ошибка соединения с API: {error}')
+
+
+def get_api_answer(timestamp: int) -> Dict[str, Any]:
+    """Отправляем запрос к эндпоинту и проверяем статус ответа."""
+    return fetch_statuses(timestamp)
 
 
 def check_response(response: Dict) -> List:
@@ -142,43 +550,325 @@ def parse_status(homework: Dict) -> str:
     return f'Изменился статус проверки работы "{name}". {verdict}'
 
 
-def main() -> NoReturn:
-    """Основная логика работы бота."""
-    if not check_tokens():
-        sys.exit('Ошибка c переменными окружения. Смотрите логи.')
+def request_statuses(
+    timestamp: int,
+    tenant: str = DEFAULT_TENANT,
+    headers: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """Запрос к API с проверкой check_response, без кэша."""
+    response: Dict = fetch_statuses(timestamp, tenant, headers)
+    check_response(response)
+    return response
+
+
+def load_statuses(
+    timestamp: int,
+    tenant: str = DEFAULT_TENANT,
+    headers: Optional[Dict[str, str]] = None,
+    refresh: bool = False,
+) -> Dict[str, Any]:
+    """Проверенный ответ API подписчика из кэша или свежий.
+    Ключ кэша - подписчик и from_date=timestamp. Одновременные запросы
+    с тем же курсором делят один запрос; опрос с refresh=True всегда
+    идёт в API.
+    """
+    return CACHE.get(
+        (tenant, timestamp),
+        partial(request_statuses, timestamp, tenant, headers),
+        refresh=refresh,
+    )
 
-    bot: Type[Bot] = Bot(token=TELEGRAM_TOKEN)
-    timestamp: int = int(time.time())
 
-    logging.info('Бот начал работу')
+def latest_statuses(tenant: str = DEFAULT_TENANT) -> Dict[str, Any]:
+    """Текущие статусы всех домашек подписчика для запросов по требованию.
+    Ответ с from_date=0 живёт в кэше: повторные запросы в пределах
+    cache_ttl не доходят до API. KeyError - подписчик не настроен.
+    """
+    tenants: Dict[str, TenantSettings] = {
+        settings.name: settings for settings in SETTINGS.current.all_tenants()
+    }
+    if tenant not in tenants:
+        raise KeyError(f'Нет подписчика {tenant}')
+    headers: Optional[Dict[str, str]] = (
+        None if tenant == DEFAULT_TENANT else tenants[tenant].headers
+    )
+    return load_statuses(0, tenant, headers)
 
-    while True:
-        try:
-            response: Dict = get_api_answer(timestamp)
-            answer_server: List = check_response(response)
-            timestamp: int = response['current_date']
 
-            if answer_server:
-                send_message(bot, message=parse_status(answer_server[0]))
-                logging.info(parse_status(answer_server))
+def record_timeline(tenant: str, response: Dict[str, Any]) -> None:
+    """Пишем смены статусов из ответа в журнал одной пачкой.
+    Сбой журнала не должен мешать уведомлениям.
+    """
+    try:
+        for homework in response['homeworks']:
+            TIMELINE.record(tenant, homework, response['current_date'])
+        TIMELINE.flush()
+    except Exception as error:
+        logging.error(f'Не удалось записать журнал статусов: {error}')
+
+
+def error_message(error: BaseException) -> str:
+    """Текст ошибки для Телеграм по ближайшему классу в MRO."""
+    for cls in type(error).__mro__:
+        if cls in EXCEPTIONS_MESSAGE:
+            message: str = EXCEPTIONS_MESSAGE[cls]
+            return f'{message}{error}' if cls is Exception else message
+    return f'{ERROR_MESSAGE}{error}'
+
+
+def poll_once(
+    bot: Type[Bot],
+    timestamp: int,
+    last_error: Optional[Exception] = None,
+    tenant: Optional[TenantSettings] = None,
+) -> Tuple[int, Optional[Exception]]:
+    """Один опрос API: отправляем новый статус или ошибку в Телеграм.
+    Возвращаем курсор для следующего опроса и ошибку опроса, если была.
+    Об ошибке с политикой NOTIFY_ONCE сообщаем только в начале серии.
+    Без tenant опрашиваем основной токен.
+    """
+    name: str = DEFAULT_TENANT if tenant is None else tenant.name
+    try:
+        response: Dict = load_statuses(
+            timestamp,
+            name,
+            None if tenant is None else tenant.headers,
+            refresh=True,
+        )
+        answer_server: List = response['homeworks']
+        timestamp: int = response['current_date']
+        record_timeline(name, response)
+        BUS.emit(
+            PollSucceeded,
+            tenant=name,
+            timestamp=timestamp,
+            homeworks=len(answer_server),
+        )
 
+        if answer_server:
+            message: str = parse_status(answer_server[0])
+            BUS.emit(
+                HomeworkStatusChanged,
+                tenant=name,
+                homework=answer_server[0].get('homework_name'),
+                status=answer_server[0].get('status'),
+                message=message,
+            )
+            if CARDS.enabled:
+                SENDER.submit(
+                    (name, message),
+                    partial(
+                        update_card,
+                        bot,
+                        message,
+                        answer_server[0].get('homework_name'),
+                        answer_server[0].get('status'),
+                        name,
+                    ),
+                )
             else:
-                logging.info(DONT_CHANGE_STATUS_MSG)
-
-        except OnlyForLoggingsError as error:
-            logging.error(
-                f'{error.__class__.__name__}: {error}',
-                exc_info=True,
+                notify(
+                    bot,
+                    message,
+                    urgent=(
+                        answer_server[0].get('status') in IMMEDIATE_STATUSES
+                    ),
+                    tenant=name,
+                )
+            logging.info(message)
+
+        else:
+            logging.info(DONT_CHANGE_STATUS_MSG)
+
+    except Exception as error:
+        logging.error(
+            f'{error.__class__.__name__}: {error}',
+            exc_info=True,
+        )
+        HEALTH.api_failed(name)
+        policy = error_policy(error)
+        notified: bool = policy.notify == NOTIFY_ALWAYS or (
+            policy.notify == NOTIFY_ONCE
+            and type(error) is not type(last_error)
+        )
+        if notified:
+            notify(
+                bot, error_message(error), tenant=name, priority=PRIORITY_ERROR
             )
-        except Exception as error:
-            error_msg: str = EXCEPTIONS_MESSAGE.get(error.__class__)
-            logging.error(
-                f'{error.__class__.__name__}: {error_msg}',
-                exc_info=True,
+        BUS.emit(PollFailed, tenant=name, error=error, notified=notified)
+        return timestamp, error
+    return timestamp, None
+
+
+def make_poll_job(
+    bot: Type[Bot], tenant: TenantSettings, timestamp: int
+) -> PollJob:
+    """Задача планировщика: конвейер опроса одного подписчика.
+    Пауза до следующего запуска - по политике ошибки и журналу статусов,
+    после фатальной ошибки опрос подписчика снимается до перечитывания
+    настроек.
+    """
+
+    def job() -> Optional[float]:
+        state = STATES.get(tenant.name, timestamp)
+        state.statuses = TIMELINE.adopt(tenant.name, state.statuses)
+        state.cursor, state.error = poll_once(
+            bot, state.cursor, state.error, tenant
+        )
+        state.failures = state.failures + 1 if state.error else 0
+        STATES.put(state)
+        delay: Optional[float] = error_policy(state.error).next_delay(
+            ADVISOR.delay(tenant.name, tenant.retry_period), state.failures
+        )
+        if delay is None:
+            logging.critical(
+                f'Опрос подписчика {tenant.name} остановлен: {state.error}'
             )
-            send_message(bot, message=f'{error_msg}')
-        finally:
-            time.sleep(RETRY_PERIOD)
+            HEALTH.stop_tenant(tenant.name, str(state.error))
+        return delay
+
+    return job
+
+
+def schedule_tenants(
+    scheduler: PollScheduler,
+    bot: Type[Bot],
+    settings: Settings,
+    timestamp: int,
+) -> None:
+    """Ставим опрос всех подписчиков, равномерно разнося старты по периоду.
+    Первый подписчик опрашивается сразу. /health следит ровно за ними.
+    """
+    tenants = settings.all_tenants()
+    HEALTH.set_tenants(
+        {tenant.name: tenant.retry_period for tenant in tenants}
+    )
+    for index, tenant in enumerate(tenants):
+        scheduler.schedule(
+            tenant.name,
+            make_poll_job(bot, tenant, timestamp),
+            delay=tenant.retry_period * index / len(tenants),
+        )
+
+
+def start_health_server(settings: Settings) -> Optional[HealthServer]:
+    """Запускаем /health, если в настройках задан порт."""
+    if settings.health_port is None:
+        return None
+    server = HealthServer(
+        HEALTH,
+        settings.health_host,
+        settings.health_port,
+        statuses=latest_statuses,
+    )
+    server.start()
+    return server
+
+
+def plan_polls(bot: Type[Bot], timestamp: int) -> TimingWheelScheduler:
+    """Колесо опросов всех подписчиков из текущих настроек.
+    timestamp - курсор для подписчиков без сохранённого состояния.
+    """
+    scheduler = TimingWheelScheduler(
+        slots=POLL_WHEEL_SLOTS, levels=POLL_WHEEL_LEVELS
+    )
+    schedule_tenants(scheduler, bot, SETTINGS.current, timestamp)
+    return scheduler
+
+
+def poll_pause(scheduler: TimingWheelScheduler) -> float:
+    """Пауза до ближайшего тика колеса, на котором есть работа.
+    Округляем вверх до тика: раньше него колесо задачу не запустит.
+    Ждём не дольше периода опроса, в том числе когда опрашивать некого:
+    между паузами идёт отчёт о трафике.
+    """
+    period: float = SETTINGS.current.retry_period
+    due: Optional[float] = scheduler.next_due()
+    if due is None:
+        return period
+    ticks: int = math.ceil(
+        round(max(due - get_clock().time(), 0) / scheduler.tick, 9)
+    )
+    return min(ticks * scheduler.tick, period)
+
+
+def main() -> None:
+    """Основная логика работы бота.
+    Все подписчики из настроек опрашиваются по колесу таймеров,
+    между тиками колеса - пауза. Первый опрос сразу после старта
+    от сохранённого курсора, по SIGTERM/SIGINT состояние сохраняется
+    и бот завершается. После временного сбоя подписчик опрашивается
+    раньше, после фатального - снимается до перечитывания настроек.
+    SIGHUP прерывает паузу, и новые настройки действуют сразу.
+    """
+    configure()
+    if not check_tokens():
+        sys.exit('Ошибка c переменными окружения. Смотрите логи.')
+
+    bot: Type[Bot] = Bot(token=TELEGRAM_TOKEN)
+    ROUTER.set_routes(build_routes(SETTINGS.current.routes, bot))
+    OUTBOX.start(lambda chat_id, text: bot.send_message(chat_id, text=text))
+    CARDS.start(partial(retry_card, bot))
+    DIGEST.start(partial(send_digest, bot))
+    BUS.load_plugins(SETTINGS.current.plugins)
+    time: Clock = get_clock()
+    HEALTH.started_at = time.time()
+    health_server: Optional[HealthServer] = start_health_server(
+        SETTINGS.current
+    )
+    cursor = CursorStore(STATE_FILE_DIR)
+    timestamp: int = cursor.load(default=int(time.time()))
+    shutdown = Shutdown()
+    shutdown.add_hook(DIGEST.stop)
+    shutdown.add_hook(lambda: flush_digests(bot, everything=True))
+    shutdown.add_hook(SENDER.shutdown)
+    shutdown.add_hook(OUTBOX.stop)
+    shutdown.add_hook(CARDS.stop)
+    shutdown.add_hook(
+        lambda: cursor.save(STATES.get(DEFAULT_TENANT, timestamp).cursor)
+    )
+    shutdown.add_hook(HEDGER.shutdown)
+    shutdown.add_hook(ROUTER.shutdown)
+    shutdown.add_hook(TRANSPORT.close)
+    shutdown.add_hook(STATES.close)
+    shutdown.add_hook(TIMELINE.close)
+    shutdown.add_hook(PROFILER.stop)
+    if health_server is not None:
+        shutdown.add_hook(health_server.stop)
+    shutdown.add_hook(BUS.shutdown)
+    shutdown.add_hook(
+        lambda: logging.info(f'Задержка ответа API: {HEDGER.report()}')
+    )
+    shutdown.add_hook(lambda: logging.info(f'Сеть: {NETWORK.report()}'))
+    shutdown.install()
+    SETTINGS.install()
+    PROFILER.install()
+
+    logging.info('Бот начал работу')
+    scheduler: TimingWheelScheduler = plan_polls(bot, timestamp)
+
+    try:
+        while not shutdown.requested:
+            if SETTINGS.reload_if_requested():
+                apply_settings(SETTINGS.current)
+                ROUTER.set_routes(build_routes(SETTINGS.current.routes, bot))
+                scheduler = plan_polls(bot, timestamp)
+            scheduler.run_pending()
+            BANDWIDTH.report_if_due()
+            retry_period: float = poll_pause(scheduler)
+            try:
+                with shutdown.interruptible(), SETTINGS.interruptible():
+                    time.sleep(retry_period)
+            except ReloadRequested:
+                logging.info('Пауза прервана: перечитываем настройки')
+    except ShutdownRequested:
+        pass
+    finally:
+        shutdown.restore()
+        SETTINGS.restore()
+        PROFILER.restore()
+        shutdown.run_hooks()
+        logging.info('Бот остановлен')
 
 
 if __name__ == '__main__':
@@ -191,4 +881,5 @@ if __name__ == '__main__':
         ],
     )
 
+    SETTINGS.use_args(sys.argv[1:])
     main()
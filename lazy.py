@@ -0,0 +1,28 @@
+"""Отложенная загрузка тяжёлых зависимостей.
+telegram и requests импортируются при первом обращении, а не при
+импорте homework, чтобы воркер и сборка тестов стартовали быстрее.
+"""
+from typing import Any, Dict, Optional
+
+
+class Bot:
+    """telegram.Bot, который создаётся при первой отправке.
+    Класс берётся из модуля telegram в момент создания, поэтому
+    подмена telegram.Bot в тестах тоже действует.
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        self._kwargs: Dict[str, Any] = kwargs
+        self._bot: Optional[Any] = None
+
+    @property
+    def is_created(self) -> bool:
+        """Создан ли уже настоящий бот."""
+        return self._bot is not None
+
+    def __getattr__(self, name: str) -> Any:
+        if self._bot is None:
+            import telegram
+
+            self._bot = telegram.Bot(**self._kwargs)
+        return getattr(self._bot, name)
@@ -0,0 +1,67 @@
+"""Корректная остановка бота по сигналам платформы."""
+import logging
+import signal
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from exceptions import ShutdownRequested
+
+STOP_SIGNALS: Tuple[signal.Signals, ...] = (signal.SIGTERM, signal.SIGINT)
+
+
+class Shutdown:
+    """Флаг остановки, который выставляют SIGTERM и SIGINT.
+    Сигнал прерывает только паузу между опросами: запрос к API
+    и отправка в Telegram доходят до конца.
+    """
+
+    def __init__(self) -> None:
+        self.requested: bool = False
+        self._interruptible: bool = False
+        self._hooks: List[Callable[[], None]] = []
+        self._previous: Dict[signal.Signals, object] = {}
+
+    def install(self, signals: Tuple[signal.Signals, ...] = STOP_SIGNALS):
+        """Ставим обработчики, прежние запоминаем для restore()."""
+        for signum in signals:
+            self._previous[signum] = signal.signal(signum, self._handle)
+
+    def restore(self) -> None:
+        """Возвращаем обработчики сигналов, бывшие до install()."""
+        while self._previous:
+            signum, handler = self._previous.popitem()
+            signal.signal(signum, handler)
+
+    def add_hook(self, hook: Callable[[], None]) -> None:
+        """Регистрируем действие, которое надо выполнить при остановке."""
+        self._hooks.append(hook)
+
+    def run_hooks(self) -> None:
+        """Дожимаем отправки и сохраняем состояние.
+        Ошибка одного хука не мешает остальным.
+        """
+        for hook in self._hooks:
+            try:
+                hook()
+            except Exception as error:
+                logging.error(
+                    f'Ошибка при остановке в {hook!r}: {error}',
+                    exc_info=True,
+                )
+
+    @contextmanager
+    def interruptible(self) -> Iterator[None]:
+        """Участок, который сигнал остановки может прервать сразу."""
+        if self.requested:
+            raise ShutdownRequested('Остановка запрошена ранее')
+        self._interruptible = True
+        try:
+            yield
+        finally:
+            self._interruptible = False
+
+    def _handle(self, signum: int, frame) -> None:
+        logging.info(f'Получен сигнал {signal.Signals(signum).name}')
+        self.requested = True
+        if self._interruptible:
+            raise ShutdownRequested(signal.Signals(signum).name)
@@ -0,0 +1,81 @@
+"""Локальные HTTP/1.1 и HTTP/2 серверы для замеров транспорта.
+На любой GET отвечают одним и тем же телом BENCHMARK_BODY.
+"""
+import json
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler
+from typing import Any
+
+BENCHMARK_BODY: bytes = json.dumps(
+    {'homeworks': [], 'current_date': 1}
+).encode()
+
+
+class CountingServer(socketserver.ThreadingTCPServer):
+    """Считает принятые соединения."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: Any, handler: Any) -> None:
+        super().__init__(address, handler)
+        self.connections = 0
+
+    def process_request(self, request: Any, client_address: Any) -> None:
+        self.connections += 1
+        super().process_request(request, client_address)
+
+
+class Http2Handler(socketserver.BaseRequestHandler):
+    """HTTP/2 без TLS (prior knowledge) на пакете h2."""
+
+    def handle(self) -> None:
+        from h2.config import H2Configuration
+        from h2.connection import H2Connection
+        from h2.events import ConnectionTerminated, RequestReceived
+
+        connection = H2Connection(H2Configuration(client_side=False))
+        connection.initiate_connection()
+        self.request.sendall(connection.data_to_send())
+        while True:
+            data = self.request.recv(65535)
+            if not data:
+                return
+            for event in connection.receive_data(data):
+                if isinstance(event, ConnectionTerminated):
+                    return
+                if isinstance(event, RequestReceived):
+                    connection.send_headers(event.stream_id, [
+                        (':status', '200'),
+                        ('content-type', 'application/json'),
+                        ('content-length', str(len(BENCHMARK_BODY))),
+                    ])
+                    connection.send_data(
+                        event.stream_id, BENCHMARK_BODY, end_stream=True
+                    )
+            self.request.sendall(connection.data_to_send())
+
+
+class Http1Handler(BaseHTTPRequestHandler):
+    """HTTP/1.1 с keep-alive: несколько запросов в одном соединении."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BENCHMARK_BODY)))
+        self.end_headers()
+        self.wfile.write(BENCHMARK_BODY)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def start_server(http2: bool = False) -> CountingServer:
+    """Сервер на свободном порту в фоновом потоке."""
+    handler = Http2Handler if http2 else Http1Handler
+    server = CountingServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
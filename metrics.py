@@ -0,0 +1,106 @@
+"""Метрики бота в памяти процесса: счётчики, значения и распределения."""
+import bisect
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional, Union
+
+Number = Union[int, float]
+# Сколько последних замеров хранит распределение.
+HISTOGRAM_SIZE: int = 1024
+
+
+class Histogram:
+    """Последние HISTOGRAM_SIZE замеров и перцентили по ним."""
+
+    def __init__(self, size: int = HISTOGRAM_SIZE) -> None:
+        self._samples: Deque[float] = deque(maxlen=size)
+        self.count: int = 0
+
+    def observe(self, value: float) -> None:
+        """Добавляем замер."""
+        self._samples.append(value)
+        self.count += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Перцентиль q (0..100) по сохранённым замерам."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * q / 100))
+        return ordered[index]
+
+    def rank(self, value: float) -> float:
+        """Доля замеров не больше value."""
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        return bisect.bisect_right(ordered, value) / len(ordered)
+
+
+class MetricsRegistry:
+    """Именованные метрики. Имена через точку: 'api.requests'."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Number] = {}
+        self._gauges: Dict[str, Number] = {}
+        self._histograms: Dict[str, Histogram] = {}
+
+    def inc(self, name: str, value: Number = 1) -> None:
+        """Увеличиваем счётчик name на value."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set(self, name: str, value: Number) -> None:
+        """Запоминаем текущее значение name."""
+        self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        """Добавляем замер в распределение name."""
+        with self._lock:
+            histogram = self._histograms.setdefault(name, Histogram())
+            histogram.observe(value)
+
+    def counter(self, name: str) -> Number:
+        """Значение счётчика, 0 если его ещё не было."""
+        return self._counters.get(name, 0)
+
+    def counters(self, prefix: str = '') -> Dict[str, Number]:
+        """Счётчики, имена которых начинаются с prefix."""
+        with self._lock:
+            return {
+                name: value
+                for name, value in self._counters.items()
+                if name.startswith(prefix)
+            }
+
+    def gauge(self, name: str) -> Optional[Number]:
+        """Последнее значение name или None."""
+        return self._gauges.get(name)
+
+    def histogram(self, name: str) -> Histogram:
+        """Распределение name, пустое если замеров не было."""
+        with self._lock:
+            return self._histograms.setdefault(name, Histogram())
+
+    def snapshot(self) -> Dict[str, Number]:
+        """Плоский срез всех метрик для логов и отчётов."""
+        with self._lock:
+            data: Dict[str, Number] = dict(self._counters)
+            data.update(self._gauges)
+            for name, histogram in self._histograms.items():
+                for q in (50, 95, 99):
+                    value = histogram.percentile(q)
+                    if value is not None:
+                        data[f'{name}.p{q}'] = value
+        return data
+
+    def reset(self) -> None:
+        """Сбрасываем все метрики."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+METRICS: MetricsRegistry = MetricsRegistry()
@@ -0,0 +1,99 @@
+"""Адаптер requests для сессии API с кэшем DNS и своим SSLContext.
+Глобальный urllib3 не трогается: пул соединений, адреса и контекст
+с возобновлением сессий живут в PoolManager адаптера. Модуль грузится
+лениво из netcache, чтобы не импортировать requests вместе с homework.
+"""
+import time
+from typing import Any, Dict, Optional, Type
+
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool, PoolManager
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from netcache import is_ip
+
+
+class _ResolvingConnection:
+    """Подключение по адресам из DnsCache сети network.
+    Имя сервера для SNI и проверки сертификата остаётся прежним.
+    """
+
+    network: Any = None
+
+    def _new_conn(self) -> Any:
+        network = self.network
+        host = self._dns_host
+        started = time.perf_counter()
+        try:
+            if not network.dns_enabled or is_ip(host):
+                return super()._new_conn()
+            return self._connect_cached(host)
+        finally:
+            network.metrics.observe(
+                'net.connect_seconds', time.perf_counter() - started
+            )
+
+    def _connect_cached(self, host: str) -> Any:
+        dns = self.network.dns
+        error: Optional[Exception] = None
+        try:
+            for *_, sockaddr in dns.lookup(host, self.port):
+                self._dns_host = sockaddr[0]
+                try:
+                    return super()._new_conn()
+                except (NewConnectionError, ConnectTimeoutError) as failure:
+                    error = failure
+        finally:
+            self._dns_host = host
+        # Ни один адрес не ответил: в следующий раз разрешаем заново.
+        dns.invalidate(host, self.port)
+        raise error or NewConnectionError(self, f'Нет адресов для {host}')
+
+
+def pool_classes(network: Any) -> Dict[str, Type[HTTPConnectionPool]]:
+    """Классы пулов http и https, подключающихся через network."""
+    classes = {}
+    for scheme, pool, connection in (
+        ('http', HTTPConnectionPool, HTTPConnection),
+        ('https', HTTPSConnectionPool, HTTPSConnection),
+    ):
+        resolving = type(
+            f'Resolving{connection.__name__}',
+            (_ResolvingConnection, connection),
+            {'network': network},
+        )
+        classes[scheme] = type(
+            f'Resolving{pool.__name__}', (pool,), {'ConnectionCls': resolving}
+        )
+    return classes
+
+
+class ApiAdapter(HTTPAdapter):
+    """HTTPAdapter со своим PoolManager.
+    SSLContext и кэш DNS берутся у network (netcache.NetworkCache).
+    """
+
+    def __init__(self, network: Any, **kwargs: Any) -> None:
+        self.network = network
+        super().__init__(**kwargs)
+
+    def init_poolmanager(
+        self,
+        connections: int,
+        maxsize: int,
+        block: bool = False,
+        **pool_kwargs: Any,
+    ) -> None:
+        """Создаём PoolManager со своим ssl_context и классами пулов."""
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = PoolManager(
+            num_pools=connections,
+            maxsize=maxsize,
+            block=block,
+            ssl_context=self.network.context,
+            **pool_kwargs,
+        )
+        self.poolmanager.pool_classes_by_scheme = pool_classes(self.network)
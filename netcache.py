@@ -0,0 +1,205 @@
+"""Кэш DNS и возобновление TLS-сессий для запросов к ENDPOINT.
+requests.get каждый раз открывает новое соединение: заново разрешает
+имя и делает полное TLS-рукопожатие. NetworkCache.session() даёт
+отдельную сессию requests для API (транспорт http1-pool): пул
+соединений с keep-alive, кэш адресов с TTL и свой SSLContext, который
+возобновляет сессию по сохранённому тикету. Остальной процесс, включая
+requests.get, этих настроек не видит. Просроченный адрес ещё stale
+секунд отдаётся сразу, а обновляется в фоне. Время разрешения,
+соединения и рукопожатия пишется в METRICS.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from clock import Clock, InjectedClock
+from metrics import METRICS, MetricsRegistry
+
+# getaddrinfo не сообщает TTL записи, поэтому срок задаётся настройкой.
+DNS_TTL: float = 300.0
+DNS_STALE: float = 3600.0
+Address = Tuple[str, int]
+Resolver = Callable[..., List[Tuple[Any, ...]]]
+
+
+def _run_in_thread(task: Callable[[], None]) -> None:
+    threading.Thread(target=task, name='dns-refresh', daemon=True).start()
+
+
+def is_ip(host: str) -> bool:
+    """Адрес уже IP, разрешать нечего."""
+    import ipaddress
+
+    try:
+        ipaddress.ip_address(host.strip('[]'))
+    except ValueError:
+        return False
+    return True
+
+
+class _Entry(NamedTuple):
+    addresses: List[Tuple[Any, ...]]
+    expires: float
+
+
+class DnsCache:
+    """Адреса по (host, port) со сроком ttl и запасом stale.
+    В запасе адрес отдаётся сразу, а обновление идёт через background;
+    неудачное обновление оставляет старый адрес.
+    """
+
+    clock = InjectedClock()
+
+    def __init__(
+        self,
+        ttl: float = DNS_TTL,
+        stale: float = DNS_STALE,
+        resolver: Optional[Resolver] = None,
+        background: Callable[[Callable[[], None]], None] = _run_in_thread,
+        metrics: MetricsRegistry = METRICS,
+        clock: Optional[Clock] = None,
+    ) -> None:
+        self.ttl = ttl
+        self.stale = stale
+        # По умолчанию socket.getaddrinfo, см. _resolve.
+        self.resolver = resolver
+        self.background = background
+        self.metrics = metrics
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[Address, _Entry] = {}
+        self._refreshing: Set[Address] = set()
+
+    def lookup(self, host: str, port: int) -> List[Tuple[Any, ...]]:
+        """Записи getaddrinfo: (family, type, proto, canonname, sockaddr)."""
+        key = (host, port)
+        with self._lock:
+            entry = self._entries.get(key)
+        now = self.clock.time()
+        if entry is not None and now < entry.expires:
+            self.metrics.inc('dns.hits')
+            return entry.addresses
+        if entry is not None and now < entry.expires + self.stale:
+            self.metrics.inc('dns.stale_hits')
+            self._refresh(key)
+            return entry.addresses
+        self.metrics.inc('dns.misses')
+        return self._resolve(key)
+
+    def invalidate(self, host: str, port: int) -> None:
+        """Забываем адреса, например если по ним не подключиться."""
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+    def _resolve(self, key: Address) -> List[Tuple[Any, ...]]:
+        import socket
+
+        resolve = self.resolver or socket.getaddrinfo
+        started = time.perf_counter()
+        addresses = resolve(*key, 0, socket.SOCK_STREAM)
+        self.metrics.observe(
+            'dns.resolve_seconds', time.perf_counter() - started
+        )
+        with self._lock:
+            self._entries[key] = _Entry(
+                list(addresses), self.clock.time() + self.ttl
+            )
+        return addresses
+
+    def _refresh(self, key: Address) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh() -> None:
+            try:
+                self._resolve(key)
+            except OSError as error:
+                self.metrics.inc('dns.refresh_failures')
+                logging.warning(f'Не удалось обновить адрес {key[0]}: {error}')
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self.background(refresh)
+
+
+class NetworkCache:
+    """DnsCache и ResumingContext для сессии API.
+    ssl и requests импортируются при первой сессии.
+    """
+
+    def __init__(
+        self,
+        dns: Optional[DnsCache] = None,
+        metrics: MetricsRegistry = METRICS,
+    ) -> None:
+        self.dns = dns or DnsCache(metrics=metrics)
+        self.metrics = metrics
+        self.dns_enabled: bool = True
+        self.resume: bool = True
+        self._context: Any = None
+
+    @property
+    def context(self) -> Any:
+        """Контекст TLS сессий API, создаётся при первом обращении.
+        Сертификаты certifi, как у requests, грузятся в него один раз.
+        """
+        if self._context is None:
+            import ssl
+
+            import certifi
+
+            from tlssession import ResumingContext
+
+            context = ResumingContext(ssl.PROTOCOL_TLS_CLIENT).setup(
+                self.metrics
+            )
+            context.load_verify_locations(certifi.where())
+            self._context = context
+        self._context.resume = self.resume
+        return self._context
+
+    def configure(self, ttl: float, stale: float, resume: bool) -> None:
+        """Срок адресов (0 - без кэша DNS) и возобновление TLS."""
+        self.dns.ttl, self.dns.stale = ttl, stale
+        self.dns_enabled = ttl > 0
+        self.resume = resume
+        if self._context is not None:
+            self._context.resume = resume
+
+    def session(self, max_connections: int = 2) -> Any:
+        """Новая сессия requests с адаптером netadapter.ApiAdapter.
+        max_connections - сколько соединений с сервером держит пул.
+        """
+        import requests
+
+        from netadapter import ApiAdapter
+
+        session = requests.Session()
+        adapter = ApiAdapter(
+            self, pool_connections=1, pool_maxsize=max_connections
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def report(self) -> Dict[str, Optional[float]]:
+        """Медианы времени и доля возобновлённых рукопожатий."""
+        resumed = self.metrics.counter('tls.resumed')
+        handshakes = resumed + self.metrics.counter('tls.full_handshakes')
+        report: Dict[str, Optional[float]] = {
+            name: self.metrics.histogram(name).percentile(50)
+            for name in (
+                'dns.resolve_seconds',
+                'net.connect_seconds',
+                'tls.handshake_seconds',
+            )
+        }
+        report['dns.hits'] = self.metrics.counter('dns.hits')
+        report['tls.resumed_ratio'] = (
+            resumed / handshakes if handshakes else None
+        )
+        return report
@@ -0,0 +1,278 @@
+"""Очередь исходящих сообщений на диске.
+Сообщение записывается в журнал до отправки и подтверждается после.
+Неотправленные сообщения переживают перезапуск, их повторяет фоновый
+поток с растущей паузой. fsync делается пачками, а не на каждую запись.
+"""
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from clock import Clock, InjectedClock
+from exceptions import error_policy
+from metrics import METRICS, MetricsRegistry
+
+# Пауза перед первым повтором и предел роста паузы, секунды.
+RETRY_BASE: float = 5.0
+RETRY_MAX: float = 600.0
+# Отправка сообщения в чат: chat_id, текст. Сбой - исключение.
+Send = Callable[[str, str], None]
+
+
+@dataclass
+class OutboxEntry:
+    """Неподтверждённое сообщение."""
+
+    id: int
+    chat_id: str
+    text: str
+    attempts: int = 0
+    due: float = 0.0
+    # Отправитель ещё пробует сам: фоновый поток сообщение не трогает.
+    in_flight: bool = False
+
+
+def retry_delay(attempts: int, error: Optional[BaseException] = None) -> float:
+    """Пауза перед следующей попыткой: удвоение до RETRY_MAX.
+    Если сервер просил подождать (retry_after), ждём не меньше.
+    """
+    delay = min(RETRY_BASE * 2 ** max(attempts - 1, 0), RETRY_MAX)
+    return max(delay, float(getattr(error, 'retry_after', 0) or 0))
+
+
+class Outbox:
+    """Журнал сообщений: строки put/ack в файле json lines.
+    Каждая запись сразу уходит в ОС, fsync - раз в sync_every записей
+    или sync_interval секунд. Подтверждённые записи периодически
+    вычищаются перезаписью журнала.
+    """
+
+    clock = InjectedClock()
+
+    def __init__(
+        self,
+        path: str,
+        sync_every: int = 32,
+        sync_interval: float = 1.0,
+        compact_after: int = 1000,
+        clock: Optional[Clock] = None,
+        metrics: MetricsRegistry = METRICS,
+    ) -> None:
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.compact_after = compact_after
+        self.clock = clock
+        self.metrics = metrics
+        self._lock = threading.RLock()
+        self._file = None
+        self._pending: Dict[int, OutboxEntry] = {}
+        self._next_id: int = 1
+        self._acked: int = 0
+        self._unsynced: int = 0
+        self._synced_at: float = 0.0
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._open()
+            return len(self._pending)
+
+    def put(self, chat_id: str, text: str) -> int:
+        """Записываем сообщение перед отправкой, возвращаем его id.
+        Сообщение принадлежит отправителю, пока тот не вызовет ack(),
+        drop() или retry_later(); фоновый поток его не трогает.
+        """
+        with self._lock:
+            self._open()
+            entry = OutboxEntry(self._next_id, chat_id, text, in_flight=True)
+            self._next_id += 1
+            self._pending[entry.id] = entry
+            self._write({
+                'op': 'put', 'id': entry.id, 'chat_id': chat_id, 'text': text,
+            })
+            self._update_gauge()
+            return entry.id
+
+    def ack(self, entry_id: int) -> None:
+        """Сообщение доставлено, повторять не нужно."""
+        if self._remove(entry_id):
+            self.metrics.inc('outbox.delivered')
+
+    def drop(self, entry_id: int) -> None:
+        """Сообщение доставить нельзя, повторять бессмысленно."""
+        if self._remove(entry_id):
+            self.metrics.inc('outbox.dropped')
+
+    def retry_later(
+        self, entry_id: int, error: Optional[BaseException] = None
+    ) -> None:
+        """Неудачная попытка: откладываем повтор с ростом паузы."""
+        with self._lock:
+            entry = self._pending.get(entry_id)
+            if entry is None:
+                return
+            entry.attempts += 1
+            entry.due = self.clock.time() + retry_delay(entry.attempts, error)
+            entry.in_flight = False
+            self.metrics.inc('outbox.failed')
+
+    def due(self) -> List[OutboxEntry]:
+        """Сообщения, которые пора повторить."""
+        with self._lock:
+            self._open()
+            now = self.clock.time()
+            return [
+                entry
+                for entry in self._pending.values()
+                if not entry.in_flight and entry.due <= now
+            ]
+
+    def retry_due(self, send: Send) -> int:
+        """Один проход повторов, возвращаем число доставленных."""
+        delivered = 0
+        for entry in self.due():
+            self.metrics.inc('outbox.retries')
+            try:
+                send(entry.chat_id, entry.text)
+            except Exception as error:
+                if not error_policy(error).retryable:
+                    logging.error(
+                        f'Сообщение {entry.id} не будет доставлено: {error}'
+                    )
+                    self.drop(entry.id)
+                    continue
+                logging.warning(
+                    f'Повтор отправки сообщения {entry.id} не удался '
+                    f'(попытка {entry.attempts + 1}): {error}'
+                )
+                self.retry_later(entry.id, error)
+            else:
+                self.ack(entry.id)
+                delivered += 1
+        self.sync(force=False)
+        return delivered
+
+    def sync(self, force: bool = True) -> None:
+        """Сбрасываем журнал на диск; без force - только если подошёл срок."""
+        with self._lock:
+            if self._file is None or not self._unsynced:
+                return
+            if not force and (
+                self._unsynced < self.sync_every
+                and self.clock.time() - self._synced_at < self.sync_interval
+            ):
+                return
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+            self._synced_at = self.clock.time()
+            self.metrics.inc('outbox.fsyncs')
+
+    def start(self, send: Send, interval: float = 1.0) -> None:
+        """Запускаем фоновый поток повторов."""
+        if self._worker is not None:
+            return
+        self._stop.clear()
+        self._worker = threading.Thread(
+            target=self._run, args=(send, interval), name='outbox', daemon=True
+        )
+        self._worker.start()
+
+    def stop(self) -> None:
+        """Останавливаем поток повторов и закрываем журнал."""
+        if self._worker is not None:
+            self._stop.set()
+            self._worker.join()
+            self._worker = None
+        self.close()
+
+    def close(self) -> None:
+        """Сбрасываем журнал на диск и закрываем файл."""
+        with self._lock:
+            if self._file is None:
+                return
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def _remove(self, entry_id: int) -> bool:
+        with self._lock:
+            self._open()
+            if self._pending.pop(entry_id, None) is None:
+                return False
+            self._write({'op': 'ack', 'id': entry_id})
+            self._acked += 1
+            self._update_gauge()
+            if self._acked >= self.compact_after:
+                self._compact()
+            return True
+
+    def _run(self, send: Send, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.retry_due(send)
+            except Exception as error:
+                logging.error(f'Сбой очереди сообщений: {error}')
+
+    def _open(self) -> None:
+        if self._file is not None:
+            return
+        self._pending, self._acked = self._replay(), 0
+        if self._pending:
+            logging.info(
+                f'В очереди {len(self._pending)} неотправленных сообщений'
+            )
+        self._file = open(self.path, 'a', encoding='UTF-8')
+        self._synced_at = self.clock.time()
+        self._update_gauge()
+
+    def _replay(self) -> Dict[int, OutboxEntry]:
+        pending: Dict[int, OutboxEntry] = {}
+        last_id = 0
+        try:
+            with open(self.path, encoding='UTF-8') as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Недописанная строка после аварийной остановки.
+                        continue
+                    last_id = max(last_id, record['id'])
+                    if record['op'] == 'put':
+                        pending[record['id']] = OutboxEntry(
+                            record['id'], record['chat_id'], record['text']
+                        )
+                    else:
+                        pending.pop(record['id'], None)
+        except FileNotFoundError:
+            pass
+        self._next_id = last_id + 1
+        return pending
+
+    def _write(self, record: Dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        self._unsynced += 1
+        self.sync(force=False)
+
+    def _compact(self) -> None:
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='UTF-8') as file:
+            for entry in self._pending.values():
+                file.write(json.dumps({
+                    'op': 'put', 'id': entry.id, 'chat_id': entry.chat_id,
+                    'text': entry.text,
+                }, ensure_ascii=False) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, 'a', encoding='UTF-8')
+        self._acked = self._unsynced = 0
+        self.metrics.inc('outbox.compactions')
+
+    def _update_gauge(self) -> None:
+        self.metrics.set('outbox.pending', len(self._pending))
@@ -0,0 +1,242 @@
+"""Профилирование работающего бота без перезапуска.
+SIGUSR1 включает cProfile, повторный SIGUSR1 выключает и сохраняет
+статистику. SIGUSR2 так же включает tracemalloc с исходным снимком
+памяти, повторный SIGUSR2 снимает второй снимок и выключает
+трассировку - между сигналами бот работает без её накладных
+расходов. Файлы пишутся рядом с логом бота.
+Обработчик сигнала только включает или выключает cProfile и ставит
+задачу в очередь; дамп на диск пишет отдельный поток, поэтому
+повторный сигнал посреди записи ничего не блокирует.
+
+Сравнение двух снимков памяти:
+    python profiling.py diff old.snapshot new.snapshot [--limit N]
+"""
+import argparse
+import logging
+import os
+import queue
+import signal
+import sys
+import threading
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from clock import Clock, InjectedClock
+
+PROFILE_SIGNAL: signal.Signals = signal.SIGUSR1
+MEMORY_SIGNAL: signal.Signals = signal.SIGUSR2
+# Глубина стека, которую запоминает tracemalloc для каждого выделения.
+TRACEMALLOC_FRAMES: int = 10
+# Сколько строк статистики пишется в текстовую сводку.
+SUMMARY_LIMIT: int = 40
+# Выделения самого tracemalloc и импорта модулей не интересны.
+IGNORED_FILES: Sequence[str] = ('<frozen importlib._bootstrap>', '<unknown>')
+# Сколько ждём записи заказанных сигналами дампов при остановке, секунды.
+DUMP_TIMEOUT: float = 30.0
+
+
+class Profiler:
+    """Переключатели cProfile и tracemalloc для основного потока.
+    cProfile видит только поток, в котором включён: опрос API,
+    разбор ответа и отправку в основной чат.
+    """
+
+    clock = InjectedClock()
+
+    def __init__(self, directory: str, clock: Optional[Clock] = None) -> None:
+        self.directory = directory
+        self.clock = clock
+        self._profile: Any = None
+        self._lock = threading.Lock()
+        self._previous: Dict[signal.Signals, Any] = {}
+        # SimpleQueue.put можно вызывать из обработчика сигнала.
+        self._dumps: 'queue.SimpleQueue[Optional[Callable[[], Any]]]' = (
+            queue.SimpleQueue()
+        )
+        self._worker: Optional[threading.Thread] = None
+
+    @property
+    def cpu_running(self) -> bool:
+        """Включён ли cProfile."""
+        return self._profile is not None
+
+    def toggle_cpu(self) -> Optional[str]:
+        """Включаем cProfile или выключаем и возвращаем путь к дампу."""
+        if self._profile is None:
+            import cProfile
+
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+            logging.info('Профилирование CPU включено')
+            return None
+        return self.stop_cpu()
+
+    def stop_cpu(self) -> Optional[str]:
+        """Выключаем cProfile, пишем .prof и текстовую сводку."""
+        profile, self._profile = self._profile, None
+        if profile is None:
+            return None
+        profile.disable()
+        return self._dump_cpu(profile)
+
+    def _dump_cpu(self, profile: Any) -> str:
+        import pstats
+
+        path = self._path('cpu', 'prof')
+        profile.dump_stats(path)
+        with open(f'{path}.txt', 'w', encoding='UTF-8') as file:
+            stats = pstats.Stats(profile, stream=file)
+            stats.sort_stats('cumulative').print_stats(SUMMARY_LIMIT)
+        logging.info(f'Профиль CPU сохранён в {path}')
+        return path
+
+    def snapshot_memory(self) -> str:
+        """Снимок памяти в файл; при первом вызове включаем tracemalloc."""
+        import tracemalloc
+
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                logging.info('Трассировка памяти включена')
+            path = self._path('memory', 'snapshot')
+            tracemalloc.take_snapshot().dump(path)
+        current, peak = tracemalloc.get_traced_memory()
+        logging.info(
+            f'Снимок памяти сохранён в {path}: '
+            f'{current / 1024:.0f} КиБ, пик {peak / 1024:.0f} КиБ'
+        )
+        return path
+
+    @property
+    def memory_running(self) -> bool:
+        """Включён ли tracemalloc."""
+        import tracemalloc
+
+        return tracemalloc.is_tracing()
+
+    def toggle_memory(self) -> str:
+        """Включаем tracemalloc или выключаем; оба раза пишем снимок.
+        Разница первого и второго снимка - память, выделенная между
+        сигналами и ещё не освобождённая.
+        """
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            return self.snapshot_memory()
+        path = self.snapshot_memory()
+        self.stop_memory()
+        return path
+
+    def stop_memory(self) -> None:
+        """Выключаем tracemalloc."""
+        import tracemalloc
+
+        with self._lock:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+                logging.info('Трассировка памяти выключена')
+
+    def stop(self) -> None:
+        """Сохраняем незавершённый профиль и выключаем tracemalloc."""
+        self.stop_cpu()
+        self.stop_memory()
+
+    def install(self) -> None:
+        """Подписываемся на SIGUSR1 и SIGUSR2 и запускаем поток дампов."""
+        # Импорт внутри обработчика сигнала может ждать блокировку импорта.
+        import cProfile  # noqa: F401
+        import pstats  # noqa: F401
+        import tracemalloc  # noqa: F401
+
+        if self._worker is None:
+            self._worker = threading.Thread(
+                target=self._write_dumps, name='profiler', daemon=True
+            )
+            self._worker.start()
+        self._previous[PROFILE_SIGNAL] = signal.signal(
+            PROFILE_SIGNAL, self._on_profile_signal
+        )
+        self._previous[MEMORY_SIGNAL] = signal.signal(
+            MEMORY_SIGNAL, lambda signum, frame: self._dumps.put(
+                self.toggle_memory
+            )
+        )
+
+    def restore(self, timeout: float = DUMP_TIMEOUT) -> None:
+        """Возвращаем прежние обработчики и дописываем заказанные дампы."""
+        while self._previous:
+            signum, handler = self._previous.popitem()
+            signal.signal(signum, handler)
+        worker, self._worker = self._worker, None
+        if worker is not None:
+            self._dumps.put(None)
+            worker.join(timeout)
+
+    def flush(self, timeout: float = DUMP_TIMEOUT) -> bool:
+        """Ждём, пока поток допишет уже заказанные дампы."""
+        done = threading.Event()
+        self._dumps.put(done.set)
+        return done.wait(timeout)
+
+    def _on_profile_signal(self, signum: int, frame: Any) -> None:
+        # В контексте сигнала только переключаем cProfile: он должен
+        # работать в основном потоке. Запись дампа - в потоке profiler.
+        profile = self._profile
+        if profile is None:
+            self.toggle_cpu()
+            return
+        self._profile = None
+        profile.disable()
+        self._dumps.put(partial(self._dump_cpu, profile))
+
+    def _write_dumps(self) -> None:
+        while True:
+            task = self._dumps.get()
+            if task is None:
+                return
+            try:
+                task()
+            except Exception as error:
+                logging.error(f'Не удалось записать дамп: {error}')
+
+    def _path(self, kind: str, suffix: str) -> str:
+        moment = datetime.fromtimestamp(self.clock.time())
+        name = f'{kind}-{os.getpid()}-{moment:%Y%m%d-%H%M%S-%f}.{suffix}'
+        return os.path.join(self.directory, name)
+
+
+def diff_snapshots(
+    old_path: str, new_path: str, limit: int = 20, key_type: str = 'lineno'
+) -> List[str]:
+    """Самые выросшие места выделения памяти между двумя снимками."""
+    import tracemalloc
+
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        *(tracemalloc.Filter(False, name) for name in IGNORED_FILES),
+    ]
+    old = tracemalloc.Snapshot.load(old_path).filter_traces(filters)
+    new = tracemalloc.Snapshot.load(new_path).filter_traces(filters)
+    return [str(stat) for stat in new.compare_to(old, key_type)[:limit]]
+
+
+def main(argv: Sequence[str]) -> None:
+    """Командная строка для сравнения снимков памяти."""
+    parser = argparse.ArgumentParser(description='Анализ снимков памяти бота')
+    commands = parser.add_subparsers(dest='command', required=True)
+    diff = commands.add_parser('diff', help='сравнить два снимка')
+    diff.add_argument('old')
+    diff.add_argument('new')
+    diff.add_argument('--limit', type=int, default=20)
+    diff.add_argument(
+        '--key-type', choices=('lineno', 'filename', 'traceback'),
+        default='lineno',
+    )
+    args = parser.parse_args(list(argv))
+    for line in diff_snapshots(args.old, args.new, args.limit, args.key_type):
+        print(line)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
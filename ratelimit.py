@@ -0,0 +1,164 @@
+"""Ограничение частоты запросов к API: общее и для каждого подписчика."""
+import threading
+from collections import deque
+from typing import Deque, Dict, Hashable, Optional
+
+from clock import Clock, InjectedClock
+from metrics import METRICS, MetricsRegistry
+
+# Окно, за которое считается загрузка относительно потолка, секунды.
+UTILIZATION_WINDOW: float = 60.0
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity."""
+
+    clock = InjectedClock()
+
+    def __init__(
+        self, rate: float, capacity: float, clock: Optional[Clock] = None
+    ) -> None:
+        if rate <= 0 or capacity < 1:
+            raise ValueError('rate > 0 и capacity >= 1')
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens: float = capacity
+        self._updated: float = self.clock.time()
+
+    def _refill(self) -> None:
+        now = self.clock.time()
+        elapsed = max(0.0, now - self._updated)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self._updated = now
+
+    def wait_time(self, tokens: float = 1) -> float:
+        """Сколько ждать, пока наберётся tokens токенов."""
+        self._refill()
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+    def take(self, tokens: float = 1) -> None:
+        """Забираем токены; их может стать меньше нуля, это долг."""
+        self._refill()
+        self.tokens -= tokens
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Забираем токены, если они есть прямо сейчас."""
+        if self.wait_time(tokens) > 0:
+            return False
+        self.tokens -= tokens
+        return True
+
+
+class RateLimiter:
+    """Общее ведро на весь процесс и по ведру на подписчика.
+    Лимит None означает, что этот уровень не ограничен.
+    """
+
+    clock = InjectedClock()
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: int = 1,
+        tenant_rate: Optional[float] = None,
+        tenant_burst: int = 1,
+        clock: Optional[Clock] = None,
+        metrics: MetricsRegistry = METRICS,
+    ) -> None:
+        self.clock = clock
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self._tenants: Dict[Hashable, TokenBucket] = {}
+        self._recent: Deque[float] = deque()
+        self._limits: Optional[tuple] = None
+        self.configure(rate, burst, tenant_rate, tenant_burst)
+
+    def configure(
+        self,
+        rate: Optional[float],
+        burst: int,
+        tenant_rate: Optional[float],
+        tenant_burst: int,
+    ) -> None:
+        """Меняем лимиты; ведра пересоздаются только при изменении."""
+        with self._lock:
+            limits = (rate, burst, tenant_rate, tenant_burst)
+            if limits == self._limits:
+                return
+            self._limits = limits
+            self.rate, self.tenant_rate = rate, tenant_rate
+            self.tenant_burst = tenant_burst
+            self._global = (
+                TokenBucket(rate, burst, self._clock) if rate else None
+            )
+            self._tenants.clear()
+
+    def _tenant_bucket(self, tenant: Hashable) -> Optional[TokenBucket]:
+        if not self.tenant_rate:
+            return None
+        bucket = self._tenants.get(tenant)
+        if bucket is None:
+            bucket = TokenBucket(
+                self.tenant_rate, self.tenant_burst, self._clock
+            )
+            self._tenants[tenant] = bucket
+        return bucket
+
+    def acquire(self, tenant: Hashable) -> float:
+        """Ждём разрешения на запрос tenant, возвращаем время ожидания."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                buckets = [
+                    bucket
+                    for bucket in (self._global, self._tenant_bucket(tenant))
+                    if bucket is not None
+                ]
+                pause = max(
+                    (bucket.wait_time() for bucket in buckets), default=0.0
+                )
+                if pause <= 0:
+                    for bucket in buckets:
+                        bucket.take()
+                    self._record()
+                    break
+            self.clock.sleep(pause)
+            waited += pause
+        if waited:
+            self.metrics.inc('ratelimit.throttled', 1)
+            self.metrics.inc('ratelimit.waited_seconds', waited)
+        return waited
+
+    def try_acquire(self, tenant: Hashable) -> bool:
+        """Берём разрешение, только если оно есть прямо сейчас."""
+        with self._lock:
+            buckets = [
+                bucket
+                for bucket in (self._global, self._tenant_bucket(tenant))
+                if bucket is not None
+            ]
+            if any(bucket.wait_time() > 0 for bucket in buckets):
+                self.metrics.inc('ratelimit.refused')
+                return False
+            for bucket in buckets:
+                bucket.take()
+            self._record()
+            return True
+
+    def _record(self) -> None:
+        if not self.rate:
+            return
+        self._recent.append(self.clock.time())
+        self.metrics.set('ratelimit.utilization', self.utilization())
+
+    def utilization(self) -> Optional[float]:
+        """Доля общего потолка, занятая запросами за последнее окно.
+        1.0 значит, что работаем на пределе; None, если потолка нет.
+        """
+        if not self.rate:
+            return None
+        horizon = self.clock.time() - UTILIZATION_WINDOW
+        while self._recent and self._recent[0] <= horizon:
+            self._recent.popleft()
+        return len(self._recent) / (self.rate * UTILIZATION_WINDOW)
@@ -0,0 +1,250 @@
+"""Маршруты уведомлений: одно сообщение уходит нескольким получателям.
+Получатели обслуживаются параллельно, сбой или задержка одного
+не мешает остальным. Текст формируется один раз и общий для всех.
+"""
+import json
+import logging
+import queue
+import threading
+from concurrent.futures import Future, wait
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    Mapping,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+)
+
+from clock import get_clock
+from config import Route
+from metrics import METRICS, MetricsRegistry
+
+# Сколько ждём медленных получателей в deliver() и при остановке.
+DELIVERY_TIMEOUT: float = 10.0
+# Сколько сообщений может ждать отправки у одного получателя.
+ROUTE_QUEUE_SIZE: int = 100
+
+
+class Destination(Protocol):
+    """Получатель уведомлений."""
+
+    name: str
+
+    def send(self, text: str) -> None:
+        """Отправляем текст, при сбое бросаем исключение."""
+
+
+class TelegramChat:
+    """Дополнительный чат в Telegram через общего бота."""
+
+    def __init__(self, bot: Any, chat_id: str) -> None:
+        self.bot = bot
+        self.chat_id = chat_id
+        self.name = f'telegram:{chat_id}'
+
+    def send(self, text: str) -> None:
+        """Сообщение в чат."""
+        self.bot.send_message(self.chat_id, text=text)
+
+
+class Webhook:
+    """Локальный вебхук: POST с json {"text": ...}."""
+
+    def __init__(self, url: str, timeout: float = DELIVERY_TIMEOUT) -> None:
+        self.url = url
+        self.timeout = timeout
+        self.name = f'webhook:{url}'
+
+    def send(self, text: str) -> None:
+        """POST запрос, статус ответа не 2xx считается сбоем."""
+        import requests
+
+        response = requests.post(
+            self.url, json={'text': text}, timeout=self.timeout
+        )
+        response.raise_for_status()
+
+
+class FileSink:
+    """Файл, куда сообщения дописываются построчно в json."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.name = f'file:{path}'
+        self._lock = threading.Lock()
+
+    def send(self, text: str) -> None:
+        """Дописываем строку с временем и текстом."""
+        line = json.dumps(
+            {'sent_at': get_clock().time(), 'text': text}, ensure_ascii=False
+        )
+        with self._lock, open(self.path, 'a', encoding='UTF-8') as file:
+            file.write(line + '\n')
+
+
+def make_destination(route: Route, bot: Any) -> Destination:
+    """Получатель по описанию маршрута из настроек."""
+    if route.kind == 'telegram':
+        return TelegramChat(bot, route.target)
+    if route.kind == 'webhook':
+        return Webhook(route.target)
+    return FileSink(route.target)
+
+
+def build_routes(
+    routes: Sequence[Route], bot: Any
+) -> Dict[str, Tuple[Destination, ...]]:
+    """Таблица маршрутов: подписчик -> его получатели."""
+    table: Dict[str, Tuple[Destination, ...]] = {}
+    for route in routes:
+        table[route.tenant] = table.get(route.tenant, ()) + (
+            make_destination(route, bot),
+        )
+    return table
+
+
+class _Lane:
+    """Своя ограниченная очередь и поток у каждого получателя."""
+
+    def __init__(
+        self, destination: Destination, router: 'Router', size: int
+    ) -> None:
+        self.destination = destination
+        self.queue: 'queue.Queue[Optional[Tuple[str, Future]]]' = (
+            queue.Queue(size)
+        )
+        self.thread = threading.Thread(
+            target=self._run,
+            args=(router,),
+            name=f'route-{destination.name}',
+            daemon=True,
+        )
+        self.thread.start()
+
+    def _run(self, router: 'Router') -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            text, future = item
+            future.set_result(router._send(self.destination, text))
+
+
+class Router:
+    """Рассылка сообщения всем получателям подписчика.
+    У каждого получателя своя очередь на queue_size сообщений и свой
+    поток, поэтому медленный получатель не задерживает остальных,
+    а переполнение его очереди сбрасывает только его сообщения.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = ROUTE_QUEUE_SIZE,
+        timeout: float = DELIVERY_TIMEOUT,
+        metrics: MetricsRegistry = METRICS,
+    ) -> None:
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.metrics = metrics
+        self._routes: Mapping[str, Tuple[Destination, ...]] = {}
+        self._lanes: Dict[int, _Lane] = {}
+        self._lock = threading.Lock()
+
+    def set_routes(
+        self, routes: Mapping[str, Tuple[Destination, ...]]
+    ) -> None:
+        """Заменяем таблицу маршрутов целиком.
+        Очереди убранных получателей дорабатывают и закрываются.
+        """
+        self._routes = dict(routes)
+        kept = {
+            id(destination)
+            for destinations in self._routes.values()
+            for destination in destinations
+        }
+        with self._lock:
+            for key in [key for key in self._lanes if key not in kept]:
+                self._lanes.pop(key).queue.put(None)
+
+    def destinations(self, tenant: str) -> Tuple[Destination, ...]:
+        """Получатели подписчика."""
+        return self._routes.get(tenant, ())
+
+    @contextmanager
+    def fan_out(self, tenant: str, text: str) -> Iterator[None]:
+        """Ставим text в очереди получателей и выполняем блок with.
+        Основной чат отправляется внутри блока, параллельно с остальными;
+        их ответа поток опроса не ждёт.
+        """
+        self._submit(tenant, text)
+        yield
+
+    def deliver(
+        self, tenant: str, text: str
+    ) -> Dict[str, Optional[BaseException]]:
+        """Рассылаем text и ждём до timeout ошибку каждого получателя."""
+        futures = self._submit(tenant, text)
+        done, not_done = wait(futures.values(), timeout=self.timeout)
+        if not_done:
+            self.metrics.inc('routing.timeouts', len(not_done))
+        return {
+            name: future.result() if future in done else TimeoutError()
+            for name, future in futures.items()
+        }
+
+    def shutdown(self) -> None:
+        """Дожидаемся отправки очередей и останавливаем потоки."""
+        with self._lock:
+            lanes, self._lanes = list(self._lanes.values()), {}
+        for lane in lanes:
+            lane.queue.put(None)
+        for lane in lanes:
+            lane.thread.join(self.timeout)
+            if lane.thread.is_alive():
+                logging.warning(
+                    f'{lane.destination.name} не ответил за {self.timeout} с'
+                )
+
+    def _submit(self, tenant: str, text: str) -> Dict[str, Future]:
+        futures: Dict[str, Future] = {}
+        for destination in self.destinations(tenant):
+            future: Future = Future()
+            try:
+                self._lane(destination).queue.put_nowait((text, future))
+            except queue.Full:
+                self.metrics.inc('routing.dropped')
+                logging.warning(
+                    f'Очередь {destination.name} переполнена, '
+                    'уведомление сброшено'
+                )
+                future.set_result(OverflowError(destination.name))
+            futures[destination.name] = future
+        return futures
+
+    def _lane(self, destination: Destination) -> _Lane:
+        with self._lock:
+            lane = self._lanes.get(id(destination))
+            if lane is None:
+                lane = self._lanes[id(destination)] = _Lane(
+                    destination, self, self.queue_size
+                )
+            return lane
+
+    def _send(
+        self, destination: Destination, text: str
+    ) -> Optional[BaseException]:
+        try:
+            destination.send(text)
+        except Exception as error:
+            self.metrics.inc('routing.failed')
+            logging.error(
+                f'Не удалось отправить уведомление в {destination.name}: '
+                f'{error}'
+            )
+            return error
+        self.metrics.inc('routing.sent')
+        return None
@@ -0,0 +1,319 @@
+"""Планировщики опросов API для нескольких подписчиков.
+PollScheduler - куча, TimingWheelScheduler - иерархическое колесо
+таймеров для сотен тысяч подписок.
+
+Сравнение на виртуальных часах:
+    python scheduler.py [--timers N] [--seed N]
+"""
+import argparse
+import heapq
+import itertools
+import math
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from clock import Clock, InjectedClock, VirtualClock
+
+# Задача опроса возвращает паузу до следующего запуска или None,
+# если опрашивать больше не нужно.
+PollJob = Callable[[], Optional[float]]
+
+
+class PollScheduler:
+    """Очередь опросов по ключу подписчика.
+    Время берётся из переданных часов, по умолчанию из clock.get_clock().
+    """
+
+    clock = InjectedClock()
+
+    def __init__(self, clock: Optional[Clock] = None) -> None:
+        self.clock = clock
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._jobs: Dict[Hashable, Tuple[int, PollJob]] = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._jobs
+
+    def schedule(self, key: Hashable, job: PollJob, delay: float = 0) -> None:
+        """Ставим (или переставляем) опрос key через delay секунд."""
+        seq = next(self._counter)
+        self._jobs[key] = (seq, job)
+        heapq.heappush(self._heap, (self.clock.time() + delay, seq, key))
+
+    def cancel(self, key: Hashable) -> None:
+        """Снимаем опрос key, запись в куче отбрасывается при извлечении."""
+        self._jobs.pop(key, None)
+
+    def next_due(self) -> Optional[float]:
+        """Момент ближайшего опроса или None, если очередь пуста."""
+        self._drop_cancelled()
+        return self._heap[0][0] if self._heap else None
+
+    def run_pending(self) -> int:
+        """Выполняем все опросы, срок которых наступил."""
+        executed = 0
+        now = self.clock.time()
+        while True:
+            self._drop_cancelled()
+            if not self._heap or self._heap[0][0] > now:
+                return executed
+            _, _, key = heapq.heappop(self._heap)
+            _, job = self._jobs.pop(key)
+            self._run_job(key, job)
+            executed += 1
+
+    def run(self, until: Optional[float] = None) -> None:
+        """Крутим цикл опросов до момента until или пока есть задачи."""
+        while True:
+            due = self.next_due()
+            if due is None or (until is not None and due > until):
+                break
+            pause = due - self.clock.time()
+            if pause > 0:
+                self.clock.sleep(pause)
+            self.run_pending()
+        if until is not None and until > self.clock.time():
+            self.clock.sleep(until - self.clock.time())
+
+    def _run_job(self, key: Hashable, job: PollJob) -> None:
+        delay = job()
+        if delay is not None and key not in self._jobs:
+            self.schedule(key, job, delay)
+
+    def _drop_cancelled(self) -> None:
+        heap, jobs = self._heap, self._jobs
+        while heap:
+            _, seq, key = heap[0]
+            current = jobs.get(key)
+            if current is not None and current[0] == seq:
+                return
+            heapq.heappop(heap)
+
+
+class _Timer:
+    """Таймер колеса: тик срабатывания, задача и место в колесе."""
+
+    __slots__ = ('tick', 'job', 'level', 'index')
+
+    def __init__(self, tick: int, job: PollJob) -> None:
+        self.tick = tick
+        self.job = job
+        self.level = 0
+        self.index = 0
+
+
+class TimingWheelScheduler(PollScheduler):
+    """Иерархическое колесо таймеров: вставка и отмена за O(1).
+    Ячейка уровня L покрывает slots ** L тиков. Таймер кладётся на
+    нижний уровень, куда помещается, и спускается ниже, когда колесо
+    доходит до его ячейки. Срок округляется вверх до тика, раньше
+    срока задача не запускается.
+    """
+
+    def __init__(
+        self,
+        clock: Optional[Clock] = None,
+        tick: float = 1.0,
+        slots: int = 64,
+        levels: int = 4,
+    ) -> None:
+        if slots < 2 or slots & (slots - 1):
+            raise ValueError(f'Число ячеек не степень двойки: {slots}')
+        self.clock = clock
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self._bits = slots.bit_length() - 1
+        self._mask = slots - 1
+        # Последний уровень из одной ячейки - таймеры дальше всех колёс,
+        # они перекладываются при полном обороте верхнего колеса.
+        self._wheels: List[List[Dict[Hashable, _Timer]]] = [
+            [{} for _ in range(slots)] for _ in range(levels)
+        ] + [[{}]]
+        self._counts: List[int] = [0] * (levels + 1)
+        self._jobs: Dict[Hashable, _Timer] = {}
+        # Следующий необработанный тик; задаётся при первой вставке.
+        self._current: Optional[int] = None
+
+    def schedule(self, key: Hashable, job: PollJob, delay: float = 0) -> None:
+        """Ставим (или переставляем) опрос key через delay секунд."""
+        self.cancel(key)
+        if self._current is None:
+            self._current = self._now_tick()
+        # Задача без паузы идёт на текущий тик: ближайший run_pending
+        # всё равно не раньше её срока.
+        due = (
+            self._now_tick()
+            if delay <= 0
+            else math.ceil(round((self.clock.time() + delay) / self.tick, 9))
+        )
+        timer = _Timer(max(due, self._current), job)
+        self._jobs[key] = timer
+        self._place(key, timer)
+
+    def cancel(self, key: Hashable) -> None:
+        """Снимаем опрос key."""
+        timer = self._jobs.pop(key, None)
+        if timer is not None:
+            del self._wheels[timer.level][timer.index][key]
+            self._counts[timer.level] -= 1
+
+    def next_due(self) -> Optional[float]:
+        """Момент ближайшего тика, на котором колесу есть что делать.
+        Для верхних уровней это спуск первой непустой ячейки, а точный
+        срок находится уже на нижнем уровне - без перебора таймеров.
+        """
+        if not self._jobs:
+            return None
+        return min(
+            self._next_block(level) << (self._bits * level)
+            for level in range(self.levels + 1)
+            if self._counts[level]
+        ) * self.tick
+
+    def run_pending(self) -> int:
+        """Прокручиваем колесо до текущего тика, запуская задачи."""
+        if self._current is None:
+            return 0
+        executed = 0
+        now = self._now_tick()
+        while self._current <= now:
+            tick = self._current
+            if not tick & self._mask:
+                self._cascade(tick)
+            slot = self._wheels[0][tick & self._mask]
+            while slot:
+                key, timer = slot.popitem()
+                self._counts[0] -= 1
+                del self._jobs[key]
+                self._run_job(key, timer.job)
+                executed += 1
+            # На пустом нижнем колесе прыгаем сразу к его обороту.
+            self._current = (
+                tick + 1
+                if self._counts[0]
+                else min((tick | self._mask) + 1, now + 1)
+            )
+        return executed
+
+    def _now_tick(self) -> int:
+        return math.floor(self.clock.time() / self.tick)
+
+    def _next_block(self, level: int) -> int:
+        # Номер блока первой непустой ячейки уровня по ходу колеса.
+        # Блок текущего тика уже спущен, если тик не на его границе.
+        shift = self._bits * level
+        block = (self._current >> shift) + (
+            1 if level and self._current & ((1 << shift) - 1) else 0
+        )
+        if level == self.levels:
+            return block
+        wheel = self._wheels[level]
+        for offset in range(self.slots):
+            if wheel[(block + offset) & self._mask]:
+                return block + offset
+        return block
+
+    def _place(self, key: Hashable, timer: _Timer) -> None:
+        delta = timer.tick - self._current
+        level, index = self.levels, 0
+        for candidate in range(self.levels):
+            if delta < 1 << (self._bits * (candidate + 1)):
+                shift = self._bits * candidate
+                level, index = candidate, (timer.tick >> shift) & self._mask
+                break
+        timer.level, timer.index = level, index
+        self._wheels[level][index][key] = timer
+        self._counts[level] += 1
+
+    def _cascade(self, tick: int) -> None:
+        for level in range(1, self.levels + 1):
+            if tick & ((1 << (self._bits * level)) - 1):
+                return
+            index = (
+                0
+                if level == self.levels
+                else (tick >> (self._bits * level)) & self._mask
+            )
+            slot = self._wheels[level][index]
+            if not slot:
+                continue
+            timers = list(slot.items())
+            slot.clear()
+            self._counts[level] -= len(timers)
+            for key, timer in timers:
+                self._place(key, timer)
+
+
+def benchmark(
+    scheduler: PollScheduler,
+    clock: VirtualClock,
+    timers: int,
+    period: float = 600,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Нагрузка на планировщик: вставка, перестановка, отмена и прогон.
+    Каждая задача срабатывает один раз; задержка срабатывания (jitter)
+    считается по виртуальным часам, время работы - по настоящим.
+    """
+    randomizer = random.Random(seed)
+    delays = [randomizer.uniform(0, period) for _ in range(timers)]
+    lateness: List[float] = []
+
+    def make_job(due: float) -> PollJob:
+        def job() -> None:
+            lateness.append(clock.time() - due)
+
+        return job
+
+    started = time.perf_counter()
+    for key, delay in enumerate(delays):
+        scheduler.schedule(key, make_job(clock.time() + delay), delay)
+    inserted = time.perf_counter()
+    # Половина подписок переставляется, десятая часть отменяется.
+    for key in range(0, timers, 2):
+        delay = delays[key] / 2
+        scheduler.schedule(key, make_job(clock.time() + delay), delay)
+    for key in range(0, timers, 10):
+        scheduler.cancel(key)
+    churned = time.perf_counter()
+    scheduler.run()
+    finished = time.perf_counter()
+    fired = len(lateness)
+    lateness.sort()
+
+    def quantile(q: float) -> float:
+        return lateness[min(int(fired * q), fired - 1)] if fired else 0.0
+
+    return {
+        'scheduler': type(scheduler).__name__,
+        'timers': timers,
+        'insert_us': (inserted - started) / timers * 1e6,
+        'churn_us': (churned - inserted) / (timers // 2 + timers // 10) * 1e6,
+        'run_seconds': finished - churned,
+        'fired': fired,
+        'jitter_p50': quantile(0.5),
+        'jitter_p99': quantile(0.99),
+        'jitter_max': quantile(1.0),
+    }
+
+
+def main(argv: List[str]) -> None:
+    """Сравниваем кучу и колесо таймеров."""
+    parser = argparse.ArgumentParser(description='Нагрузка на планировщики')
+    parser.add_argument('--timers', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    for factory in (PollScheduler, TimingWheelScheduler):
+        clock = VirtualClock()
+        print(benchmark(factory(clock), clock, args.timers, seed=args.seed))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
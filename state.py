@@ -0,0 +1,47 @@
+"""Долговременное состояние бота между перезапусками."""
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+
+def write_json_atomic(path: str, data: Dict[str, Any]) -> None:
+    """Пишем json во временный файл и подменяем им исходный.
+    После сбоя на диске остаётся либо старая, либо новая версия.
+    """
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='UTF-8') as file:
+        json.dump(data, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+class CursorStore:
+    """Курсор опроса: current_date последнего успешного ответа API."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._saved: Optional[int] = None
+
+    def load(self, default: int) -> int:
+        """Сохранённый курсор или default, если файла нет или он битый."""
+        try:
+            with open(self.path, encoding='UTF-8') as file:
+                cursor = json.load(file)['cursor']
+        except FileNotFoundError:
+            return default
+        except (ValueError, KeyError, TypeError) as error:
+            logging.error(f'Повреждён файл состояния {self.path}: {error}')
+            return default
+        if not isinstance(cursor, int):
+            return default
+        self._saved = cursor
+        return cursor
+
+    def save(self, cursor: int) -> None:
+        """Сохраняем курсор, если он изменился."""
+        if cursor == self._saved:
+            return
+        write_json_atomic(self.path, {'cursor': cursor})
+        self._saved = cursor
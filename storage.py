@@ -0,0 +1,256 @@
+"""Журнал переходов статусов домашек в SQLite.
+Каждая смена статуса пишется одной строкой; запись идёт пачками.
+"""
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+SCHEMA: Tuple[str, ...] = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    """CREATE TABLE IF NOT EXISTS transitions (
+        id INTEGER PRIMARY KEY,
+        tenant TEXT NOT NULL,
+        homework TEXT NOT NULL,
+        status TEXT NOT NULL,
+        changed_at INTEGER NOT NULL,
+        observed_at INTEGER NOT NULL
+    )""",
+    """CREATE INDEX IF NOT EXISTS transitions_by_homework
+        ON transitions (tenant, homework, changed_at)""",
+    """CREATE INDEX IF NOT EXISTS transitions_by_time
+        ON transitions (changed_at, status)""",
+)
+COLUMNS: Tuple[str, ...] = (
+    'tenant',
+    'homework',
+    'status',
+    'changed_at',
+    'observed_at',
+)
+# Строка журнала: tenant, homework, status, changed_at, observed_at.
+Transition = Tuple[str, str, str, int, int]
+
+
+def parse_date_updated(value: Optional[str], default: int) -> int:
+    """date_updated из ответа API в unix-время, иначе default."""
+    if not value:
+        return default
+    try:
+        return int(
+            datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+        )
+    except ValueError:
+        return default
+
+
+class TimelineStore:
+    """Журнал переходов с индексами по подписчику, домашке и времени.
+    Соединение открывается при первом обращении.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._pending: List[Transition] = []
+        # Последний статус домашки по подписчикам: отсекает повторы.
+        self._last_status: Dict[str, Dict[str, Optional[str]]] = {}
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Открытое соединение с базой."""
+        if self._connection is None:
+            self._connection = sqlite3.connect(
+                self.path, check_same_thread=False
+            )
+            for statement in SCHEMA:
+                self._connection.execute(statement)
+        return self._connection
+
+    def record(
+        self, tenant: str, homework: Dict[str, Any], observed_at: int
+    ) -> bool:
+        """Ставим в очередь запись, если статус домашки изменился."""
+        name, status = homework.get('homework_name'), homework.get('status')
+        if not name or not status:
+            return False
+        with self._lock:
+            if self._last(tenant, name) == status:
+                return False
+            self._last_status[tenant][name] = status
+            self._pending.append(
+                (
+                    tenant,
+                    name,
+                    status,
+                    parse_date_updated(
+                        homework.get('date_updated'), observed_at
+                    ),
+                    observed_at,
+                )
+            )
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+        return True
+
+    def record_many(self, rows: Iterable[Transition]) -> None:
+        """Пишем готовые строки без проверки на повтор, для импорта."""
+        with self._lock:
+            self._pending.extend(rows)
+            self.flush()
+
+    def flush(self) -> int:
+        """Пишем накопленное одной транзакцией."""
+        with self._lock:
+            if not self._pending:
+                return 0
+            rows, self._pending = self._pending, []
+            with self.connection:
+                self.connection.executemany(
+                    'INSERT INTO transitions '
+                    f'({", ".join(COLUMNS)}) VALUES (?, ?, ?, ?, ?)',
+                    rows,
+                )
+            return len(rows)
+
+    def history(
+        self,
+        tenant: Optional[str] = None,
+        homework: Optional[str] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        status: Optional[str] = None,
+    ) -> List[Transition]:
+        """Переходы по фильтрам в порядке времени."""
+        where, params = self._filters(tenant, homework, since, until, status)
+        with self._lock:
+            self.flush()
+            return self.connection.execute(
+                f'SELECT {", ".join(COLUMNS)} FROM transitions{where} '
+                'ORDER BY changed_at, id',
+                params,
+            ).fetchall()
+
+    def count_by_status(
+        self,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        tenant: Optional[str] = None,
+    ) -> Dict[str, int]:
+        """Сколько переходов в каждый статус за период."""
+        where, params = self._filters(tenant, None, since, until, None)
+        with self._lock:
+            self.flush()
+            return dict(
+                self.connection.execute(
+                    'SELECT status, COUNT(*) FROM transitions'
+                    f'{where} GROUP BY status',
+                    params,
+                ).fetchall()
+            )
+
+    def review_durations(
+        self,
+        start: str,
+        ends: Sequence[str],
+        resolution: int,
+        offset: int = 0,
+        since: Optional[int] = None,
+    ) -> List[Tuple[str, int, int, int]]:
+        """Гистограмма длительностей переходов из start в один из ends.
+        Строки: homework, час начала со смещением offset, длительность
+        с точностью resolution секунд, число переходов. Пары и группы
+        считает SQLite по индексу домашек.
+        """
+        where, params = self._filters(None, None, since, None, None)
+        with self._lock:
+            self.flush()
+            return self.connection.execute(
+                'SELECT homework, (started + ?) / 3600 % 24 AS hour, '
+                '(changed_at - started) / ? * ? AS duration, COUNT(*) '
+                'FROM (SELECT homework, status, changed_at, '
+                'LAG(status) OVER steps AS previous, '
+                'LAG(changed_at) OVER steps AS started '
+                f'FROM transitions{where} WINDOW steps AS '
+                '(PARTITION BY tenant, homework ORDER BY changed_at, id)) '
+                f'WHERE previous = ? AND status IN '
+                f'({", ".join("?" * len(ends))}) '
+                'GROUP BY homework, hour, duration',
+                [offset, resolution, resolution, *params, start, *ends],
+            ).fetchall()
+
+    def current_statuses(self, tenant: str) -> Dict[str, Tuple[str, int]]:
+        """Последний статус и время перехода каждой домашки подписчика."""
+        with self._lock:
+            self.flush()
+            rows = self.connection.execute(
+                'SELECT homework, status, MAX(changed_at) FROM transitions '
+                'WHERE tenant = ? GROUP BY homework',
+                (tenant,),
+            ).fetchall()
+        return {name: (status, changed) for name, status, changed in rows}
+
+    def close(self) -> None:
+        """Дописываем очередь и закрываем соединение."""
+        with self._lock:
+            self.flush()
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def statuses(self, tenant: str) -> Dict[str, Optional[str]]:
+        """Известные в памяти последние статусы домашек подписчика."""
+        with self._lock:
+            return self._last_status.setdefault(tenant, {})
+
+    def adopt(
+        self, tenant: str, statuses: Dict[str, Optional[str]]
+    ) -> Dict[str, Optional[str]]:
+        """Возвращаем в память статусы, выгруженные через forget()."""
+        with self._lock:
+            known = self._last_status.setdefault(tenant, {})
+            for name, status in statuses.items():
+                known.setdefault(name, status)
+            return known
+
+    def forget(self, tenant: str) -> Dict[str, Optional[str]]:
+        """Выгружаем статусы подписчика из памяти; журнал не меняется."""
+        with self._lock:
+            return self._last_status.pop(tenant, {})
+
+    def _last(self, tenant: str, homework: str) -> Optional[str]:
+        known = self._last_status.setdefault(tenant, {})
+        if homework not in known:
+            row = self.connection.execute(
+                'SELECT status FROM transitions '
+                'WHERE tenant = ? AND homework = ? '
+                'ORDER BY changed_at DESC, id DESC LIMIT 1',
+                (tenant, homework),
+            ).fetchone()
+            known[homework] = row[0] if row else None
+        return known[homework]
+
+    @staticmethod
+    def _filters(
+        tenant: Optional[str],
+        homework: Optional[str],
+        since: Optional[int],
+        until: Optional[int],
+        status: Optional[str],
+    ) -> Tuple[str, List[Any]]:
+        conditions, params = [], []
+        for condition, value in (
+            ('tenant = ?', tenant),
+            ('homework = ?', homework),
+            ('changed_at >= ?', since),
+            ('changed_at < ?', until),
+            ('status = ?', status),
+        ):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        where = f' WHERE {" AND ".join(conditions)}' if conditions else ''
+        return where, params
@@ -1,5 +1,6 @@
 import os
 import sys
+import tempfile
 
 import pytest_timeout
 
@@ -50,3 +51,9 @@ pytest_timeout.write = write_timeout_reasons
 os.environ['PRACTICUM_TOKEN'] = 'sometoken'
 os.environ['TELEGRAM_TOKEN'] = '1234:abcdefg'
 os.environ['TELEGRAM_CHAT_ID'] = '12345'
+DATA_DIR = tempfile.mkdtemp()
+os.environ['STATE_FILE'] = os.path.join(DATA_DIR, 'state.json')
+os.environ['TIMELINE_FILE'] = os.path.join(DATA_DIR, 'timeline.sqlite3')
+os.environ['OUTBOX_FILE'] = os.path.join(DATA_DIR, 'outbox.jsonl')
+os.environ['CARDS_FILE'] = os.path.join(DATA_DIR, 'cards.json')
+os.environ['TENANT_STATE_FILE'] = os.path.join(DATA_DIR, 'tenants.sqlite3')
@@ -0,0 +1,91 @@
+import pytest
+
+from analytics import (
+    MAX_DELAY_FACTOR,
+    MIN_DELAY_FACTOR,
+    TARGET_CHANCE,
+    PollAdvisor,
+    ReviewModel,
+    hinted_delay,
+    review_samples,
+)
+from clock import VirtualClock
+from storage import TimelineStore
+
+HOUR = 60 * 60
+RETRY_PERIOD = 600
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TimelineStore(str(tmp_path / 'timeline.sqlite3'))
+    rows = []
+    for index in range(40):
+        started = index * 24 * HOUR
+        rows.append(('bob', f'hw{index}', 'reviewing', started, started))
+        # Половина проверок длится 2 часа, половина - 4 часа.
+        finished = started + (2 if index % 2 else 4) * HOUR
+        rows.append(('bob', f'hw{index}', 'approved', finished, finished))
+    store.record_many(rows)
+    yield store
+    store.close()
+
+
+def test_review_samples_pair_reviewing_with_verdict():
+    rows = [
+        ('alice', 'hw1', 'reviewing', 100, 100),
+        ('alice', 'hw2', 'approved', 150, 150),
+        ('alice', 'hw1', 'rejected', 400, 400),
+    ]
+    samples = review_samples(rows)
+    assert [(s.homework, s.duration, s.verdict) for s in samples] == [
+        ('hw1', 300, 'rejected')
+    ]
+
+
+def test_quantiles_and_conditional_chance(store):
+    model = ReviewModel.from_store(store)
+    assert model.quantiles()['samples'] == 40
+    assert model.verdict_chance('hw', 0, elapsed=0, horizon=HOUR) == 0
+    assert model.verdict_chance('hw', 0, elapsed=HOUR, horizon=HOUR) == 0.5
+    assert model.verdict_chance('hw', 0, elapsed=3 * HOUR, horizon=HOUR) == 1
+    assert model.verdict_chance('hw', 0, elapsed=5 * HOUR, horizon=1) == 1
+
+
+def test_hinted_delay_bounds():
+    assert hinted_delay(None, RETRY_PERIOD) == RETRY_PERIOD
+    assert hinted_delay(0, RETRY_PERIOD) == RETRY_PERIOD * MAX_DELAY_FACTOR
+    assert hinted_delay(1, RETRY_PERIOD) == RETRY_PERIOD * TARGET_CHANCE
+    assert hinted_delay(0.25, RETRY_PERIOD) == RETRY_PERIOD
+    assert hinted_delay(5, RETRY_PERIOD) == RETRY_PERIOD * MIN_DELAY_FACTOR
+
+
+def test_advisor_polls_often_near_expected_verdict(store):
+    clock = VirtualClock(start=1000 * 24 * HOUR)
+    advisor = PollAdvisor(store, clock=clock)
+    assert advisor.delay('alice', RETRY_PERIOD) == RETRY_PERIOD
+
+    review_start = int(clock.time())
+    store.record(
+        'alice',
+        {'homework_name': 'hw_new', 'status': 'reviewing'},
+        review_start,
+    )
+    assert advisor.delay('alice', RETRY_PERIOD) > RETRY_PERIOD
+    clock.sleep(2 * HOUR - RETRY_PERIOD / 2)
+    assert advisor.delay('alice', RETRY_PERIOD) < RETRY_PERIOD
+
+    advisor.enabled = False
+    assert advisor.delay('alice', RETRY_PERIOD) == RETRY_PERIOD
+
+
+def test_sql_histogram_matches_samples(store):
+    model = ReviewModel.from_store(store)
+    reference = ReviewModel.from_samples(review_samples(store.history()))
+    for homework in ('hw1', 'other'):
+        assert model.quantiles(homework, 0) == reference.quantiles(
+            homework, 0
+        )
+    assert len(store.review_durations(
+        'reviewing', ('approved', 'rejected'), 60
+    )) < len(store.history())
@@ -0,0 +1,97 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from backfill import DAY, BackfillProgress, backfill_tenant, run_backfill
+from config import Settings, TenantSettings
+from storage import TimelineStore
+
+SETTINGS = Settings(
+    practicum_token='token',
+    telegram_chat_id='1',
+    tenants=(TenantSettings('alice', practicum_token='alice-token'),),
+)
+
+
+def iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime(
+        '%Y-%m-%dT%H:%M:%SZ'
+    )
+
+
+class FakeApi:
+    """Пять домашек с обновлением раз в 10 дней."""
+
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.fail_on = fail_on
+
+    def __call__(self, from_date, tenant, headers):
+        self.calls.append((tenant, from_date))
+        if from_date == self.fail_on:
+            raise ConnectionError('interrupted')
+        homeworks = [
+            {
+                'homework_name': f'hw{index}',
+                'status': 'approved',
+                'date_updated': iso(index * 10 * DAY),
+            }
+            for index in range(5)
+            if index * 10 * DAY >= from_date
+        ]
+        return {'homeworks': homeworks, 'current_date': 50 * DAY}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TimelineStore(str(tmp_path / 'timeline.sqlite3'))
+    yield store
+    store.close()
+
+
+def test_backfill_all_tenants_in_parallel(tmp_path, store):
+    progress = BackfillProgress(str(tmp_path / 'backfill.json'))
+    api = FakeApi()
+    recorded = run_backfill(SETTINGS, api, store, progress, 0, 50 * DAY)
+    assert recorded == {'default': 5, 'alice': 5}
+    assert sorted(api.calls) == [('alice', 0), ('default', 0)]
+    assert len(store.history(tenant='alice')) == 5
+    assert progress.loaded_until('alice') == 50 * DAY
+
+
+def test_backfill_skips_records_outside_range(tmp_path, store):
+    progress = BackfillProgress(str(tmp_path / 'backfill.json'))
+    tenant = SETTINGS.tenant('alice')
+    assert backfill_tenant(
+        tenant, 15 * DAY, 35 * DAY, FakeApi(), store, progress
+    ) == 2
+    assert [row[1] for row in store.history(tenant='alice')] == [
+        'hw2', 'hw3'
+    ]
+
+
+def test_backfill_resumes_after_interruption(tmp_path, store, monkeypatch):
+    path = str(tmp_path / 'backfill.json')
+    tenant = SETTINGS.tenant('alice')
+    record = store.record
+
+    def broken(tenant, homework, changed_at):
+        if homework['homework_name'] == 'hw3':
+            raise ConnectionError('interrupted')
+        return record(tenant, homework, changed_at)
+
+    monkeypatch.setattr(store, 'record', broken)
+    with pytest.raises(ConnectionError):
+        backfill_tenant(
+            tenant, 0, 50 * DAY, FakeApi(), store, BackfillProgress(path),
+            batch=2,
+        )
+    assert BackfillProgress(path).loaded_until('alice') == 10 * DAY
+
+    monkeypatch.setattr(store, 'record', record)
+    api = FakeApi()
+    backfill_tenant(
+        tenant, 0, 50 * DAY, api, store, BackfillProgress(path), batch=2
+    )
+    assert api.calls == [('alice', 10 * DAY)]
+    assert len(store.history(tenant='alice')) == 5
@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+
+from backpressure import PRIORITY_ERROR, PRIORITY_STATUS, SendQueue
+from metrics import MetricsRegistry
+
+
+class SlowChat:
+    """Отправка, которая ждёт release; первое сообщение занимает поток."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.sent = []
+
+    def task(self, text):
+        def send():
+            self.started.set()
+            self.release.wait(1)
+            self.sent.append(text)
+
+        return send
+
+
+@pytest.fixture
+def chat():
+    return SlowChat()
+
+
+@pytest.fixture
+def queue(chat):
+    queue = SendQueue(capacity=2, wait=0.05, metrics=MetricsRegistry())
+    yield queue
+    chat.release.set()
+    queue.shutdown()
+
+
+def fill(queue, chat, *texts, priority=PRIORITY_STATUS):
+    for text in texts:
+        queue.submit(text, chat.task(text), priority)
+
+
+def test_without_capacity_sends_inline(chat):
+    queue = SendQueue(metrics=MetricsRegistry())
+    chat.release.set()
+    fill(queue, chat, 'a')
+    assert chat.sent == ['a']
+
+
+def test_full_queue_blocks_then_sheds_errors_first(queue, chat):
+    fill(queue, chat, 'busy')
+    chat.started.wait(1)
+    fill(queue, chat, 'error', priority=PRIORITY_ERROR)
+    fill(queue, chat, 'status')
+    fill(queue, chat, 'status 2')
+    metrics = queue.metrics
+    assert metrics.counter('sendqueue.blocked') == 1
+    assert metrics.counter('sendqueue.shed.low_priority') == 1
+    assert metrics.gauge('sendqueue.pressure') == 1.0
+    assert metrics.histogram('sendqueue.wait_seconds').count == 1
+
+    chat.release.set()
+    queue.shutdown()
+    assert chat.sent == ['busy', 'status', 'status 2']
+
+
+def test_duplicates_and_overflowing_errors_are_dropped(queue, chat):
+    fill(queue, chat, 'busy')
+    chat.started.wait(1)
+    fill(queue, chat, 'a', 'a', 'b')
+    fill(queue, chat, 'error', priority=PRIORITY_ERROR)
+    assert queue.metrics.counter('sendqueue.shed.duplicate') == 1
+    assert queue.metrics.counter('sendqueue.shed.overflow') == 1
+    chat.release.set()
+    queue.shutdown()
+    assert chat.sent == ['busy', 'a', 'b']
+
+
+def test_status_without_room_waits_for_room_in_order(queue, chat):
+    fill(queue, chat, 'busy')
+    chat.started.wait(1)
+    fill(queue, chat, 'a', 'b')
+    caller = threading.Thread(target=fill, args=(queue, chat, 'c'))
+    caller.start()
+    caller.join(0.2)
+    assert caller.is_alive()
+    assert chat.sent == []
+
+    chat.release.set()
+    caller.join(1)
+    queue.shutdown()
+    assert chat.sent == ['busy', 'a', 'b', 'c']
+    assert queue.metrics.counter('sendqueue.stalled') == 1
+
+
+def test_disabled_queue_sends_behind_pending(queue, chat):
+    fill(queue, chat, 'busy')
+    chat.started.wait(1)
+    fill(queue, chat, 'a')
+    queue.configure(0, 0.05)
+    fill(queue, chat, 'b')
+    chat.release.set()
+    queue.shutdown()
+    assert chat.sent == ['busy', 'a', 'b']
@@ -0,0 +1,59 @@
+import gzip
+import zlib
+
+import pytest
+
+from bandwidth import BandwidthReport, StreamDecoder, read_body
+from clock import VirtualClock
+from exceptions import DecoderError
+from metrics import MetricsRegistry
+
+BODY = b'{"homeworks": [], "current_date": 1}' * 50
+
+
+def chunked(data, size=7):
+    return [data[index:index + size] for index in range(0, len(data), size)]
+
+
+@pytest.fixture
+def metrics():
+    return MetricsRegistry()
+
+
+def test_gzip_is_decoded_by_chunks_and_counted(metrics):
+    wire = gzip.compress(BODY)
+    assert read_body(chunked(wire), 'gzip', 'alice', metrics) == BODY
+    assert metrics.counter('bandwidth.wire.alice') == len(wire)
+    assert metrics.counter('bandwidth.decoded.alice') == len(BODY)
+    assert metrics.counter('bandwidth.responses.alice') == 1
+
+
+def test_identity_and_broken_bodies(metrics):
+    assert read_body([BODY], None, 'bob', metrics) == BODY
+    with pytest.raises(DecoderError):
+        read_body([b'not gzip'], 'gzip', 'bob', metrics)
+    with pytest.raises(DecoderError):
+        StreamDecoder('zstd')
+
+
+def test_decoded_size_is_limited(metrics, monkeypatch):
+    monkeypatch.setattr('bandwidth.MAX_DECODED', 100)
+    with pytest.raises(DecoderError, match='больше 100'):
+        read_body([zlib.compress(BODY)], 'deflate', 'bob', metrics)
+
+
+def test_daily_report(metrics):
+    clock = VirtualClock(start=0)
+    report = BandwidthReport(period=100, metrics=metrics, clock=clock)
+    assert report.report_if_due() is None
+    read_body(chunked(gzip.compress(BODY)), 'gzip', 'alice', metrics)
+    read_body([BODY], 'identity', 'bob', metrics)
+    clock.sleep(100)
+    daily = report.report_if_due()
+    assert daily['total']['decoded'] == 2 * len(BODY)
+    assert daily['tenants']['bob']['ratio'] == 1.0
+    assert daily['tenants']['alice']['ratio'] < 0.5
+    assert metrics.gauge('bandwidth.daily.decoded') == 2 * len(BODY)
+
+    clock.sleep(100)
+    assert report.report_if_due()['total']['responses'] == 0
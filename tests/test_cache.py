@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+
+from cache import ResponseCache
+from clock import VirtualClock
+from config import SettingsStore
+from metrics import MetricsRegistry
+
+
+@pytest.fixture
+def clock():
+    return VirtualClock()
+
+
+@pytest.fixture
+def cache(clock):
+    return ResponseCache(
+        ttl=60, maxsize=2, clock=clock, metrics=MetricsRegistry()
+    )
+
+
+def test_ttl_expiry(cache, clock):
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return {'homeworks': []}
+
+    cache.get('alice', loader)
+    cache.get('alice', loader)
+    assert len(loads) == 1
+    clock.sleep(61)
+    cache.get('alice', loader)
+    assert len(loads) == 2
+    assert cache.hit_rate() == pytest.approx(1 / 3)
+
+
+def test_lru_eviction(cache):
+    for key in ('alice', 'bob', 'alice', 'carol'):
+        cache.get(key, lambda: key)
+    assert cache.peek('alice') == 'alice'
+    assert cache.peek('bob') is None
+    assert len(cache) == 2
+
+
+def test_refresh_bypasses_cache(cache):
+    cache.get('alice', lambda: 'old')
+    assert cache.get('alice', lambda: 'new', refresh=True) == 'new'
+    assert cache.peek('alice') == 'new'
+
+
+def test_errors_are_not_cached(cache):
+    def broken():
+        raise ConnectionError('down')
+
+    with pytest.raises(ConnectionError):
+        cache.get('alice', broken)
+    assert cache.get('alice', lambda: 'ok') == 'ok'
+
+
+def test_single_flight_shares_one_request():
+    cache = ResponseCache(metrics=MetricsRegistry())
+    calls = []
+    started = threading.Event()
+
+    def slow_loader():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return 'shared'
+
+    results = []
+    leader = threading.Thread(
+        target=lambda: results.append(cache.get('alice', slow_loader))
+    )
+    leader.start()
+    started.wait()
+    followers = [
+        threading.Thread(
+            target=lambda: results.append(cache.get('alice', slow_loader))
+        )
+        for _ in range(5)
+    ]
+    for thread in followers:
+        thread.start()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert calls == [1]
+    assert results == ['shared'] * 6
+
+
+def test_latest_answer_per_key_across_requests(cache):
+    cache.get('alice', lambda: 'cursor 1', request=('alice', 1))
+    cache.get('alice', lambda: 'cursor 2', refresh=True, request=('alice', 2))
+    assert cache.get('alice', lambda: 'unused') == 'cursor 2'
+    assert len(cache) == 1
+
+
+def test_load_statuses_hits_only_the_same_cursor(cache, monkeypatch):
+    import homework
+
+    calls = []
+
+    def request_statuses(timestamp, tenant, headers):
+        calls.append(timestamp)
+        return {'homeworks': [], 'current_date': timestamp}
+
+    settings = SettingsStore()
+    settings.load([], {'practicum_token': 'token'})
+    monkeypatch.setattr(homework, 'SETTINGS', settings)
+    monkeypatch.setattr(homework, 'CACHE', cache)
+    monkeypatch.setattr(homework, 'request_statuses', request_statuses)
+    homework.load_statuses(1000, refresh=True)
+    assert homework.load_statuses(0)['current_date'] == 0
+    assert homework.latest_statuses()['current_date'] == 0
+    assert calls == [1000, 0]
+    with pytest.raises(KeyError):
+        homework.latest_statuses('nobody')
@@ -0,0 +1,206 @@
+import functools
+import types
+
+import pytest
+from telegram.error import BadRequest, NetworkError, TimedOut
+
+import homework
+from cards import (
+    CARD_HISTORY,
+    StatusCard,
+    StatusCardStore,
+    render_card,
+)
+from clock import VirtualClock, use_clock
+
+
+class FakeBot:
+    def __init__(self, edit_error=None, failing_edits=None):
+        self.edit_error = edit_error
+        self.failing_edits = failing_edits
+        self.sent = []
+        self.edited = []
+
+    def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+        return types.SimpleNamespace(message_id=len(self.sent))
+
+    def edit_message_text(self, text, chat_id, message_id):
+        if self.edit_error and self.failing_edits != 0:
+            if self.failing_edits:
+                self.failing_edits -= 1
+            raise self.edit_error
+        self.edited.append((chat_id, message_id, text))
+
+
+@pytest.fixture
+def cards(tmp_path, monkeypatch):
+    store = StatusCardStore(str(tmp_path / 'cards.json'))
+    store.enabled = True
+    monkeypatch.setattr(homework, 'CARDS', store)
+    return store
+
+
+def test_store_survives_restart(tmp_path):
+    path = str(tmp_path / 'cards.json')
+    StatusCardStore(path).put('default', 'hw', StatusCard('1', 7, ('a',)))
+    assert StatusCardStore(path).get('default', 'hw') == StatusCard(
+        '1', 7, ('a',)
+    )
+    assert StatusCardStore(path).get('default', 'other') is None
+
+
+def test_corrupt_file_is_ignored(tmp_path, caplog):
+    path = tmp_path / 'cards.json'
+    path.write_text('{', encoding='UTF-8')
+    assert StatusCardStore(str(path)).get('default', 'hw') is None
+    assert 'Повреждён' in caplog.text
+
+
+def test_status_change_edits_existing_card(cards):
+    bot = FakeBot()
+    chat_id = homework.chat_for(homework.DEFAULT_TENANT)
+    homework.update_card(bot, 'На проверке', 'hw', 'reviewing')
+    homework.update_card(bot, 'Принята', 'hw', 'approved')
+    assert bot.sent == [(chat_id, render_card('На проверке', ['reviewing']))]
+    assert bot.edited == [
+        (chat_id, 1, render_card('Принята', ['reviewing', 'approved']))
+    ]
+    assert cards.get('default', 'hw').history == ('reviewing', 'approved')
+
+
+def test_history_is_capped(cards):
+    bot = FakeBot()
+    for _ in range(CARD_HISTORY + 3):
+        homework.update_card(bot, 'На проверке', 'hw', 'reviewing')
+    assert len(cards.get('default', 'hw').history) == CARD_HISTORY
+
+
+def test_not_modified_counts_as_edited(cards):
+    chat_id = homework.chat_for(homework.DEFAULT_TENANT)
+    cards.put('default', 'hw', StatusCard(chat_id, 5, ('reviewing',)))
+    bot = FakeBot(BadRequest('Message is not modified'))
+    homework.update_card(bot, 'На проверке', 'hw', 'reviewing')
+    assert bot.sent == []
+
+
+def test_failed_edit_starts_new_card(cards):
+    chat_id = homework.chat_for(homework.DEFAULT_TENANT)
+    cards.put('default', 'hw', StatusCard(chat_id, 5, ('reviewing',)))
+    bot = FakeBot(BadRequest('Message to edit not found'))
+    homework.update_card(bot, 'Принята', 'hw', 'approved')
+    assert bot.sent == [
+        (chat_id, render_card('Принята', ['reviewing', 'approved']))
+    ]
+    assert cards.get('default', 'hw').message_id == 1
+
+
+@pytest.mark.parametrize(
+    'error', [NetworkError('down'), BadRequest('Chat not found')]
+)
+def test_failed_edit_is_kept_for_background_retry(cards, error):
+    chat_id = homework.chat_for(homework.DEFAULT_TENANT)
+    cards.put('default', 'hw', StatusCard(chat_id, 5, ('reviewing',)))
+    bot = FakeBot(error)
+    with use_clock(VirtualClock()) as clock:
+        homework.update_card(bot, 'Принята', 'hw', 'approved')
+    text = render_card('Принята', ['reviewing', 'approved'])
+    assert clock.sleeps == 0
+    assert bot.sent == []
+    assert cards.get('default', 'hw') == StatusCard(
+        chat_id, 5, ('reviewing', 'approved'), text
+    )
+
+
+def test_pending_edit_survives_restart(tmp_path):
+    path = str(tmp_path / 'cards.json')
+    card = StatusCard('1', 7, ('a', 'b'), 'text')
+    StatusCardStore(path).retry_later('default', 'hw', card, TimedOut())
+    restarted = StatusCardStore(path)
+    assert restarted.get('default', 'hw') == card
+    assert restarted.due() == [('default', 'hw', card)]
+
+
+def test_transient_edit_error_is_retried_with_backoff(cards):
+    chat_id = homework.chat_for(homework.DEFAULT_TENANT)
+    cards.put('default', 'hw', StatusCard(chat_id, 5, ('reviewing',)))
+    bot = FakeBot(TimedOut(), failing_edits=2)
+    retry = functools.partial(homework.retry_card, bot)
+    clock = VirtualClock()
+    cards.clock = clock
+    homework.update_card(bot, 'Принята', 'hw', 'approved')
+    assert cards.retry_due(retry) == 0
+    clock.sleep(5)
+    assert cards.retry_due(retry) == 0
+    clock.sleep(5)
+    assert cards.retry_due(retry) == 0
+    clock.sleep(5)
+    assert cards.retry_due(retry) == 1
+    text = render_card('Принята', ['reviewing', 'approved'])
+    assert bot.sent == []
+    assert bot.edited == [(chat_id, 5, text)]
+    assert cards.get('default', 'hw') == StatusCard(
+        chat_id, 5, ('reviewing', 'approved')
+    )
+    assert cards.due() == []
+
+
+def test_status_while_edit_is_pending_joins_it(cards):
+    chat_id = homework.chat_for(homework.DEFAULT_TENANT)
+    cards.put('default', 'hw', StatusCard(chat_id, 5, ('reviewing',)))
+    bot = FakeBot(NetworkError('down'), failing_edits=1)
+    cards.clock = VirtualClock()
+    homework.update_card(bot, 'Принята', 'hw', 'approved')
+    homework.update_card(bot, 'Есть замечания', 'hw', 'rejected')
+    assert bot.edited == []
+    cards.clock.sleep(5)
+    assert cards.retry_due(functools.partial(homework.retry_card, bot)) == 1
+    assert bot.edited == [(
+        chat_id,
+        5,
+        render_card('Есть замечания', ['reviewing', 'approved', 'rejected']),
+    )]
+    assert cards.get('default', 'hw').pending is None
+
+
+def test_status_during_retry_stays_pending(cards):
+    card = StatusCard('1', 5, ('reviewing',), 'old')
+    cards.put('default', 'hw', card._replace(pending='new'))
+    cards.settle('default', 'hw', 'old', card._replace(pending=None))
+    assert cards.get('default', 'hw').pending == 'new'
+
+
+@pytest.mark.parametrize(
+    'error',
+    [BadRequest('Message to edit not found'), BadRequest('Chat not found')],
+)
+def test_retry_starts_new_card_when_edit_is_impossible(cards, error):
+    chat_id = homework.chat_for(homework.DEFAULT_TENANT)
+    text = render_card('Принята', ['reviewing', 'approved'])
+    cards.put(
+        'default', 'hw',
+        StatusCard(chat_id, 5, ('reviewing', 'approved'), text),
+    )
+    bot = FakeBot(error)
+    assert cards.retry_due(functools.partial(homework.retry_card, bot)) == 1
+    assert bot.sent == [(chat_id, text)]
+    assert cards.get('default', 'hw') == StatusCard(
+        chat_id, 1, ('reviewing', 'approved')
+    )
+
+
+def test_failed_post_goes_to_outbox(cards, monkeypatch):
+    queued = []
+    monkeypatch.setattr(homework.OUTBOX, 'put', lambda *args: args)
+    monkeypatch.setattr(
+        homework.OUTBOX,
+        'retry_later',
+        lambda entry, error=None: queued.append(error),
+    )
+    bot = FakeBot()
+    bot.send_message = lambda chat_id, text: (_ for _ in ()).throw(
+        NetworkError('down')
+    )
+    homework.update_card(bot, 'Принята', 'hw', 'approved')
+    assert isinstance(queued[0], NetworkError)
+    assert cards.get('default', 'hw') is None
@@ -0,0 +1,138 @@
+import json
+import os
+import signal
+import time
+
+import pytest
+
+from config import SettingsStore, load_settings
+from exceptions import ConfigError, ReloadRequested
+
+ENVIRON = {
+    'PRACTIC_TOKEN': 'env-token',
+    'TG_TOKEN': '1234:abc',
+    'CHAT_ID': '1',
+}
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / 'bot.json'
+    path.write_text(
+        json.dumps(
+            {
+                'retry_period': 300,
+                'practicum_token': 'file-token',
+                'tenants': {'alice': {'chat_id': '42', 'retry_period': 60}},
+            }
+        )
+    )
+    return path
+
+
+def test_sources_priority(config_file):
+    settings = load_settings(
+        ['--config', str(config_file), '--endpoint', 'http://cli/'],
+        ENVIRON,
+        overrides={'telegram_chat_id': '7', 'telegram_token': None},
+    )
+    assert settings.retry_period == 300
+    assert settings.practicum_token == 'env-token'
+    assert settings.telegram_token == '1234:abc'
+    assert settings.telegram_chat_id == '7'
+    assert settings.endpoint == 'http://cli/'
+
+
+def test_tenant_overrides(config_file):
+    settings = load_settings(['--config', str(config_file)], ENVIRON)
+    alice = settings.tenant('alice')
+    assert alice.chat_id == '42'
+    assert alice.retry_period == 60
+    assert alice.practicum_token == 'env-token'
+    with pytest.raises(ConfigError):
+        settings.tenant('bob')
+
+
+def test_missing_tokens_is_cached():
+    settings = load_settings([], {})
+    assert settings.missing_tokens == ('PRACTIC_TOKEN', 'TG_TOKEN', 'CHAT_ID')
+    assert settings.missing_tokens is settings.missing_tokens
+    with pytest.raises(Exception):
+        settings.retry_period = 1
+
+
+@pytest.mark.parametrize(
+    'content', ['[]', '{"retry_period": 0}', '{"unknown": 1}', '{oops'],
+)
+def test_invalid_file(tmp_path, content):
+    path = tmp_path / 'bot.json'
+    path.write_text(content)
+    with pytest.raises(ConfigError):
+        load_settings(['--config', str(path)], ENVIRON)
+
+
+def test_sighup_reload_keeps_old_settings_on_error(config_file, monkeypatch):
+    monkeypatch.setenv('BOT_CONFIG', str(config_file))
+    store = SettingsStore()
+    store.install()
+    try:
+        assert store.current.retry_period == 300
+        config_file.write_text('{"retry_period": 120}')
+        os.kill(os.getpid(), signal.SIGHUP)
+        assert store.reload_if_requested()
+        assert store.current.retry_period == 120
+
+        config_file.write_text('{"retry_period": -1}')
+        os.kill(os.getpid(), signal.SIGHUP)
+        assert not store.reload_if_requested()
+        assert store.current.retry_period == 120
+    finally:
+        store.restore()
+
+
+def test_sighup_interrupts_pause():
+    store = SettingsStore()
+    store.install()
+    try:
+        with pytest.raises(ReloadRequested):
+            with store.interruptible():
+                os.kill(os.getpid(), signal.SIGHUP)
+                time.sleep(5)
+        # Флаг остаётся: настройки перечитает цикл опроса.
+        with pytest.raises(ReloadRequested):
+            with store.interruptible():
+                pass
+        assert store.reload_if_requested()
+        with store.interruptible():
+            pass
+    finally:
+        store.restore()
+
+
+def test_reload_refreshes_sources_first(monkeypatch):
+    store = SettingsStore(
+        refresh=lambda: monkeypatch.setenv('PRACTIC_TOKEN', 'refreshed')
+    )
+    store.request_reload()
+    assert store.reload_if_requested()
+    assert store.current.practicum_token == 'refreshed'
+
+
+def test_mirrored_tokens_do_not_become_overrides(monkeypatch):
+    import homework
+
+    for name in ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID'):
+        monkeypatch.setattr(homework, name, getattr(homework, name))
+    monkeypatch.setattr(homework, 'SETTINGS', SettingsStore())
+    monkeypatch.setattr(
+        homework, 'MIRRORED_TOKENS', homework.module_tokens()
+    )
+    monkeypatch.setenv('PRACTIC_TOKEN', 'first')
+    homework.configure()
+    monkeypatch.setenv('PRACTIC_TOKEN', 'second')
+    homework.configure()
+    assert homework.PRACTICUM_TOKEN == 'second'
+
+    monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', 'explicit')
+    homework.configure()
+    assert homework.PRACTICUM_TOKEN == 'explicit'
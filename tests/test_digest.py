@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+
+from clock import VirtualClock
+from digest import DigestBuffer
+from metrics import MetricsRegistry
+
+
+@pytest.fixture
+def clock():
+    return VirtualClock()
+
+
+@pytest.fixture
+def digest(clock):
+    return DigestBuffer(
+        window=600, max_items=3, max_chats=2, clock=clock,
+        metrics=MetricsRegistry(),
+    )
+
+
+def test_disabled_digest_sends_immediately(clock):
+    digest = DigestBuffer(clock=clock, metrics=MetricsRegistry())
+    assert digest.add('chat', 'hw1') == [('chat', 'hw1')]
+    assert digest.drain() == []
+
+
+def test_digest_collects_until_window(digest, clock):
+    assert digest.add('chat', 'hw1 на проверке') == []
+    assert digest.add('chat', 'Сбой API') == []
+    assert digest.add('chat', 'Сбой API') == []
+    clock.sleep(300)
+    assert digest.due() == []
+    clock.sleep(300)
+    [(chat, text)] = digest.due()
+    assert chat == 'chat'
+    assert text.splitlines() == [
+        'Сводка за 10 мин.:',
+        '• hw1 на проверке',
+        '• Сбой API (×2)',
+    ]
+    assert digest.pending() == 0
+
+
+def test_digest_is_bounded(digest):
+    digest.add('chat', 'hw1')
+    digest.add('chat', 'hw2')
+    [(_, text)] = digest.add('chat', 'hw3')
+    assert text.count('•') == 3
+
+    digest.add('a', 'hw1')
+    digest.add('b', 'hw1')
+    assert digest.add('c', 'hw1') == [('a', 'hw1')]
+    assert sorted(digest.drain()) == [('b', 'hw1'), ('c', 'hw1')]
+
+
+def test_urgent_message_follows_pending_digest(digest):
+    digest.add('chat', 'hw2 на проверке')
+    digest.add('chat', 'Сбой API')
+    [(_, summary), urgent] = digest.add('chat', 'hw2 принята', urgent=True)
+    assert summary.splitlines()[1:] == ['• hw2 на проверке', '• Сбой API']
+    assert urgent == ('chat', 'hw2 принята')
+    assert digest.add('other', 'hw3 принята', urgent=True) == [
+        ('other', 'hw3 принята')
+    ]
+    assert digest.pending() == 0
+
+
+def test_worker_sends_due_digests():
+    digest = DigestBuffer(window=0.05, metrics=MetricsRegistry())
+    sent = threading.Event()
+    received = []
+
+    def send(chat_id, text):
+        received.append((chat_id, text))
+        sent.set()
+
+    digest.start(send, interval=0.01)
+    try:
+        digest.add('chat', 'hw1')
+        assert sent.wait(1)
+    finally:
+        digest.stop()
+    assert received == [('chat', 'hw1')]
@@ -0,0 +1,86 @@
+import asyncio
+import sys
+import types
+
+import pytest
+
+from events import (
+    EVENTS,
+    EventBus,
+    HomeworkStatusChanged,
+    MessageFailed,
+    PollFailed,
+)
+from exceptions import ConfigError
+from metrics import MetricsRegistry
+
+
+@pytest.fixture
+def bus():
+    bus = EventBus(MetricsRegistry())
+    yield bus
+    bus.shutdown()
+
+
+def changed(status='approved'):
+    return HomeworkStatusChanged('default', 'hw', status, 'Изменился статус')
+
+
+def test_sync_subscribers_and_unsubscribe(bus):
+    received, everything = [], []
+    unsubscribe = bus.subscribe(HomeworkStatusChanged, received.append)
+    bus.subscribe(EVENTS, everything.append)
+    bus.publish(changed())
+    bus.emit(PollFailed, tenant='default', error=KeyError(), notified=True)
+    unsubscribe()
+    bus.publish(changed('rejected'))
+    assert [event.status for event in received] == ['approved']
+    assert [type(event) for event in everything] == [
+        HomeworkStatusChanged, PollFailed, HomeworkStatusChanged,
+    ]
+
+
+def test_emit_without_subscribers_builds_nothing(bus):
+    assert not bus
+    assert not bus.active(MessageFailed)
+    bus.emit(MessageFailed, unknown_field=True)
+    assert bus.metrics.counter('events.MessageFailed') == 0
+
+
+def test_failing_subscriber_does_not_stop_others(bus, caplog):
+    received = []
+
+    def broken(event):
+        raise RuntimeError('boom')
+
+    bus.subscribe(HomeworkStatusChanged, broken)
+    bus.subscribe(HomeworkStatusChanged, received.append)
+    bus.publish(changed())
+    assert received
+    assert bus.metrics.counter('events.handler_errors') == 1
+    assert 'boom' in caplog.text
+
+
+def test_async_subscribers_run_on_bus_loop(bus):
+    received = []
+
+    async def handler(event):
+        await asyncio.sleep(0.01)
+        received.append(event.status)
+
+    bus.subscribe(HomeworkStatusChanged, handler)
+    bus.publish(changed())
+    bus.shutdown()
+    assert received == ['approved']
+
+
+def test_plugins_register_subscribers(bus, monkeypatch):
+    plugin = types.ModuleType('status_plugin')
+    plugin.register = lambda bus: bus.subscribe(
+        HomeworkStatusChanged, lambda event: None
+    )
+    monkeypatch.setitem(sys.modules, 'status_plugin', plugin)
+    bus.load_plugins(['status_plugin'])
+    assert bus.active(HomeworkStatusChanged)
+    with pytest.raises(ConfigError):
+        bus.load_plugins(['no_such_plugin'])
@@ -0,0 +1,117 @@
+import pytest
+import requests
+
+import homework
+from exceptions import (
+    DEFAULT_POLICY,
+    ApiAuthError,
+    ApiConnectionError,
+    ApiServerError,
+    ApiThrottledError,
+    CurrentDateKeyError,
+    DecoderError,
+    UnexpectedStatusError,
+    error_policy,
+    retry_after_seconds,
+    status_error,
+)
+
+RETRY_PERIOD = 600
+
+
+class RetryAfter(Exception):
+    retry_after = 17
+
+
+def test_status_codes_map_to_error_classes():
+    assert status_error(401) is ApiAuthError
+    assert status_error(503) is ApiServerError
+    assert status_error(429) is ApiThrottledError
+    assert status_error(404) is UnexpectedStatusError
+
+
+@pytest.mark.parametrize('error, delay', [
+    (None, RETRY_PERIOD),
+    (KeyError('status'), RETRY_PERIOD),
+    (CurrentDateKeyError(), RETRY_PERIOD),
+    (ApiConnectionError(), 30),
+    (DecoderError(), 60),
+    (RetryAfter(), 17),
+    (ApiAuthError(), None),
+])
+def test_next_delay_follows_policy(error, delay):
+    assert error_policy(error).next_delay(RETRY_PERIOD) == delay
+
+
+def test_transient_backoff_doubles_up_to_period():
+    policy = error_policy(ApiConnectionError())
+    delays = [policy.next_delay(RETRY_PERIOD, n) for n in range(1, 7)]
+    assert delays == [30, 60, 120, 240, 480, RETRY_PERIOD]
+    assert policy.next_delay(RETRY_PERIOD, 10 ** 6) == RETRY_PERIOD
+
+
+@pytest.mark.parametrize('retry_after, delay', [
+    (None, RETRY_PERIOD),
+    (5, RETRY_PERIOD),
+    (3600, 3600),
+])
+def test_throttling_never_polls_faster_than_period(retry_after, delay):
+    error = ApiThrottledError('429', retry_after=retry_after)
+    assert error_policy(error).next_delay(RETRY_PERIOD, 3) == delay
+
+
+@pytest.mark.parametrize('value, seconds', [
+    (None, None),
+    ('120', 120),
+    ('Thu, 01 Jan 1970 00:10:00 GMT', 540),
+    ('Thu, 01 Jan 1970 00:00:00 GMT', 0),
+    ('soon', None),
+])
+def test_retry_after_header(value, seconds):
+    assert retry_after_seconds(value, now=60) == seconds
+
+
+def test_messages_are_found_through_mro():
+    assert homework.error_message(ApiServerError('503')) == (
+        homework.EXCEPTIONS_MESSAGE[UnexpectedStatusError]
+    )
+    assert homework.error_message(DecoderError('truncated')) == (
+        'Возникла проблема с декодировкой json'
+    )
+    assert homework.error_message(ZeroDivisionError('boom')) == (
+        f'{homework.ERROR_MESSAGE}boom'
+    )
+    assert error_policy(ZeroDivisionError()) == DEFAULT_POLICY
+
+
+def test_transient_errors_notify_once_per_series(monkeypatch):
+    sent = []
+
+    def fail(*args, **kwargs):
+        raise ApiConnectionError('timeout')
+
+    monkeypatch.setattr(homework, 'load_statuses', fail)
+    monkeypatch.setattr(
+        homework, 'notify', lambda bot, text, **kwargs: sent.append(text)
+    )
+    timestamp, error = homework.poll_once(None, 100)
+    assert timestamp == 100 and isinstance(error, ApiConnectionError)
+    homework.poll_once(None, 100, error)
+    assert sent == ['Ошибка соединения с API']
+
+    monkeypatch.setattr(homework, 'load_statuses', lambda *args, **kw: {
+        'homeworks': [], 'current_date': 200,
+    })
+    assert homework.poll_once(None, 100, error) == (200, None)
+
+
+def test_throttled_answer_carries_retry_after(monkeypatch):
+    response = requests.Response()
+    response.status_code = 429
+    response.headers['Retry-After'] = '900'
+    monkeypatch.setattr(
+        homework.HEDGER, 'call', lambda request, admit=None: response
+    )
+    with pytest.raises(ApiThrottledError) as raised:
+        homework.fetch_statuses(100)
+    assert error_policy(raised.value).next_delay(RETRY_PERIOD) == 900
@@ -0,0 +1,70 @@
+import pytest
+import requests
+
+from clock import VirtualClock, use_clock
+from faults import PROFILES, FakePracticum, FaultInjector, run_load, serving
+from metrics import MetricsRegistry
+from transport import Transport
+
+
+def test_injection_is_reproducible_with_seed():
+    def injected(seed):
+        injector = FaultInjector(PROFILES['everything'], seed)
+        send = injector.http_send(FakePracticum(seed).send)
+        with use_clock(VirtualClock()), serving(send):
+            for _ in range(200):
+                try:
+                    requests.get(
+                        'http://practicum', params={'from_date': 0}
+                    ).json()
+                except (requests.exceptions.Timeout, ValueError):
+                    pass
+        return injector.injected
+
+    assert injected(1) == injected(1)
+    assert injected(1) != injected(2)
+    assert set(injected(1)) == {
+        'latency', 'timeout', 'server_error', 'truncated_json'
+    }
+
+
+def test_clean_profile_has_no_failures():
+    report = run_load(PROFILES['clean'], polls=30)
+    assert report.failed_polls == 0
+    assert report.messages == 30
+    assert report.recovery_seconds == 0
+    assert report.wire_bytes > 0
+
+
+def test_fake_answers_go_through_transport_decoding():
+    metrics = MetricsRegistry()
+    with serving(FakePracticum().send):
+        response = Transport(metrics=metrics).get(
+            'http://practicum', tenant='alice'
+        )
+    assert isinstance(response, requests.Response)
+    assert response.json()['homeworks']
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert metrics.counter('bandwidth.wire.alice') > 0
+    assert metrics.counter('bandwidth.decoded.alice') == len(response.content)
+
+
+@pytest.mark.parametrize('name', ['flaky_api', 'telegram_flood'])
+def test_pipeline_recovers_after_faults(name):
+    report = run_load(PROFILES[name], polls=60, seed=3)
+    assert report.injected
+    assert report.messages > 0
+    assert report.recovery_seconds < 600
+    if name == 'flaky_api':
+        assert report.failed_polls > 0
+
+
+def test_run_leaves_bot_state_untouched():
+    import homework
+
+    names = ('METRICS', 'STATES', 'DIGEST', 'SENDER', 'CARDS', 'HEALTH')
+    before = {name: getattr(homework, name) for name in names}
+    counters = homework.METRICS.counters('')
+    run_load(PROFILES['flaky_api'], polls=20, seed=3)
+    assert {name: getattr(homework, name) for name in names} == before
+    assert homework.METRICS.counters('') == counters
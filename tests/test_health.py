@@ -0,0 +1,135 @@
+import json
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+from clock import VirtualClock
+from health import STALE_FACTOR, HealthServer, HealthState
+
+RETRY_PERIOD = 600
+
+
+@pytest.fixture
+def clock():
+    return VirtualClock(start=1000)
+
+
+@pytest.fixture
+def state(clock):
+    state = HealthState(RETRY_PERIOD, clock=clock)
+    state.add_queue('outbox', lambda: 2)
+    return state
+
+
+def test_report_detects_stale_tenant(state, clock):
+    state.api_succeeded('default')
+    state.api_succeeded('alice')
+    state.message_sent(False, 'Timed out')
+    clock.sleep(RETRY_PERIOD)
+    state.api_succeeded('default')
+    healthy, report = state.report()
+    assert healthy
+    assert report['queues'] == {'outbox': 2}
+    assert report['last_send']['error'] == 'Timed out'
+
+    clock.sleep(STALE_FACTOR * RETRY_PERIOD - RETRY_PERIOD + 1)
+    healthy, report = state.report()
+    assert not healthy
+    assert report['tenants']['alice']['stale']
+    assert not report['tenants']['default']['stale']
+
+
+def test_report_before_first_answer(state, clock):
+    assert state.report()[0]
+    clock.sleep(STALE_FACTOR * RETRY_PERIOD + 1)
+    assert not state.report()[0]
+
+
+def test_tenant_without_answer_is_stale_from_startup(state, clock):
+    state.set_tenants({'default': RETRY_PERIOD, 'slow': 10 * RETRY_PERIOD})
+    clock.sleep(STALE_FACTOR * RETRY_PERIOD + 1)
+    state.api_succeeded('default')
+    healthy, report = state.report()
+    assert healthy
+    assert report['tenants']['slow']['last_success'] is None
+    assert report['tenants']['slow']['stale_after'] == (
+        STALE_FACTOR * 10 * RETRY_PERIOD
+    )
+    # Добавленный при перечитывании настроек - от момента добавления.
+    state.set_tenants({'default': RETRY_PERIOD, 'hung': RETRY_PERIOD})
+    assert state.report()[0]
+    clock.sleep(STALE_FACTOR * RETRY_PERIOD + 1)
+    state.api_succeeded('default')
+    healthy, report = state.report()
+    assert not healthy and report['status'] == 'unhealthy'
+    assert report['tenants']['hung']['stale']
+    assert 'slow' not in report['tenants']
+
+
+def test_stopped_tenant_is_degraded_not_stale(state, clock):
+    state.set_tenants({'default': RETRY_PERIOD, 'mallory': RETRY_PERIOD})
+    state.stop_tenant('mallory', 'токен отозван')
+    clock.sleep(STALE_FACTOR * RETRY_PERIOD + 1)
+    state.api_succeeded('default')
+    healthy, report = state.report()
+    assert healthy and report['status'] == 'degraded'
+    assert report['stopped'] == {'mallory': 'токен отозван'}
+    assert 'mallory' not in report['tenants']
+
+    state.set_tenants({'default': RETRY_PERIOD, 'mallory': RETRY_PERIOD})
+    healthy, report = state.report()
+    assert healthy and report['status'] == 'ok'
+    assert report['stopped'] == {}
+
+
+def test_api_outage_is_degraded_not_unhealthy(state, clock):
+    state.set_tenants({'default': RETRY_PERIOD})
+    for _ in range(int(STALE_FACTOR) + 1):
+        clock.sleep(RETRY_PERIOD)
+        state.api_failed('default')
+    healthy, report = state.report()
+    assert healthy and report['status'] == 'degraded'
+    assert report['tenants']['default']['degraded']
+    state.api_succeeded('default')
+    assert state.report()[1]['status'] == 'ok'
+
+
+def test_server_answers_with_status(state, clock):
+    server = HealthServer(state)
+    server.start()
+    url = 'http://{}:{}/health'.format(*server.address)
+    try:
+        with urlopen(url, timeout=1) as response:
+            assert response.status == 200
+            assert json.load(response)['healthy']
+        clock.sleep(STALE_FACTOR * RETRY_PERIOD + 1)
+        with pytest.raises(HTTPError) as error:
+            urlopen(url, timeout=1)
+        assert error.value.code == 503
+    finally:
+        server.stop()
+
+
+def test_status_endpoint_serves_tenant_answer(state):
+    def statuses(tenant):
+        if tenant == 'down':
+            raise ConnectionError('API недоступен')
+        if tenant != 'default':
+            raise KeyError(tenant)
+        return {'homeworks': [{'status': 'approved'}]}
+
+    server = HealthServer(state, statuses=statuses)
+    server.start()
+    url = 'http://{}:{}/status'.format(*server.address)
+    try:
+        with urlopen(url, timeout=1) as response:
+            assert json.load(response)['homeworks'][0]['status'] == (
+                'approved'
+            )
+        for tenant, code in (('bob', 404), ('down', 502)):
+            with pytest.raises(HTTPError) as error:
+                urlopen(f'{url}?tenant={tenant}', timeout=1)
+            assert error.value.code == code
+    finally:
+        server.stop()
@@ -0,0 +1,86 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+from hedging import Hedger
+from metrics import MetricsRegistry
+
+
+@pytest.fixture
+def hedger():
+    metrics = MetricsRegistry()
+    for _ in range(20):
+        metrics.observe('api.latency', 0.01)
+    hedger = Hedger(metrics=metrics)
+    hedger.configure(enabled=True, max_ratio=1)
+    yield hedger
+    hedger.shutdown()
+
+
+def test_slow_request_is_hedged(hedger):
+    calls = itertools.count()
+
+    def request():
+        if next(calls) == 0:
+            time.sleep(0.5)
+            return 'slow'
+        return 'fast'
+
+    started = time.monotonic()
+    assert hedger.call(request) == 'fast'
+    assert time.monotonic() - started < 0.3
+    assert hedger.report()['hedge_wins'] == 1
+
+
+def test_failed_hedge_falls_back_to_primary(hedger):
+    calls = itertools.count()
+
+    def request():
+        if next(calls) == 0:
+            time.sleep(0.05)
+            return 'primary'
+        raise ConnectionError('hedge failed')
+
+    assert hedger.call(request) == 'primary'
+
+
+def test_hedge_ratio_is_capped(hedger):
+    hedger.configure(enabled=True, max_ratio=0.05)
+    for _ in range(40):
+        hedger.call(lambda: time.sleep(0.02))
+    assert hedger.report()['hedge_ratio'] <= 0.05
+
+
+def test_disabled_hedger_only_measures_latency():
+    hedger = Hedger(metrics=MetricsRegistry())
+    for _ in range(30):
+        assert hedger.call(lambda: 'ok') == 'ok'
+    report = hedger.report()
+    assert report['hedge_ratio'] == 0
+    assert report['p50'] is not None and report['p99'] is not None
+
+
+def test_hedge_needs_admission(hedger):
+    release = threading.Event()
+    calls = itertools.count()
+
+    def request():
+        if next(calls) == 0:
+            release.wait(1)
+            return 'primary'
+        return 'hedge'
+
+    threading.Timer(0.1, release.set).start()
+    assert hedger.call(request, admit=lambda: False) == 'primary'
+    assert hedger.metrics.counter('api.hedge_refused') == 1
+    assert hedger.metrics.counter('api.hedged') == 0
+
+
+def test_hedged_wait_is_bounded(hedger):
+    release = threading.Event()
+    hedger.timeout = 0.1
+    with pytest.raises(TimeoutError):
+        hedger.call(lambda: release.wait(1))
+    release.set()
@@ -0,0 +1,66 @@
+import os
+import signal
+import time
+
+import pytest
+
+from exceptions import ShutdownRequested
+from lifecycle import Shutdown
+from state import CursorStore
+
+
+@pytest.fixture
+def shutdown():
+    shutdown = Shutdown()
+    shutdown.install()
+    yield shutdown
+    shutdown.restore()
+
+
+def test_signal_interrupts_sleep(shutdown):
+    with pytest.raises(ShutdownRequested):
+        with shutdown.interruptible():
+            os.kill(os.getpid(), signal.SIGTERM)
+            time.sleep(5)
+    assert shutdown.requested
+
+
+def test_signal_outside_sleep_only_sets_flag(shutdown):
+    os.kill(os.getpid(), signal.SIGTERM)
+    assert shutdown.requested
+    with pytest.raises(ShutdownRequested):
+        with shutdown.interruptible():
+            pass
+
+
+def test_hooks_run_even_if_one_fails(shutdown):
+    calls = []
+
+    def broken():
+        raise RuntimeError('broken')
+
+    shutdown.add_hook(broken)
+    shutdown.add_hook(lambda: calls.append('flushed'))
+    shutdown.run_hooks()
+    assert calls == ['flushed']
+
+
+def test_restore_returns_previous_handler():
+    previous = signal.getsignal(signal.SIGTERM)
+    shutdown = Shutdown()
+    shutdown.install()
+    shutdown.restore()
+    assert signal.getsignal(signal.SIGTERM) is previous
+
+
+def test_cursor_store_round_trip(tmp_path):
+    path = str(tmp_path / 'state.json')
+    assert CursorStore(path).load(default=42) == 42
+    CursorStore(path).save(1000198000)
+    assert CursorStore(path).load(default=42) == 1000198000
+
+
+def test_cursor_store_ignores_corrupted_file(tmp_path):
+    path = tmp_path / 'state.json'
+    path.write_text('{not json')
+    assert CursorStore(str(path)).load(default=7) == 7
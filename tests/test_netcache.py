@@ -0,0 +1,215 @@
+import shutil
+import socket
+import ssl
+import subprocess
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests
+
+from clock import VirtualClock
+from metrics import MetricsRegistry
+from netcache import DnsCache, NetworkCache
+from tlssession import ResumingContext
+
+ADDRESS = (socket.AF_INET, socket.SOCK_STREAM, 6, '', ('10.0.0.1', 443))
+
+
+class FakeResolver:
+    def __init__(self):
+        self.calls = 0
+        self.broken = False
+        self.address = None
+
+    def __call__(self, host, port, *args):
+        self.calls += 1
+        if self.broken:
+            raise socket.gaierror('no network')
+        if self.address:
+            return [(*ADDRESS[:4], (self.address, port))]
+        return [ADDRESS]
+
+
+@pytest.fixture
+def metrics():
+    return MetricsRegistry()
+
+
+@pytest.fixture
+def clock():
+    return VirtualClock(start=0)
+
+
+@pytest.fixture
+def resolver():
+    return FakeResolver()
+
+
+@pytest.fixture
+def dns(resolver, metrics, clock):
+    return DnsCache(
+        ttl=60,
+        stale=600,
+        resolver=resolver,
+        background=lambda task: task(),
+        metrics=metrics,
+        clock=clock,
+    )
+
+
+def test_dns_cache_respects_ttl_and_serves_stale(dns, resolver, clock):
+    assert dns.lookup('api', 443) == [ADDRESS]
+    dns.lookup('api', 443)
+    assert resolver.calls == 1
+
+    clock.sleep(61)
+    resolver.broken = True
+    assert dns.lookup('api', 443) == [ADDRESS]
+    assert resolver.calls == 2
+    assert dns.metrics.counter('dns.refresh_failures') == 1
+
+    clock.sleep(600)
+    with pytest.raises(socket.gaierror):
+        dns.lookup('api', 443)
+    assert dns.metrics.counter('dns.hits') == 1
+    assert dns.metrics.counter('dns.stale_hits') == 1
+    assert dns.metrics.counter('dns.misses') == 2
+
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def start(requests=1, tls=None):
+        server = HTTPServer(('127.0.0.1', 0), Hello)
+        if tls is not None:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(*tls)
+            server.socket = context.wrap_socket(
+                server.socket, server_side=True
+            )
+        thread = threading.Thread(
+            target=lambda: [server.handle_request() for _ in range(requests)],
+            daemon=True,
+        )
+        thread.start()
+        servers.append((server, thread))
+        return server.server_address[1]
+
+    yield start
+    for server, thread in servers:
+        thread.join(timeout=1)
+        server.server_close()
+
+
+class Hello(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+def test_session_connects_to_cached_address(dns, resolver, metrics, server):
+    resolver.address = '127.0.0.1'
+    port = server(requests=2)
+    network = NetworkCache(dns, metrics)
+    with network.session() as session:
+        for _ in range(2):
+            assert session.get(f'http://api:{port}/', timeout=1).text == 'ok'
+    assert resolver.calls == 1
+    assert metrics.counter('dns.hits') == 1
+    assert metrics.histogram('net.connect_seconds').count == 2
+
+
+def test_unreachable_address_is_dropped(dns, resolver, metrics):
+    closed = socket.create_server(('127.0.0.1', 0))
+    port = closed.getsockname()[1]
+    closed.close()
+    resolver.address = '127.0.0.1'
+    with NetworkCache(dns, metrics).session() as session:
+        with pytest.raises(requests.exceptions.ConnectionError):
+            session.get(f'http://api:{port}/', timeout=1)
+    assert ('api', port) not in dns._entries
+
+
+def test_session_leaves_urllib3_alone(metrics):
+    import urllib3.connection
+    import urllib3.util.connection
+
+    connect = urllib3.util.connection.create_connection
+    context = urllib3.connection.create_urllib3_context
+    network = NetworkCache(metrics=metrics)
+    with network.session() as session:
+        manager = session.get_adapter('https://api').poolmanager
+        assert manager.connection_pool_kw['ssl_context'] is network.context
+    assert urllib3.util.connection.create_connection is connect
+    assert urllib3.connection.create_urllib3_context is context
+
+
+@pytest.fixture
+def certificate(tmp_path):
+    if shutil.which('openssl') is None:
+        pytest.skip('нужен openssl')
+    cert, key = tmp_path / 'cert.pem', tmp_path / 'key.pem'
+    subprocess.run(
+        [
+            'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+            '-keyout', str(key), '-out', str(cert), '-days', '1',
+            '-subj', '/CN=localhost',
+            '-addext', 'subjectAltName=DNS:localhost',
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return str(cert), str(key)
+
+
+def test_tls_session_is_resumed(certificate, metrics):
+    server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server_context.load_cert_chain(*certificate)
+    listener = socket.create_server(('127.0.0.1', 0))
+
+    def serve():
+        for _ in range(2):
+            conn, _ = listener.accept()
+            with server_context.wrap_socket(conn, server_side=True) as tls:
+                tls.sendall(b'ok')
+                tls.recv(1)
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    context = ResumingContext(ssl.PROTOCOL_TLS_CLIENT).setup(metrics)
+    context.load_verify_locations(certificate[0])
+    for _ in range(2):
+        sock = socket.create_connection(listener.getsockname())
+        with context.wrap_socket(sock, server_hostname='localhost') as tls:
+            assert tls.recv(2) == b'ok'
+    thread.join(timeout=1)
+    listener.close()
+    assert metrics.counter('tls.full_handshakes') == 1
+    assert metrics.counter('tls.resumed') == 1
+    assert metrics.histogram('tls.handshake_seconds').count == 2
+
+
+def test_api_session_resumes_tls(certificate, dns, resolver, metrics, server):
+    resolver.address = '127.0.0.1'
+    port = server(requests=2, tls=certificate)
+    network = NetworkCache(dns, metrics)
+    with network.session() as session:
+        for _ in range(2):
+            response = session.get(
+                f'https://localhost:{port}/',
+                verify=certificate[0],
+                headers={'Connection': 'close'},
+                timeout=1,
+            )
+            assert response.text == 'ok'
+    assert metrics.counter('tls.full_handshakes') == 1
+    assert metrics.counter('tls.resumed') == 1
+    # certifi при создании и сертификат сервера - по разу на оба запроса.
+    assert len(network.context._locations) == 2
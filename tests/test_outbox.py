@@ -0,0 +1,119 @@
+import pytest
+
+from clock import VirtualClock
+from metrics import MetricsRegistry
+from outbox import RETRY_BASE, RETRY_MAX, Outbox, retry_delay
+
+
+class RetryAfter(Exception):
+    retry_after = 30
+
+
+@pytest.fixture
+def clock():
+    return VirtualClock()
+
+
+def make_outbox(path, clock, **kwargs):
+    return Outbox(str(path), clock=clock, metrics=MetricsRegistry(), **kwargs)
+
+
+def test_retry_delay_backs_off():
+    assert retry_delay(1) == RETRY_BASE
+    assert retry_delay(3) == RETRY_BASE * 4
+    assert retry_delay(100) == RETRY_MAX
+    assert retry_delay(1, RetryAfter()) == 30
+
+
+def test_unacked_messages_survive_restart(tmp_path, clock):
+    path = tmp_path / 'outbox.jsonl'
+    outbox = make_outbox(path, clock)
+    delivered = outbox.put('chat', 'hw1 принята')
+    outbox.ack(delivered)
+    lost = outbox.put('chat', 'hw2 на проверке')
+    outbox.retry_later(lost, ConnectionError('telegram down'))
+    outbox.close()
+
+    restarted = make_outbox(path, clock)
+    assert [entry.text for entry in restarted.due()] == ['hw2 на проверке']
+    sent = []
+    assert restarted.retry_due(lambda chat, text: sent.append(text)) == 1
+    assert sent == ['hw2 на проверке'] and len(restarted) == 0
+    assert restarted.put('chat', 'hw3') > lost
+
+
+def test_failed_retries_wait_longer(tmp_path, clock):
+    outbox = make_outbox(tmp_path / 'outbox.jsonl', clock)
+    outbox.retry_later(outbox.put('chat', 'hw1'))
+    clock.sleep(RETRY_BASE)
+
+    def fail(chat, text):
+        raise ConnectionError('down')
+
+    assert outbox.retry_due(fail) == 0
+    clock.sleep(RETRY_BASE)
+    assert outbox.due() == []
+    clock.sleep(RETRY_BASE)
+    assert outbox.due()[0].attempts == 2
+
+
+def test_inline_attempt_keeps_its_claim(tmp_path, clock):
+    outbox = make_outbox(tmp_path / 'outbox.jsonl', clock)
+    entry_id = outbox.put('chat', 'hw1')
+    clock.sleep(RETRY_MAX)
+    assert outbox.due() == []
+    outbox.retry_later(entry_id, RetryAfter())
+    clock.sleep(RETRY_BASE)
+    assert outbox.due() == []
+    clock.sleep(30)
+    assert [entry.id for entry in outbox.due()] == [entry_id]
+
+
+def test_fsync_is_batched_and_journal_compacted(tmp_path, clock):
+    path = tmp_path / 'outbox.jsonl'
+    outbox = make_outbox(path, clock, sync_every=10, compact_after=50)
+    for index in range(60):
+        outbox.ack(outbox.put('chat', f'hw{index}'))
+    outbox.put('chat', 'pending')
+    assert outbox.metrics.counter('outbox.fsyncs') <= 12
+    assert outbox.metrics.counter('outbox.compactions') == 1
+    outbox.close()
+    assert len(path.read_text(encoding='UTF-8').splitlines()) < 30
+    assert [entry.text for entry in make_outbox(path, clock).due()] == [
+        'pending'
+    ]
+
+
+def test_non_retryable_messages_are_dropped(tmp_path, clock):
+    class BadRequest(Exception):
+        pass
+
+    outbox = make_outbox(tmp_path / 'outbox.jsonl', clock)
+    outbox.retry_later(outbox.put('chat', 'hw1'))
+    clock.sleep(RETRY_BASE)
+
+    def reject(chat, text):
+        raise BadRequest('chat not found')
+
+    assert outbox.retry_due(reject) == 0
+    assert len(outbox) == 0
+    assert outbox.metrics.counter('outbox.dropped') == 1
+
+
+def test_deliver_hands_the_send_error_to_the_outbox(
+    tmp_path, clock, monkeypatch
+):
+    import homework
+    from telegram.error import RetryAfter as TelegramRetryAfter
+
+    class ThrottledBot:
+        def send_message(self, chat_id, text):
+            raise TelegramRetryAfter(60)
+
+    outbox = make_outbox(tmp_path / 'outbox.jsonl', clock)
+    monkeypatch.setattr(homework, 'OUTBOX', outbox)
+    homework.deliver(ThrottledBot(), 'hw1 принята')
+    clock.sleep(59)
+    assert outbox.due() == []
+    clock.sleep(1)
+    assert [entry.text for entry in outbox.due()] == ['hw1 принята']
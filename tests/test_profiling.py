@@ -0,0 +1,68 @@
+import os
+import signal
+
+import pytest
+
+from profiling import Profiler, diff_snapshots
+
+LEAK = []
+
+
+def busy():
+    return sum(index * index for index in range(10_000))
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    profiler = Profiler(str(tmp_path))
+    yield profiler
+    profiler.restore()
+    profiler.stop()
+
+
+def test_signals_toggle_cpu_profile(profiler, tmp_path):
+    profiler.install()
+    os.kill(os.getpid(), signal.SIGUSR1)
+    assert profiler.cpu_running
+    busy()
+    os.kill(os.getpid(), signal.SIGUSR1)
+    assert not profiler.cpu_running
+    assert profiler.flush(5)
+    [summary] = tmp_path.glob('cpu-*.prof.txt')
+    assert 'busy' in summary.read_text(encoding='UTF-8')
+
+
+def test_snapshot_diff_points_to_leak(profiler):
+    old = profiler.snapshot_memory()
+    LEAK.extend(bytearray(1024) for _ in range(1000))
+    new = profiler.snapshot_memory()
+    LEAK.clear()
+    top = diff_snapshots(old, new, limit=3)
+    assert any('test_profiling.py' in line for line in top)
+
+
+def test_repeated_memory_signal_does_not_block(profiler, tmp_path):
+    profiler.install()
+    with profiler._lock:
+        # Дамп идёт: сигнал только ставит следующий в очередь.
+        os.kill(os.getpid(), signal.SIGUSR2)
+        os.kill(os.getpid(), signal.SIGUSR2)
+    assert profiler.flush(5)
+    assert len(list(tmp_path.glob('memory-*.snapshot'))) == 2
+    # Второй сигнал выключил трассировку.
+    assert not profiler.memory_running
+
+
+def test_memory_signal_toggles_tracing(profiler, tmp_path):
+    profiler.install()
+    os.kill(os.getpid(), signal.SIGUSR2)
+    assert profiler.flush(5)
+    assert profiler.memory_running
+    LEAK.extend(bytearray(1024) for _ in range(1000))
+    os.kill(os.getpid(), signal.SIGUSR2)
+    assert profiler.flush(5)
+    assert not profiler.memory_running
+    old, new = sorted(map(str, tmp_path.glob('memory-*.snapshot')))
+    LEAK.clear()
+    top = diff_snapshots(old, new, limit=3)
+    assert any('test_profiling.py' in line for line in top)
@@ -0,0 +1,61 @@
+import pytest
+
+from clock import VirtualClock
+from metrics import MetricsRegistry
+from ratelimit import UTILIZATION_WINDOW, RateLimiter, TokenBucket
+
+
+def test_bucket_refills_with_time():
+    clock = VirtualClock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.wait_time() == pytest.approx(0.5)
+    clock.sleep(0.5)
+    assert bucket.try_acquire()
+
+
+def test_global_limit_spreads_burst():
+    clock = VirtualClock()
+    limiter = RateLimiter(
+        rate=1, burst=5, clock=clock, metrics=MetricsRegistry()
+    )
+    for tenant in range(10):
+        limiter.acquire(tenant)
+    assert clock.time() == pytest.approx(5)
+    assert limiter.metrics.counter('ratelimit.throttled') == 5
+
+
+def test_tenant_limit_does_not_slow_other_tenants():
+    clock = VirtualClock()
+    limiter = RateLimiter(
+        tenant_rate=0.1, tenant_burst=1, clock=clock, metrics=MetricsRegistry()
+    )
+    assert limiter.acquire('alice') == 0
+    assert limiter.acquire('bob') == 0
+    assert limiter.acquire('alice') == pytest.approx(10)
+
+
+def test_utilization_against_ceiling():
+    clock = VirtualClock()
+    metrics = MetricsRegistry()
+    limiter = RateLimiter(rate=1, burst=60, clock=clock, metrics=metrics)
+    for _ in range(30):
+        limiter.acquire('alice')
+    assert limiter.utilization() == pytest.approx(0.5)
+    assert metrics.gauge('ratelimit.utilization') == pytest.approx(0.5)
+    clock.sleep(UTILIZATION_WINDOW)
+    assert limiter.utilization() == 0
+    assert RateLimiter(clock=clock).utilization() is None
+
+
+def test_try_acquire_never_waits():
+    clock = VirtualClock()
+    limiter = RateLimiter(
+        tenant_rate=1, tenant_burst=1, clock=clock, metrics=MetricsRegistry()
+    )
+    limiter.acquire('alice')
+    assert not limiter.try_acquire('alice')
+    assert limiter.try_acquire('bob')
+    assert clock.time() == 0
+    assert limiter.metrics.counter('ratelimit.refused') == 1
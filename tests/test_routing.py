@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+
+import pytest
+
+from config import Route, build_settings
+from exceptions import ConfigError
+from metrics import MetricsRegistry
+from routing import FileSink, Router, build_routes
+
+
+class Recorder:
+    def __init__(self, name, delay=None, error=None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.received = []
+
+    def send(self, text):
+        if self.delay is not None:
+            self.delay.wait(1)
+        if self.error:
+            raise self.error
+        self.received.append(text)
+
+
+def test_routes_from_settings():
+    settings = build_settings({
+        'routes': {
+            'default': [{'telegram': 100}, {'file': 'sent.jsonl'}],
+            'alice': [{'webhook': 'http://localhost:8080/'}],
+        }
+    })
+    assert settings.routes[0] == Route('default', 'telegram', '100')
+    table = build_routes(settings.routes, bot=None)
+    assert [item.name for item in table['default']] == [
+        'telegram:100', 'file:sent.jsonl'
+    ]
+    with pytest.raises(ConfigError):
+        build_settings({'routes': {'default': [{'pigeon': 'home'}]}})
+
+
+def test_failures_and_slow_destinations_are_isolated():
+    release = threading.Event()
+    slow = Recorder('slow', delay=release)
+    broken = Recorder('broken', error=ConnectionError('down'))
+    fast = Recorder('fast')
+    metrics = MetricsRegistry()
+    router = Router(timeout=0.1, metrics=metrics)
+    router.set_routes({'default': (slow, broken, fast)})
+
+    outcome = router.deliver('default', 'hw1 принята')
+    assert fast.received == ['hw1 принята']
+    assert isinstance(outcome['broken'], ConnectionError)
+    assert isinstance(outcome['slow'], TimeoutError)
+    assert outcome['fast'] is None
+
+    release.set()
+    router.shutdown()
+    assert slow.received == ['hw1 принята']
+    assert metrics.counter('routing.failed') == 1
+    assert metrics.counter('routing.sent') == 2
+
+
+def test_fan_out_runs_alongside_primary_chat(tmp_path):
+    path = str(tmp_path / 'sent.jsonl')
+    router = Router(metrics=MetricsRegistry())
+    router.set_routes({'default': (FileSink(path),)})
+    primary = []
+    with router.fan_out('default', 'hw1 принята'):
+        primary.append('hw1 принята')
+    router.shutdown()
+    with open(path, encoding='UTF-8') as file:
+        assert json.loads(file.readline())['text'] == primary[0]
+
+
+def wait_until(condition):
+    for _ in range(100):
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError('условие не наступило')
+
+
+def test_slow_destination_has_its_own_bounded_queue():
+    release = threading.Event()
+    slow = Recorder('slow', delay=release)
+    fast = Recorder('fast')
+    metrics = MetricsRegistry()
+    router = Router(queue_size=1, timeout=1, metrics=metrics)
+    router.set_routes({'default': (slow, fast)})
+
+    for index in range(3):
+        with router.fan_out('default', f'hw{index}'):
+            pass
+        wait_until(lambda: len(fast.received) == index + 1)
+        # hw0 у медленного получателя в работе, hw1 ждёт в очереди.
+        wait_until(lambda: index or router._lane(slow).queue.empty())
+    assert fast.received == ['hw0', 'hw1', 'hw2']
+    assert metrics.counter('routing.dropped') == 1
+
+    release.set()
+    router.shutdown()
+    assert slow.received == ['hw0', 'hw1']
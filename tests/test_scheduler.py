@@ -0,0 +1,224 @@
+import math
+import random
+import time
+
+import pytest
+
+from clock import REAL_CLOCK, VirtualClock, get_clock, use_clock
+from health import HealthState
+from scheduler import PollScheduler, TimingWheelScheduler, benchmark
+
+RETRY_PERIOD = 600
+WEEK = 7 * 24 * 60 * 60
+
+
+def test_virtual_clock_sleep_advances_time():
+    clock = VirtualClock(start=100)
+    clock.sleep(RETRY_PERIOD)
+    assert clock.time() == 100 + RETRY_PERIOD
+    with pytest.raises(ValueError):
+        clock.sleep(-1)
+
+
+def test_use_clock_restores_previous():
+    virtual = VirtualClock()
+    with use_clock(virtual):
+        assert get_clock() is virtual
+    assert get_clock() is REAL_CLOCK
+
+
+def test_week_of_polling_many_tenants_is_fast():
+    tenants = 100
+    clock = VirtualClock()
+    scheduler = PollScheduler(clock)
+    polls = dict.fromkeys(range(tenants), 0)
+
+    def make_job(tenant):
+        def job():
+            polls[tenant] += 1
+            return RETRY_PERIOD
+
+        return job
+
+    for tenant in polls:
+        scheduler.schedule(tenant, make_job(tenant), delay=tenant + 1)
+
+    started = time.perf_counter()
+    scheduler.run(until=WEEK)
+    elapsed = time.perf_counter() - started
+
+    assert clock.time() == WEEK
+    assert set(polls.values()) == {WEEK // RETRY_PERIOD}
+    assert elapsed < 1.5
+
+
+def test_cancel_and_stop():
+    clock = VirtualClock()
+    scheduler = PollScheduler(clock)
+    calls = []
+
+    scheduler.schedule('once', lambda: calls.append('once'))
+    scheduler.schedule('cancelled', lambda: calls.append('cancelled'), 10)
+    scheduler.cancel('cancelled')
+    scheduler.run()
+
+    assert calls == ['once']
+    assert len(scheduler) == 0
+    assert clock.time() == 0
+
+
+def test_default_clock_is_resolved_at_use_time():
+    scheduler = PollScheduler()
+    virtual = VirtualClock(start=500)
+    with use_clock(virtual):
+        scheduler.schedule('alice', lambda: None, delay=RETRY_PERIOD)
+        scheduler.run()
+        assert virtual.time() == 500 + RETRY_PERIOD
+
+
+@pytest.mark.parametrize('slots, levels', [(4, 2), (64, 4)])
+def test_timing_wheel_fires_on_time(slots, levels):
+    clock = VirtualClock(start=3.5)
+    scheduler = TimingWheelScheduler(clock, slots=slots, levels=levels)
+    randomizer = random.Random(7)
+    due, fired = {}, {}
+
+    def make_job(key):
+        def job():
+            fired[key] = clock.time()
+
+        return job
+
+    for key in range(2000):
+        delay = randomizer.choice([0, 0.5, 3, 17, 600, 5000, 86400])
+        delay *= randomizer.random()
+        scheduler.schedule(key, make_job(key), delay)
+        due[key] = clock.time() + delay
+        if key % 3 == 0:
+            clock.sleep(randomizer.random() * 10)
+            scheduler.run_pending()
+    for key in range(0, 2000, 7):
+        scheduler.cancel(key)
+        due.pop(key)
+        fired.pop(key, None)
+    scheduler.run()
+
+    assert len(scheduler) == 0
+    assert fired.keys() == due.keys()
+    for key, moment in fired.items():
+        assert due[key] <= moment < math.floor(due[key]) + 1 + 10
+
+
+def test_timing_wheel_reschedules_and_cancels_in_place():
+    clock = VirtualClock()
+    scheduler = TimingWheelScheduler(clock)
+    polls = []
+
+    def job():
+        polls.append(clock.time())
+        return RETRY_PERIOD if len(polls) < 3 else None
+
+    scheduler.schedule('alice', job, delay=RETRY_PERIOD)
+    scheduler.schedule('bob', lambda: None, delay=10 * WEEK)
+    # Колесо называет ближайший спуск ячейки, не позже самого срока.
+    assert RETRY_PERIOD - 64 < scheduler.next_due() <= RETRY_PERIOD
+    scheduler.cancel('bob')
+    scheduler.run()
+    assert polls == [RETRY_PERIOD, 2 * RETRY_PERIOD, 3 * RETRY_PERIOD]
+
+
+def test_timing_wheel_benchmark_smoke():
+    clock = VirtualClock()
+    report = benchmark(TimingWheelScheduler(clock), clock, timers=5000)
+    assert report['fired'] == 5000 - 5000 // 10
+    assert 0 <= report['jitter_max'] < 1
+
+
+def test_wheel_drives_tenant_pipelines(monkeypatch):
+    import homework
+    from config import Settings, TenantSettings
+    from exceptions import ApiAuthError
+
+    settings = Settings(
+        practicum_token='token',
+        telegram_chat_id='1',
+        tenants=(
+            TenantSettings('alice', 'alice-token', '2'),
+            TenantSettings('mallory', 'revoked', '3'),
+        ),
+    )
+    polls, sent = [], []
+
+    def load_statuses(timestamp, tenant, headers, refresh=False):
+        polls.append(tenant)
+        if tenant == 'mallory':
+            raise ApiAuthError('401')
+        item = {'homework_name': f'{tenant}_hw', 'status': 'approved'}
+        return {'homeworks': [item], 'current_date': timestamp + 1}
+
+    monkeypatch.setattr(homework, 'load_statuses', load_statuses)
+    monkeypatch.setattr(homework, 'record_timeline', lambda *args: None)
+    monkeypatch.setattr(
+        homework, 'deliver', lambda bot, text, tenant: sent.append(tenant)
+    )
+    monkeypatch.setattr(homework.ADVISOR, 'enabled', False)
+    monkeypatch.setattr(homework, 'HEALTH', HealthState(RETRY_PERIOD))
+    clock = VirtualClock()
+    scheduler = TimingWheelScheduler(clock)
+    homework.schedule_tenants(scheduler, None, settings, timestamp=0)
+    scheduler.run(until=3 * RETRY_PERIOD - 1)
+
+    assert polls.count('default') == 3
+    assert polls.count('alice') == 3
+    assert polls.count('mallory') == 1
+    assert 'mallory' not in scheduler
+    assert sent.count('alice') == 3
+    healthy, report = homework.HEALTH.report()
+    assert healthy
+    assert set(report['tenants']) == {'default', 'alice'}
+    assert set(report['stopped']) == {'mallory'}
+
+
+def test_wheel_runs_job_without_delay_on_current_tick():
+    clock = VirtualClock(start=10.5)
+    wheel = TimingWheelScheduler(clock)
+    calls = []
+    wheel.schedule('now', lambda: calls.append(clock.time()))
+    assert wheel.run_pending() == 1
+    assert calls == [10.5]
+
+
+def test_main_plan_polls_every_tenant(monkeypatch):
+    import homework
+    from config import SettingsStore
+
+    settings = SettingsStore()
+    settings.load(
+        [],
+        {
+            'practicum_token': 'token',
+            'retry_period': RETRY_PERIOD,
+            'tenants': {'alice': {'practicum_token': 'a'}},
+        },
+    )
+    polls = []
+
+    def load_statuses(timestamp, tenant, headers, refresh=False):
+        polls.append(tenant)
+        return {'homeworks': [], 'current_date': timestamp}
+
+    monkeypatch.setattr(homework, 'SETTINGS', settings)
+    monkeypatch.setattr(homework, 'load_statuses', load_statuses)
+    monkeypatch.setattr(homework, 'record_timeline', lambda *args: None)
+    monkeypatch.setattr(homework.ADVISOR, 'enabled', False)
+    with use_clock(VirtualClock(start=0.25)) as clock:
+        scheduler = homework.plan_polls(None, 0)
+        scheduler.run_pending()
+        assert polls == ['default']
+        # Старт alice - через полпериода, с округлением вверх до тика.
+        pause = homework.poll_pause(scheduler)
+        assert pause == RETRY_PERIOD / 2 + 1
+        clock.sleep(pause)
+        scheduler.run_pending()
+        assert polls == ['default', 'alice']
+        assert homework.poll_pause(scheduler) == RETRY_PERIOD / 2
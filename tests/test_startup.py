@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Импорт homework вместе с зависимостями должен стоить меньше этой доли
+# импорта отложенных зависимостей, измеренного в тех же условиях.
+IMPORT_BUDGET_RATIO = 0.5
+LAZY_MODULES = ('telegram', 'requests', 'dotenv')
+
+
+def measure_import(modules, cache_dir):
+    """Разбираем вывод `python -X importtime -c 'import modules'`.
+    Байткод пишется в cache_dir, а первый запуск только прогревает его:
+    в чистой копии репозитория иначе измеряется компиляция исходников.
+    """
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    command = [
+        sys.executable, '-X', f'pycache_prefix={cache_dir}', '-c',
+        f'import {modules}',
+    ]
+    subprocess.run(command, cwd=ROOT_DIR, env=env, check=True)
+    result = subprocess.run(
+        command[:1] + ['-X', 'importtime'] + command[1:],
+        cwd=ROOT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, total, name = line[len('import time:'):].split('|')
+        cumulative[name.strip()] = int(total)
+    return cumulative
+
+
+@pytest.mark.timeout(60)
+def test_heavy_dependencies_are_not_imported(tmp_path):
+    imported = measure_import('homework', tmp_path)
+    for module in LAZY_MODULES:
+        assert module not in imported, (
+            f'`{module}` не должен импортироваться вместе с homework.'
+        )
+
+
+@pytest.mark.timeout(60)
+def test_import_fits_startup_budget(tmp_path):
+    homework = measure_import('homework', tmp_path)['homework']
+    deferred = measure_import('telegram, requests', tmp_path)
+    baseline = deferred['telegram'] + deferred['requests']
+    assert homework < IMPORT_BUDGET_RATIO * baseline, (
+        f'Импорт homework занял {homework} мкс, а отложенные telegram '
+        f'и requests - {baseline} мкс; бюджет {IMPORT_BUDGET_RATIO:.0%}.'
+    )
+
+
+def test_bot_is_created_on_first_send(monkeypatch):
+    import telegram
+
+    from lazy import Bot
+
+    created = []
+
+    class FakeBot:
+        def __init__(self, **kwargs):
+            created.append(kwargs)
+
+        def send_message(self, chat_id, text):
+            return text
+
+    monkeypatch.setattr(telegram, 'Bot', FakeBot)
+    bot = Bot(token='1234:abcdefg')
+    assert not bot.is_created and not created
+    assert bot.send_message('12345', text='hi') == 'hi'
+    assert created == [{'token': '1234:abcdefg'}]
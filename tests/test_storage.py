@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+from storage import TimelineStore, parse_date_updated
+
+DAY = 24 * 60 * 60
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TimelineStore(str(tmp_path / 'timeline.sqlite3'), batch_size=3)
+    yield store
+    store.close()
+
+
+def test_only_transitions_are_recorded(store):
+    homework = {'homework_name': 'hw1', 'status': 'reviewing'}
+    assert store.record('alice', homework, 100)
+    assert not store.record('alice', homework, 200)
+    assert store.record('alice', dict(homework, status='approved'), 300)
+    assert [row[2] for row in store.history('alice', 'hw1')] == [
+        'reviewing',
+        'approved',
+    ]
+
+
+def test_last_status_survives_reopen(tmp_path):
+    path = str(tmp_path / 'timeline.sqlite3')
+    homework = {'homework_name': 'hw1', 'status': 'reviewing'}
+    first = TimelineStore(path)
+    first.record('alice', homework, 100)
+    first.close()
+    second = TimelineStore(path)
+    assert not second.record('alice', homework, 200)
+    second.close()
+
+
+def test_changed_at_from_date_updated(store):
+    store.record(
+        'alice',
+        {
+            'homework_name': 'hw1',
+            'status': 'approved',
+            'date_updated': '2020-02-13T14:40:57Z',
+        },
+        observed_at=1,
+    )
+    assert store.history()[0][3] == 1581604857
+    assert parse_date_updated('garbage', 5) == 5
+
+
+def test_range_and_aggregate_queries_on_many_rows(store):
+    rows = [
+        (
+            f'tenant{index % 100}',
+            f'hw{index % 7}',
+            ('reviewing', 'approved', 'rejected')[index % 3],
+            index * 60,
+            index * 60,
+        )
+        for index in range(50_000)
+    ]
+    store.record_many(rows)
+
+    started = time.perf_counter()
+    counts = store.count_by_status(since=DAY, until=2 * DAY)
+    history = store.history(tenant='tenant5', homework='hw5', since=DAY)
+    elapsed = time.perf_counter() - started
+
+    assert sum(counts.values()) == DAY // 60
+    assert all(row[3] >= DAY for row in history)
+    assert elapsed < 0.5
@@ -0,0 +1,160 @@
+import sqlite3
+
+import pytest
+
+import tiering
+from metrics import MetricsRegistry
+from tiering import TenantState, TieredStateStore
+
+
+@pytest.fixture
+def metrics():
+    return MetricsRegistry()
+
+
+@pytest.fixture
+def store(tmp_path, metrics):
+    evicted = []
+    store = TieredStateStore(
+        str(tmp_path / 'tenants.sqlite3'),
+        on_evict=evicted.append,
+        metrics=metrics,
+    )
+    store.evicted = evicted
+    yield store
+    store.close()
+
+
+def reviewing(name, cursor=1):
+    return TenantState(name, cursor, {'hw': 'reviewing'})
+
+
+def test_cold_tenant_is_paged_out_and_back(store, metrics):
+    assert store.get('alice', 5) == TenantState('alice', 5)
+    store.put(TenantState('alice', 7, {'hw': 'approved'}))
+    assert 'alice' not in store
+    assert store.evicted == ['alice']
+
+    state = store.get('alice', 0)
+    assert state == TenantState('alice', 7, {'hw': 'approved'})
+    assert metrics.counter('tiering.page_outs') == 1
+    assert metrics.counter('tiering.page_ins') == 1
+    assert metrics.counter('tiering.evictions') == 0
+
+
+def test_reviewing_tenant_stays_hot(store, metrics):
+    store.put(reviewing('bob'))
+    assert 'bob' in store
+    assert store.get('bob', 0) is store.get('bob', 0)
+    assert metrics.counter('tiering.hot_hits') == 2
+    assert metrics.gauge('tiering.hot') == 1
+    assert metrics.gauge('tiering.hot_bytes') == store.hot_bytes > 0
+
+
+def test_budget_evicts_least_recently_used(store, metrics):
+    size = reviewing('a').size()
+    store.configure(budget=size * 2, memory_limit=None)
+    store.put(reviewing('a'))
+    store.put(reviewing('b'))
+    store.get('a', 0)
+    store.put(reviewing('c'))
+    assert len(store) == 2
+    assert 'b' not in store
+    assert store.evicted == ['b']
+    assert metrics.counter('tiering.evictions.budget') == 1
+    assert store.get('b', 0) == reviewing('b')
+
+
+def test_memory_limit_evicts_half_of_hot_tier(store, metrics, monkeypatch):
+    for name in 'abcd':
+        store.put(reviewing(name))
+    monkeypatch.setattr(tiering, 'process_rss', lambda: 2048)
+    store.configure(budget=store.budget, memory_limit=1024)
+    assert len(store) == 2
+    assert metrics.counter('tiering.evictions.memory_limit') == 2
+
+
+def test_memory_limit_evicts_once_per_crossing(store, metrics, monkeypatch):
+    rss = [512]
+    monkeypatch.setattr(tiering, 'process_rss', lambda: rss[0])
+    store.configure(budget=store.budget, memory_limit=1024)
+    for name in 'abcd':
+        store.put(reviewing(name))
+    rss[0] = 2048
+    store.put(reviewing('e'))
+    assert len(store) == 2
+    store.put(reviewing('f'))
+    store.put(reviewing('g'))
+    assert len(store) == 4
+    rss[0] = 512
+    store.put(reviewing('h'))
+    rss[0] = 2048
+    store.put(reviewing('i'))
+    assert len(store) == 3
+    assert metrics.counter('tiering.evictions.memory_limit') == 6
+
+
+def test_paged_out_tenant_is_committed(store, tmp_path):
+    store.put(TenantState('alice', 7, {'hw': 'approved'}))
+    other = sqlite3.connect(str(tmp_path / 'tenants.sqlite3'))
+    try:
+        assert other.execute('SELECT tenant FROM tenant_state').fetchall() == [
+            ('alice',)
+        ]
+    finally:
+        other.close()
+
+
+def test_close_persists_hot_tier(tmp_path, metrics):
+    path = str(tmp_path / 'tenants.sqlite3')
+    store = TieredStateStore(path, metrics=metrics)
+    store.put(reviewing('alice', cursor=42))
+    store.close()
+    reopened = TieredStateStore(path, metrics=metrics)
+    assert reopened.get('alice', 0) == reviewing('alice', cursor=42)
+    reopened.close()
+
+
+def test_error_series_survives_page_out(store):
+    from exceptions import ApiConnectionError
+
+    store.put(TenantState('alice', 7, {}, ApiConnectionError('down'), 3))
+    assert 'alice' not in store
+    state = store.get('alice', 0)
+    assert type(state.error) is ApiConnectionError
+    assert state.failures == 3
+
+
+def test_old_rows_load_without_error_series(store):
+    store.connection.execute(
+        'INSERT INTO tenant_state VALUES (?, ?)',
+        ('alice', tiering.zlib.compress(b'[7,{"hw":"approved"}]')),
+    )
+    state = store.get('alice', 0)
+    assert state == TenantState('alice', 7, {'hw': 'approved'})
+    assert (state.error, state.failures) == (None, 0)
+
+
+def test_cold_tenant_backoff_grows_and_notifies_once(store, monkeypatch):
+    import homework
+    from config import TenantSettings
+    from exceptions import ApiConnectionError, error_policy
+
+    sent = []
+
+    def fail(*args, **kwargs):
+        raise ApiConnectionError('down')
+
+    monkeypatch.setattr(homework, 'STATES', store)
+    monkeypatch.setattr(homework, 'load_statuses', fail)
+    monkeypatch.setattr(
+        homework, 'notify', lambda bot, text, **kwargs: sent.append(text)
+    )
+    monkeypatch.setattr(homework.ADVISOR, 'enabled', False)
+    job = homework.make_poll_job(
+        None, TenantSettings('alice', 'token', '2', 600), 0
+    )
+    delays = [job() for _ in range(4)]
+    backoff = error_policy(ApiConnectionError()).backoff
+    assert delays == [backoff * 2 ** index for index in range(4)]
+    assert len(sent) == 1
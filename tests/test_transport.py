@@ -0,0 +1,85 @@
+import pytest
+import requests
+
+import transport
+from exceptions import ApiConnectionError
+from metrics import MetricsRegistry
+from transport import HTTP1, HTTP2, PROTOCOLS, Transport, benchmark
+
+
+def test_http1_wraps_connection_errors(monkeypatch):
+    def broken_get(*args, **kwargs):
+        raise requests.exceptions.ConnectionError('refused')
+
+    monkeypatch.setattr(requests, 'get', broken_get)
+    metrics = MetricsRegistry()
+    with pytest.raises(ApiConnectionError, match='refused'):
+        Transport(metrics=metrics).get('http://api', params={'from_date': 0})
+    assert metrics.counter('transport.http1.requests') == 1
+
+
+def test_http1_passes_timeout(monkeypatch):
+    calls = []
+
+    def broken_get(*args, **kwargs):
+        calls.append(kwargs)
+        raise requests.exceptions.Timeout('slow')
+
+    monkeypatch.setattr(requests, 'get', broken_get)
+    with pytest.raises(ApiConnectionError):
+        Transport(timeout=7, metrics=MetricsRegistry()).get('http://api')
+    assert calls[0]['timeout'] == 7
+
+
+def test_http2_falls_back_without_httpx(monkeypatch, caplog):
+    monkeypatch.setattr(transport, 'http2_available', lambda: False)
+    assert Transport(HTTP2).protocol == HTTP1
+    assert 'HTTP/2 недоступен' in caplog.text
+
+
+@pytest.mark.parametrize('protocol', PROTOCOLS)
+def test_benchmark_on_local_server(protocol):
+    if protocol == HTTP2:
+        pytest.importorskip('httpx')
+        pytest.importorskip('h2')
+    report = benchmark(protocol, requests=40, concurrency=4)
+    assert report['requests'] == 40
+    # HTTP/1.1 бота - новое соединение на запрос, пулы переиспользуют.
+    if protocol == HTTP1:
+        assert report['connections'] == 40
+    elif protocol == HTTP2:
+        assert report['connections'] <= 2
+    else:
+        assert report['connections'] < 40
+
+
+def test_http1_reads_compressed_body(monkeypatch):
+    import gzip
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    body = gzip.compress(json.dumps({'homeworks': []}).encode())
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            assert 'gzip' in self.headers['Accept-Encoding']
+            self.send_response(200)
+            self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.handle_request, daemon=True).start()
+    metrics = MetricsRegistry()
+    host, port = server.server_address
+    response = Transport(metrics=metrics).get(
+        f'http://{host}:{port}/', tenant='alice'
+    )
+    server.server_close()
+    assert response.json() == {'homeworks': []}
+    assert metrics.counter('bandwidth.wire.alice') == len(body)
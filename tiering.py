@@ -0,0 +1,284 @@
+"""Состояние подписчиков в два яруса: горячее в памяти, холодное на диске.
+Горячие - подписчики с домашкой на проверке, их опрашивают часто
+и по ним ждут вердикт. Остальные после опроса выгружаются в SQLite
+сжатым json и подгружаются к следующему опросу.
+
+Хранилище использует homework.make_poll_job: main() опрашивает всех
+подписчиков по колесу таймеров.
+"""
+import importlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from analytics import REVIEWING
+from metrics import METRICS, MetricsRegistry
+
+# Бюджет горячего яруса по умолчанию, байт (оценка, не точный замер).
+DEFAULT_BUDGET: int = 64 * 1024 * 1024
+SCHEMA: str = (
+    'CREATE TABLE IF NOT EXISTS tenant_state ('
+    'tenant TEXT PRIMARY KEY, data BLOB NOT NULL)'
+)
+
+
+def error_name(error: Optional[BaseException]) -> Optional[str]:
+    """Путь к классу ошибки для хранения на диске: модуль:имя."""
+    if error is None:
+        return None
+    cls = type(error)
+    return f'{cls.__module__}:{cls.__qualname__}'
+
+
+def restore_error(name: Optional[str]) -> Optional[BaseException]:
+    """Ошибка класса name без аргументов, None - если класса уже нет.
+    Для повтора важен только класс: по нему NOTIFY_ONCE решает, новая
+    ли это серия сбоев.
+    """
+    if name is None:
+        return None
+    module, _, qualname = name.partition(':')
+    try:
+        cls: Any = importlib.import_module(module)
+        for part in qualname.split('.'):
+            cls = getattr(cls, part)
+    except (ImportError, AttributeError):
+        logging.warning(f'Класс ошибки {name} не найден')
+        return None
+    if not (isinstance(cls, type) and issubclass(cls, BaseException)):
+        return None
+    return cls.__new__(cls)
+
+
+def process_rss() -> Optional[int]:
+    """Текущий RSS процесса в байтах, None - если узнать нельзя."""
+    try:
+        with open('/proc/self/statm', encoding='ascii') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@dataclass
+class TenantState:
+    """Курсор, последние статусы домашек и серия сбоев подписчика.
+    Класс ошибки прошлого опроса и число сбоев подряд сохраняются
+    вместе с курсором: без них после выгрузки NOTIFY_ONCE сообщал бы
+    о каждом сбое, а пауза после временных сбоев не росла бы.
+    """
+
+    tenant: str
+    cursor: int = 0
+    statuses: Dict[str, Optional[str]] = field(default_factory=dict)
+    error: Optional[Exception] = field(default=None, compare=False)
+    failures: int = field(default=0, compare=False)
+
+    @property
+    def reviewing(self) -> bool:
+        """Есть ли домашка на проверке."""
+        return REVIEWING in self.statuses.values()
+
+    def size(self) -> int:
+        """Примерный объём в памяти, байт."""
+        return (
+            sys.getsizeof(self)
+            + sys.getsizeof(self.statuses)
+            + sum(
+                sys.getsizeof(name) + sys.getsizeof(status)
+                for name, status in self.statuses.items()
+            )
+        )
+
+    def dump(self) -> bytes:
+        """Компактный вид для диска."""
+        return zlib.compress(
+            json.dumps(
+                [
+                    self.cursor,
+                    self.statuses,
+                    error_name(self.error),
+                    self.failures,
+                ],
+                separators=(',', ':'),
+            ).encode()
+        )
+
+    @classmethod
+    def load(cls, tenant: str, data: bytes) -> 'TenantState':
+        """Состояние из вида dump(); старые записи - без серии сбоев."""
+        cursor, statuses, *errors = json.loads(zlib.decompress(data))
+        error, failures = errors or (None, 0)
+        return cls(tenant, cursor, statuses, restore_error(error), failures)
+
+
+class TieredStateStore:
+    """Горячий ярус в памяти с бюджетом и холодный ярус в SQLite.
+    Подписчик без домашек на проверке выгружается сразу после опроса,
+    горячие вытесняются по LRU при превышении бюджета или memory_limit
+    (RSS процесса). on_evict вызывается с именем выгруженного подписчика,
+    когда его состояние уже закоммичено на диск.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        budget: int = DEFAULT_BUDGET,
+        memory_limit: Optional[int] = None,
+        on_evict: Optional[Callable[[str], None]] = None,
+        metrics: MetricsRegistry = METRICS,
+    ) -> None:
+        self.path = path
+        self.budget = budget
+        self.memory_limit = memory_limit
+        self.on_evict = on_evict
+        self.metrics = metrics
+        self._lock = threading.RLock()
+        self._hot: 'OrderedDict[str, TenantState]' = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes: int = 0
+        self._uncommitted: int = 0
+        # RSS уже выше предела и половина яруса выгружена; снова
+        # вытесняем, только когда RSS опустится ниже предела и вырастет.
+        self._over_limit: bool = False
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def __len__(self) -> int:
+        return len(self._hot)
+
+    def __contains__(self, tenant: str) -> bool:
+        return tenant in self._hot
+
+    @property
+    def hot_bytes(self) -> int:
+        """Оценка объёма горячего яруса."""
+        return self._bytes
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Соединение с холодным ярусом, открывается при первом обращении."""
+        if self._connection is None:
+            self._connection = sqlite3.connect(
+                self.path, check_same_thread=False
+            )
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute(SCHEMA)
+        return self._connection
+
+    def configure(self, budget: int, memory_limit: Optional[int]) -> None:
+        """Меняем бюджет и предел памяти, лишнее вытесняется."""
+        with self._lock:
+            self.budget, self.memory_limit = budget, memory_limit
+            self._enforce()
+
+    def get(self, tenant: str, cursor: int) -> TenantState:
+        """Состояние подписчика: из памяти, с диска или новое."""
+        with self._lock:
+            state = self._hot.get(tenant)
+            if state is not None:
+                self._hot.move_to_end(tenant)
+                self.metrics.inc('tiering.hot_hits')
+                return state
+            row = self.connection.execute(
+                'SELECT data FROM tenant_state WHERE tenant = ?', (tenant,)
+            ).fetchone()
+            if row is None:
+                return TenantState(tenant, cursor)
+            self.metrics.inc('tiering.page_ins')
+            return TenantState.load(tenant, row[0])
+
+    def put(self, state: TenantState) -> None:
+        """Состояние после опроса: горячее остаётся, холодное на диск."""
+        with self._lock:
+            self._drop(state.tenant)
+            if not state.reviewing:
+                self._page_out(state, 'cold')
+                return
+            self._hot[state.tenant] = state
+            self._sizes[state.tenant] = state.size()
+            self._bytes += self._sizes[state.tenant]
+            self._enforce()
+            self._update_gauges()
+
+    def flush(self) -> None:
+        """Сохраняем горячий ярус на диск, не выгружая его."""
+        with self._lock:
+            for state in self._hot.values():
+                self._write(state)
+            self._commit()
+
+    def close(self) -> None:
+        """Сохраняем всё и закрываем соединение."""
+        with self._lock:
+            self.flush()
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _enforce(self) -> None:
+        while self._hot and self._bytes > self.budget:
+            self._evict_oldest('budget')
+        if self.memory_limit is None or not self._hot:
+            return
+        rss = process_rss()
+        if rss is None or rss <= self.memory_limit:
+            self._over_limit = False
+            return
+        if self._over_limit:
+            return
+        # Память к ОС возвращается не сразу, поэтому освобождаем
+        # с запасом - половину горячего яруса, один раз за превышение.
+        self._over_limit = True
+        logging.warning(
+            f'RSS {rss} больше предела {self.memory_limit}, '
+            'выгружаем горячих подписчиков'
+        )
+        target = self._bytes // 2
+        while self._hot and self._bytes > target:
+            self._evict_oldest('memory_limit')
+
+    def _evict_oldest(self, reason: str) -> None:
+        tenant = next(iter(self._hot))
+        state = self._hot[tenant]
+        self._drop(tenant)
+        self._page_out(state, reason)
+
+    def _drop(self, tenant: str) -> None:
+        if self._hot.pop(tenant, None) is not None:
+            self._bytes -= self._sizes.pop(tenant)
+            self._update_gauges()
+
+    def _page_out(self, state: TenantState, reason: str) -> None:
+        # В памяти подписчика больше нет: диск - единственная копия.
+        self._write(state)
+        self._commit()
+        self.metrics.inc('tiering.page_outs')
+        if reason != 'cold':
+            self.metrics.inc('tiering.evictions')
+            self.metrics.inc(f'tiering.evictions.{reason}')
+        if self.on_evict is not None:
+            self.on_evict(state.tenant)
+
+    def _write(self, state: TenantState) -> None:
+        self.connection.execute(
+            'INSERT OR REPLACE INTO tenant_state (tenant, data) '
+            'VALUES (?, ?)',
+            (state.tenant, state.dump()),
+        )
+        self._uncommitted += 1
+
+    def _commit(self) -> None:
+        if self._connection is not None and self._uncommitted:
+            self._connection.commit()
+            self._uncommitted = 0
+
+    def _update_gauges(self) -> None:
+        self.metrics.set('tiering.hot', len(self._hot))
+        self.metrics.set('tiering.hot_bytes', self._bytes)
@@ -0,0 +1,113 @@
+"""Возобновление TLS-сессий для запросов к API.
+Клиентский SSLContext помнит сессию каждого сервера и подставляет её
+при следующем подключении. Контекст принадлежит одному пулу
+(netadapter.ApiAdapter), но urllib3 на каждое соединение заново
+выставляет verify_mode и check_hostname и грузит сертификаты - такие
+повторы здесь ничего не меняют. Модуль грузится лениво из netcache,
+чтобы не импортировать ssl вместе с homework.
+"""
+import socket
+import ssl
+import threading
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+
+from metrics import METRICS, MetricsRegistry
+
+
+def _settled(name: str) -> property:
+    """Свойство SSLContext, которое не переписывается тем же значением.
+    Так общий контекст не меняется из разных потоков без нужды.
+    """
+    base = getattr(ssl.SSLContext, name)
+
+    def set_value(context: ssl.SSLContext, value: Any) -> None:
+        if base.__get__(context) != value:
+            base.__set__(context, value)
+
+    return property(base.__get__, set_value)
+
+
+class _RememberingSocket(ssl.SSLSocket):
+    """Перед закрытием отдаёт сессию контексту."""
+
+    def close(self) -> None:
+        self.context.remember(self)
+        super().close()
+
+
+class ResumingContext(ssl.SSLContext):
+    """Клиентский SSLContext, возобновляющий сессии по имени сервера.
+    Каждый набор сертификатов грузится один раз, а не на каждое соединение.
+    """
+
+    sslsocket_class = _RememberingSocket
+    verify_mode = _settled('verify_mode')
+    check_hostname = _settled('check_hostname')
+
+    def setup(self, metrics: MetricsRegistry = METRICS) -> 'ResumingContext':
+        """Настройки как у urllib3 и хранилище сессий."""
+        self.minimum_version = ssl.TLSVersion.TLSv1_2
+        self.metrics = metrics
+        self.resume = True
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, ssl.SSLSession] = {}
+        self._locations: Set[Tuple[Any, ...]] = set()
+        return self
+
+    def load_default_certs(self, *args: Any, **kwargs: Any) -> None:
+        self._load_once(('default', *args), super().load_default_certs, args)
+
+    def load_verify_locations(
+        self, cafile: Any = None, capath: Any = None, cadata: Any = None
+    ) -> None:
+        self._load_once(
+            (cafile, capath, cadata),
+            super().load_verify_locations,
+            (cafile, capath, cadata),
+        )
+
+    def _load_once(
+        self, key: Tuple[Any, ...], load: Any, args: Tuple[Any, ...]
+    ) -> None:
+        with self._lock:
+            if key not in self._locations:
+                load(*args)
+                self._locations.add(key)
+
+    def remember(self, sock: ssl.SSLSocket) -> None:
+        """Сохраняем сессию соединения для следующего подключения."""
+        try:
+            session = sock.session
+        except (ValueError, OSError):
+            return
+        if session is not None and sock.server_hostname and self.resume:
+            with self._lock:
+                self._sessions[sock.server_hostname] = session
+
+    def wrap_socket(
+        self,
+        sock: socket.socket,
+        *args: Any,
+        server_hostname: Optional[str] = None,
+        session: Optional[ssl.SSLSession] = None,
+        **kwargs: Any,
+    ) -> ssl.SSLSocket:
+        if session is None and server_hostname and self.resume:
+            with self._lock:
+                session = self._sessions.get(server_hostname)
+        started = time.perf_counter()
+        wrapped = super().wrap_socket(
+            sock,
+            *args,
+            server_hostname=server_hostname,
+            session=session,
+            **kwargs,
+        )
+        self.metrics.observe(
+            'tls.handshake_seconds', time.perf_counter() - started
+        )
+        self.metrics.inc(
+            'tls.resumed' if wrapped.session_reused else 'tls.full_handshakes'
+        )
+        return wrapped
@@ -0,0 +1,246 @@
+"""HTTP-транспорт запросов к API: HTTP/1.1 через requests или HTTP/2.
+http1 - requests.get, новое соединение на запрос; http1-pool - своя
+сессия requests с keep-alive, кэшем DNS и возобновлением TLS
+(netcache.NetworkCache). HTTP/2 (httpx с пакетом h2) мультиплексирует
+одновременные опросы многих подписчиков в нескольких соединениях.
+Ошибки соединения обоих транспортов приводятся к ApiConnectionError.
+Тело ответа читается сжатым и разжимается в bandwidth.read_body;
+у requests это делает хук response, так что разжатие, предел размера
+и учёт трафика работают для любого ответа, прошедшего через requests.
+
+Сравнение на локальном сервере:
+    python transport.py [--requests N] [--concurrency N]
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Optional, Sequence
+
+from bandwidth import CHUNK_SIZE, Body, accept_encoding, read_body
+from config import DEFAULT_TENANT
+from exceptions import ApiConnectionError
+from metrics import METRICS, MetricsRegistry
+from netcache import NetworkCache
+
+HTTP1: str = 'http1'
+HTTP1_POOL: str = 'http1-pool'
+HTTP2: str = 'http2'
+PROTOCOLS: Sequence[str] = (HTTP1, HTTP1_POOL, HTTP2)
+# Модули, без которых HTTP/2 недоступен.
+HTTP2_MODULES: Sequence[str] = ('httpx', 'h2')
+DEFAULT_TIMEOUT: float = 30.0
+
+
+def http2_available() -> bool:
+    """Установлены ли httpx и h2."""
+    return all(importlib.util.find_spec(name) for name in HTTP2_MODULES)
+
+
+class Transport:
+    """GET к API по выбранному протоколу.
+    HTTP/1.1 вызывает requests.get, как и раньше; http1-pool держит
+    сессию network.session() и HTTP/2 - общий потокобезопасный
+    httpx.Client, оба с max_connections соединениями.
+    """
+
+    def __init__(
+        self,
+        protocol: str = HTTP1,
+        max_connections: int = 2,
+        timeout: float = DEFAULT_TIMEOUT,
+        cleartext: bool = False,
+        metrics: MetricsRegistry = METRICS,
+        network: Optional[NetworkCache] = None,
+    ) -> None:
+        self.protocol = HTTP1
+        self.max_connections = max_connections
+        self.timeout = timeout
+        # HTTP/2 без TLS (h2c) - только для локального сервера.
+        self.cleartext = cleartext
+        self.metrics = metrics
+        self.network = network or NetworkCache(metrics=metrics)
+        self._lock = threading.Lock()
+        self._client: Any = None
+        self.configure(protocol, max_connections)
+
+    def configure(self, protocol: str, max_connections: int) -> None:
+        """Меняем протокол; без httpx и h2 остаёмся на HTTP/1.1."""
+        if protocol == HTTP2 and not http2_available():
+            logging.error(
+                'HTTP/2 недоступен: установите httpx[http2]. '
+                'Запросы к API идут по HTTP/1.1'
+            )
+            protocol = HTTP1
+        if (protocol, max_connections) == (
+            self.protocol, self.max_connections
+        ):
+            return
+        self.close()
+        self.protocol, self.max_connections = protocol, max_connections
+
+    def get(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        tenant: str = DEFAULT_TENANT,
+    ) -> Any:
+        """Ответ с status_code и json(); сбой сети - ApiConnectionError."""
+        self.metrics.inc(f'transport.{self.protocol}.requests')
+        headers = {**(headers or {}), 'Accept-Encoding': accept_encoding()}
+        if self.protocol == HTTP2:
+            return self._get_http2(url, headers, params, tenant)
+        import requests
+        from urllib3.exceptions import HTTPError
+
+        if self.protocol == HTTP1_POOL:
+            get = self._session().get
+        else:
+            get = requests.get
+        try:
+            return get(
+                url,
+                headers=headers,
+                params=params,
+                stream=True,
+                timeout=self.timeout,
+                hooks={'response': partial(self._read_body, tenant)},
+            )
+        except (requests.exceptions.RequestException, HTTPError) as error:
+            raise ApiConnectionError(f'Ошибка соединения с API {error}')
+
+    def close(self) -> None:
+        """Закрываем соединения http1-pool и HTTP/2."""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    def _read_body(self, tenant: str, response: Any, **kwargs: Any) -> Any:
+        """Хук requests: читаем тело сжатым и кладём в content разжатым.
+        Прочитанный ответ отдаёт соединение обратно в пул.
+        """
+        with response:
+            response._content = read_body(
+                response.raw.stream(CHUNK_SIZE, decode_content=False),
+                response.headers.get('Content-Encoding'),
+                tenant,
+                self.metrics,
+            )
+            response._content_consumed = True
+        return response
+
+    def _get_http2(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]],
+        params: Optional[Dict[str, Any]],
+        tenant: str,
+    ) -> Any:
+        import httpx
+
+        try:
+            with self._http2_client().stream(
+                'GET', url, headers=headers, params=params
+            ) as response:
+                content = read_body(
+                    response.iter_raw(CHUNK_SIZE),
+                    response.headers.get('Content-Encoding'),
+                    tenant,
+                    self.metrics,
+                )
+            return Body(response.status_code, content, response.headers)
+        except httpx.HTTPError as error:
+            raise ApiConnectionError(f'Ошибка соединения с API {error}')
+
+    def _session(self) -> Any:
+        with self._lock:
+            if self._client is None:
+                self._client = self.network.session(self.max_connections)
+            return self._client
+
+    def _http2_client(self) -> Any:
+        with self._lock:
+            if self._client is None:
+                import httpx
+
+                self._client = httpx.Client(
+                    http1=not self.cleartext,
+                    http2=True,
+                    timeout=self.timeout,
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections,
+                    ),
+                )
+            return self._client
+
+
+def benchmark(
+    protocol: str, requests: int = 2000, concurrency: int = 32
+) -> Dict[str, Any]:
+    """Гоняем requests запросов из concurrency потоков к локальному серверу.
+    Все протоколы идут через Transport.get, как запросы бота: базовая
+    линия HTTP/1.1 - requests.get с новым соединением на запрос.
+    """
+    from localserver import start_server
+
+    server = start_server(http2=protocol == HTTP2)
+    host, port = server.server_address[:2]
+    url = f'http://{host}:{port}/homework_statuses/'
+    metrics = MetricsRegistry()
+    transport = Transport(
+        protocol, max_connections=2, cleartext=True, metrics=metrics
+    )
+
+    def request(_: int) -> None:
+        started = time.perf_counter()
+        response = transport.get(url, params={'from_date': 0})
+        response.json()
+        metrics.observe('latency', time.perf_counter() - started)
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(concurrency) as executor:
+            list(executor.map(request, range(requests)))
+        wall = time.perf_counter() - started
+    finally:
+        transport.close()
+        server.shutdown()
+        server.server_close()
+    latency = metrics.histogram('latency')
+    return {
+        'protocol': protocol,
+        'requests': requests,
+        'concurrency': concurrency,
+        'connections': server.connections,
+        'requests_per_second': requests / wall,
+        'p50_ms': latency.percentile(50) * 1000,
+        'p95_ms': latency.percentile(95) * 1000,
+    }
+
+
+def main(argv: Sequence[str]) -> None:
+    """Сравнение транспортов на локальном сервере."""
+    parser = argparse.ArgumentParser(description='Сравнение транспортов API')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    args = parser.parse_args(list(argv))
+    protocols: List[str] = [HTTP1, HTTP1_POOL]
+    if http2_available():
+        protocols.append(HTTP2)
+    else:
+        print('httpx[http2] не установлен, HTTP/2 пропущен', file=sys.stderr)
+    for protocol in protocols:
+        report = benchmark(protocol, args.requests, args.concurrency)
+        print(json.dumps(report, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])